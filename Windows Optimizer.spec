@@ -1,39 +1,51 @@
-# -*- mode: python ; coding: utf-8 -*-
-
-
-a = Analysis(
-    ['encrypted_launcher.py'],
-    pathex=[],
-    binaries=[],
-    datas=[('key.txt', '.'), ('encrypted_code.txt', '.')],
-    hiddenimports=['tkinter', 'cryptography', 'wmi', 'win32com.client', 'win32api', 'win32con', 'psutil', 'tkinter.ttk', 'webbrowser', 'subprocess', 'shutil', 'time'],
-    hookspath=[],
-    hooksconfig={},
-    runtime_hooks=[],
-    excludes=[],
-    noarchive=False,
-    optimize=0,
-)
-pyz = PYZ(a.pure)
-
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.datas,
-    [],
-    name='Windows Optimizer',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    argv_emulation=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-    uac_admin=True,
-)
+# -*- mode: python ; coding: utf-8 -*-
+
+import sys
+
+sys.path.insert(0, SPECPATH)
+from encryptor import payload_matches
+
+# El código cifrado se empaqueta tal cual: no construir con un encrypted_code.txt viejo
+if not payload_matches(SPECPATH):
+    raise SystemExit("encrypted_code.txt no coincide con windows_optimizer.py: ejecuta python encryptor.py")
+
+
+a = Analysis(
+    ['encrypted_launcher.py'],
+    pathex=[],
+    binaries=[],
+    datas=[('key.txt', '.'), ('encrypted_code.txt', '.'), ('profiles', 'profiles')],
+    # windows_optimizer.py llega cifrado, así que PyInstaller no ve sus imports
+    hiddenimports=['tkinter', 'cryptography', 'wmi', 'win32com.client', 'win32api', 'win32con', 'pythoncom', 'psutil', 'tkinter.ttk', 'webbrowser', 'subprocess', 'shutil', 'time',
+                   'fnmatch', 'errno', 'heapq', 'zlib', 'queue', 'json', 're', 'tomllib',
+                   'concurrent.futures'],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[],
+    noarchive=False,
+    optimize=0,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    a.binaries,
+    a.datas,
+    [],
+    name='Windows Optimizer',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    runtime_tmpdir=None,
+    console=False,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    uac_admin=True,
+)
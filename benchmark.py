@@ -0,0 +1,580 @@
+"""Benchmarks del Windows Optimizer sobre datos sintéticos.
+
+Uso:
+    python benchmark.py walker --files 500000
+    python benchmark.py registry --rounds 5
+    python benchmark.py profile
+    python benchmark.py dag --delay 0.1
+    python benchmark.py journal
+    python benchmark.py startup --rounds 3
+    python benchmark.py hardware
+    python benchmark.py launcher --rounds 5
+    python benchmark.py importtime --delay 0.05
+    python benchmark.py tooltips --rounds 5000
+    python benchmark.py estimate --files 200000
+    python benchmark.py index --files 500000
+    python benchmark.py rules --files 200000
+    python benchmark.py retries --files 100000
+    python benchmark.py rmtree --files 1000000
+
+Los escenarios generan sus propios árboles de prueba en una carpeta temporal
+y funcionan también en Linux (startup y tooltips necesitan una pantalla).
+"""
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from os import path
+
+import windows_optimizer as wo
+
+
+def make_tree(root, files, files_per_dir=50, fanout=8, size=512):
+    """Generar un árbol sintético con el número de archivos indicado"""
+    os.makedirs(root, exist_ok=True)
+    payload = b'x' * size
+    created = 0
+    pending = [root]
+    while created < files:
+        directory = pending.pop(0)
+        for i in range(min(files_per_dir, files - created)):
+            with open(path.join(directory, f"file_{i}.tmp"), 'wb') as file:
+                file.write(payload)
+            created += 1
+        for i in range(fanout):
+            subdir = path.join(directory, f"dir_{i}")
+            os.mkdir(subdir)
+            pending.append(subdir)
+    return root
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return time.perf_counter() - start, result
+
+
+def legacy_clean(folder):
+    """Réplica del bucle original de clean_downloads (listar, contar y borrar)"""
+    total_files = sum(1 for _ in os.listdir(folder))
+    files_removed = 0
+    for filename in os.listdir(folder):
+        file_path = path.join(folder, filename)
+        try:
+            if path.isfile(file_path):
+                os.unlink(file_path)
+            elif path.isdir(file_path):
+                shutil.rmtree(file_path)
+            files_removed += 1
+        except OSError:
+            continue
+    return total_files, files_removed
+
+
+def walker_clean(folder):
+    """Limpieza en una sola pasada con TreeWalker"""
+    walker = wo.TreeWalker(folder)
+    files_removed = 0
+    for entry, is_dir in walker:
+        if is_dir:
+            os.rmdir(entry.path)
+        else:
+            wo.remove_entry(entry)
+            files_removed += 1
+    return walker.estimated_total, files_removed
+
+
+def bench_walker(args):
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, function in [("listdir + isfile/isdir + rmtree", legacy_clean),
+                               ("TreeWalker (scandir)", walker_clean)]:
+            tree = make_tree(path.join(workdir, 'tree'), args.files)
+            seconds, _ = timed(function, tree)
+            print(f"{name:<36} {seconds:8.2f} s  {args.files / seconds:10.0f} archivos/s")
+            shutil.rmtree(tree, ignore_errors=True)
+
+
+def profile_values(name):
+    """Valores de registro (clave, nombre, dato) que escribe un perfil"""
+    registry, _, _ = wo.ProfileLibrary().load(name).desired_state()
+    for (hive, _), (key, values) in registry.writes.items():
+        for value_name, (_, data) in values.items():
+            yield f"{hive}\\{key}", value_name, data
+
+
+# Valores de registro que escribe el Modo Gaming Plus
+GAMING_VALUES = list(profile_values('gaming'))
+
+# Clave de prueba: el benchmark nunca toca los valores reales del perfil
+SCRATCH_KEY = "HKCU\\Software\\WindowsOptimizerBenchmark"
+
+
+def scratch_values():
+    """Mismos valores del perfil gaming, redirigidos a la clave de prueba"""
+    for key, name, data in GAMING_VALUES:
+        yield SCRATCH_KEY + "\\" + key.split("\\", 1)[1], name, data
+
+
+def reg_exe_apply(executor):
+    """Ruta original: un 'reg add' (cmd.exe + reg.exe) por valor"""
+    for key, name, data in scratch_values():
+        value_type = 'REG_DWORD' if isinstance(data, int) else 'REG_SZ'
+        if os.name == 'nt':
+            executor.run(f'reg add "{key}" /v "{name}" /t {value_type} /d "{data}" /f')
+        else:
+            # Fuera de Windows se mide el mismo coste: shell + proceso hijo
+            executor.run('/bin/true')
+
+
+def batch_apply(writer):
+    batch = wo.RegistryBatch()
+    for key, name, data in scratch_values():
+        batch.set(key, name, data)
+    return writer.apply(batch)
+
+
+def bench_registry(args):
+    executor = wo.CommandExecutor()
+    writer = wo.RegistryWriter()
+    for name, function, target in [("reg.exe por valor", reg_exe_apply, executor),
+                                   (f"RegistryWriter ({type(writer.backend).__name__})", batch_apply, writer)]:
+        seconds = min(timed(function, target)[0] for _ in range(args.rounds))
+        print(f"{name:<36} {seconds * 1000:8.2f} ms  ({len(GAMING_VALUES)} valores)")
+    if os.name == 'nt':
+        writer.apply(wo.RegistryBatch().delete_key(SCRATCH_KEY))
+
+
+def bench_profile(args):
+    """Compilar y aplicar cada perfil contra el registro en memoria y comandos simulados"""
+    library = wo.ProfileLibrary()
+    for name in library.names():
+        source = library.find(name)
+        seconds, plan = timed(library.compile, library.read(source), path.basename(source))
+        library.load(name)
+        cached = timed(library.load, name)[0]
+        for step in plan.steps:
+            # Nunca cerrar procesos ni cambiar prioridades reales desde el benchmark
+            step.kill, step.priorities = set(), {}
+        registry = wo.RegistryWriter(wo.MemoryRegistryBackend())
+        executor = wo.CommandExecutor(wo.FakeBackend())
+        planner = wo.TweakPlanner(registry, executor, wo.SystemStateReader(registry, services={}))
+        print(f"== {name}: compilación {seconds * 1000:.2f} ms, en caché {cached * 1000:.3f} ms")
+        first = plan.execute(planner, executor)
+        print(f"-- primera aplicación ({first.summary()})")
+        print(first.timings())
+        again = min((plan.execute(planner, executor) for _ in range(args.rounds)),
+                    key=lambda report: report.seconds)
+        print(f"-- ya aplicado, mejor de {args.rounds} ({again.summary()})")
+        print(again.timings())
+
+
+def system_cleanup_graph(executor):
+    """Mismos pasos y dependencias que clean_system, con comandos simulados"""
+    graph = wo.TaskGraph()
+    graph.add('registro', time.sleep, 0.05)
+    graph.add('windows.old', executor.run, 'rmdir windows.old')
+    graph.add('prefetch', executor.run, 'del prefetch')
+    graph.add('chrome', executor.run, 'rmdir chrome')
+    graph.add('edge', executor.run, 'rmdir edge')
+    graph.add('wu-stop', executor.run, 'net stop wuauserv')
+    graph.add('wu-clear', executor.run, 'rd SoftwareDistribution', after=['wu-stop'])
+    graph.add('wu-start', executor.run, 'net start wuauserv', after=['wu-clear'])
+    return graph
+
+
+def bench_dag(args):
+    """Ejecución en serie frente al planificador DAG (cada comando tarda --delay s)"""
+    executor = wo.CommandExecutor(wo.FakeBackend(delay=args.delay))
+    graph = system_cleanup_graph(executor)
+    serial = timed(lambda: [step.function(*step.args) for step in graph.steps.values()])[0]
+    trace = graph.run()
+    print(f"{'en serie':<36} {serial * 1000:8.1f} ms")
+    print(f"{'TaskGraph':<36} {trace.seconds * 1000:8.1f} ms")
+    print(trace.report())
+
+
+def bench_journal(args):
+    """Aplicar todos los perfiles con diario y deshacer cada ejecución de una vez"""
+    library = wo.ProfileLibrary()
+    with tempfile.TemporaryDirectory() as workdir:
+        journal = wo.ChangeJournal(workdir)
+        backend = wo.MemoryRegistryBackend()
+        registry = wo.RegistryWriter(backend)
+        executor = wo.CommandExecutor(wo.FakeBackend())
+        planner = wo.TweakPlanner(registry, executor, wo.SystemStateReader(registry, services={}))
+        for name in library.names():
+            plan = library.compile(library.read(library.find(name)), name)
+            for step in plan.steps:
+                step.kill, step.priorities = set(), {}
+            run = journal.begin(name)
+            seconds = timed(plan.execute, planner, executor, None, run)[0]
+            print(f"{'aplicar ' + name:<36} {seconds * 1000:8.2f} ms  ({run.changes} valores anteriores en el diario)")
+        while True:
+            source = journal.latest()
+            if source is None:
+                break
+            action = journal.load(source)[0]['action']
+            opened = backend.opened
+            seconds, restored = timed(journal.rollback, source, planner)
+            print(f"{'deshacer ' + action:<36} {seconds * 1000:8.2f} ms  "
+                  f"({restored} ajustes, {backend.opened - opened} claves abiertas)")
+
+
+def first_paint(eager):
+    """Segundos desde crear la ventana hasta que se dibuja por primera vez"""
+    import tkinter
+    start = time.perf_counter()
+    root = tkinter.Tk()
+    wo.root = root  # setup_ui usa la ventana global, igual que en el lanzador
+    app = wo.WindowsOptimizer(root)
+    if eager:
+        app.build_all_tabs()  # Comportamiento anterior: todas las pestañas al inicio
+    root.update()
+    root.wait_visibility(root)
+    root.update_idletasks()
+    seconds = time.perf_counter() - start
+    root.destroy()
+    return seconds
+
+
+def bench_startup(args):
+    """Tiempo hasta el primer dibujado construyendo todas las pestañas o solo la inicial"""
+    for name, eager in [("todas las pestañas al inicio", True),
+                        ("pestañas bajo demanda", False)]:
+        seconds = min(first_paint(eager) for _ in range(args.rounds))
+        print(f"{name:<36} {seconds * 1000:8.1f} ms")
+
+
+def bench_hardware(args):
+    """Inventario de hardware: consulta completa frente a la caché por hora de arranque"""
+    with tempfile.TemporaryDirectory() as workdir:
+        cache = path.join(workdir, 'hardware.json')
+        for label in ("sin caché", "con caché"):
+            inventory = wo.HardwareInventory(cache_path=cache)
+            seconds, data = timed(inventory.get)
+            print(f"{label + ' (' + inventory.provider.name + ')':<36} {seconds * 1000:8.2f} ms")
+        print(data)
+
+
+def bench_launcher(args):
+    """Inicio del lanzador: descifrar y compilar siempre frente a la caché de bytecode"""
+    from cryptography.fernet import Fernet
+    import bytecode_cache
+
+    cipher_suite = Fernet(Fernet.generate_key())
+    with open(wo.__file__, 'rb') as file:
+        encrypted_data = cipher_suite.encrypt(file.read())
+    with tempfile.TemporaryDirectory() as workdir:
+        cache_file = path.join(workdir, 'code.cache')
+
+        def legacy():
+            return compile(cipher_suite.decrypt(encrypted_data), '<string>', 'exec')
+
+        def cold():
+            if path.exists(cache_file):
+                os.remove(cache_file)
+            return bytecode_cache.load_code(cipher_suite, encrypted_data, cache_file)
+
+        def warm():
+            return bytecode_cache.load_code(cipher_suite, encrypted_data, cache_file)
+
+        for name, function in [("descifrar + compilar (original)", legacy),
+                               ("en frío (compila y guarda caché)", cold),
+                               ("en caliente (caché de bytecode)", warm)]:
+            seconds = min(timed(function)[0] for _ in range(args.rounds))
+            print(f"{name:<36} {seconds * 1000:8.2f} ms")
+        print(f"{len(encrypted_data) // 1024} KB cifrados, caché de {path.getsize(cache_file) // 1024} KB")
+
+
+# Módulos de Windows que el entorno simulado reemplaza en Linux
+WINDOWS_STUBS = ['wmi', 'win32api', 'win32con', 'pythoncom', 'win32com/__init__', 'win32com/client']
+HEAVY_MODULES = ['wmi', 'win32com.client', 'win32api', 'win32con', 'pythoncom', 'psutil', 'webbrowser']
+
+
+def make_stub_environment(folder, delay):
+    """Módulos de Windows falsos que tardan 'delay' segundos en importarse"""
+    for stub in WINDOWS_STUBS:
+        target = path.join(folder, stub + '.py')
+        os.makedirs(path.dirname(target), exist_ok=True)
+        with open(target, 'w') as file:
+            file.write(f"import time\ntime.sleep({delay})\n")
+    return folder
+
+
+def importtime(statement, stubs):
+    """Ejecutar statement con -X importtime; devuelve (ms totales, {módulo: ms})"""
+    env = dict(os.environ)
+    if stubs:
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [stubs, env.get('PYTHONPATH')]))
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                               cwd=path.dirname(path.abspath(__file__)), env=env,
+                               capture_output=True, text=True, check=True)
+    total, modules = 0, {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):  # Solo los imports de primer nivel
+            total += int(cumulative)
+        if name.strip() in HEAVY_MODULES:
+            modules[name.strip()] = int(cumulative) / 1000
+    return total / 1000, modules
+
+
+def bench_importtime(args):
+    """Coste de importación del lanzador y del módulo con módulos pesados anticipados o perezosos"""
+    with tempfile.TemporaryDirectory() as workdir:
+        # En Windows se miden los módulos reales; en Linux, el entorno simulado
+        stubs = None if os.name == 'nt' else make_stub_environment(workdir, args.delay)
+        eager = 'import wmi, win32com.client, win32api, win32con, pythoncom, psutil, webbrowser; '
+        for target in ('encrypted_launcher', 'windows_optimizer'):
+            for label, statement in [("anticipado", eager + f"import {target}"),
+                                     ("perezoso", f"import {target}")]:
+                total, modules = importtime(statement, stubs)
+                heavy = ', '.join(f"{name} {ms:.0f}" for name, ms in sorted(modules.items()))
+                print(f"{target + ' ' + label:<36} {total:8.1f} ms  ({heavy or 'ningún módulo pesado'})")
+
+
+def bench_estimate(args):
+    """Estimación en seco y limpieza posterior reutilizando su StatCache frente a limpiar leyendo todo"""
+    with tempfile.TemporaryDirectory() as workdir:
+        cold, warm = path.join(workdir, 'sin_cache'), path.join(workdir, 'con_cache')
+        make_tree(cold, args.files)
+        make_tree(warm, args.files)
+        seconds, estimate = timed(wo.SpaceEstimator({'temp': [warm]}).run)
+        files, logical, allocated = estimate.totals()
+        print(f"{'estimación en seco':<36} {seconds:8.2f} s  ({files} archivos, {wo.format_bytes(logical)}, "
+              f"{wo.format_bytes(allocated)} en disco)")
+        for label, folder, cache in [("limpieza leyendo los directorios", cold, None),
+                                     ("limpieza con el StatCache", warm, estimate.fresh_cache())]:
+            engine = wo.CleanupEngine([folder], cache=cache)
+            seconds, _ = timed(engine.run)
+            print(f"{label:<36} {seconds:8.2f} s  ({engine.files_removed} archivos, {wo.format_bytes(engine.bytes_removed)})")
+        print(f"{'directorios reutilizados':<36} {estimate.cache.hits:8d}     (releídos: {estimate.cache.misses})")
+
+
+def bench_index(args):
+    """Segundo análisis con el CleanupIndex: solo se leen los directorios que cambiaron"""
+    with tempfile.TemporaryDirectory() as workdir:
+        tree = make_tree(path.join(workdir, 'tree'), args.files)
+        index_path = path.join(workdir, 'cleanup.index')
+        runs = [("sin índice", None), ("primer análisis (crea el índice)", index_path),
+                ("segundo análisis", index_path), ("tras cambiar 1% de directorios", index_path)]
+        for label, index_file in runs:
+            if label.startswith("tras"):
+                directories = [root for root, _, _ in os.walk(tree)]
+                for directory in directories[::100]:
+                    with open(path.join(directory, 'nuevo.tmp'), 'wb') as file:
+                        file.write(b'x' * 512)
+            index = wo.CleanupIndex(index_file) if index_file else None
+            seconds, estimate = timed(wo.SpaceEstimator({'temp': [tree]}, index=index).run)
+            files, logical, _ = estimate.totals()
+            print(f"{label:<36} {seconds:8.2f} s  ({files} archivos, {wo.format_bytes(logical)}, "
+                  f"{estimate.unchanged}/{estimate.directories} directorios sin leer)")
+        print(f"{'tamaño del índice':<36} {wo.format_bytes(path.getsize(index_path)):>10}")
+
+
+BENCH_RULES = {'older_than_days': 7, 'smaller_than': '100 MB', 'extensions': ['tmp', 'log', 'dmp', 'etl'],
+               'exclude': ['*.crdownload', '*.part', 'desktop.ini', 'Steam/*', '*/keep_*']}
+
+
+def naive_rules(rules, now):
+    """Las mismas reglas comprobadas una a una, con fnmatch por cada glob"""
+    import fnmatch
+    cutoff = now - rules['older_than_days'] * 86400
+    limit = wo.parse_size(rules['smaller_than'], 'smaller_than')
+    extensions = ['.' + extension for extension in rules['extensions']]
+    globs = [glob.lower() for glob in rules['exclude']]
+
+    def matches(file_path, size, mtime):
+        if mtime >= cutoff or size >= limit:
+            return False
+        if path.splitext(file_path)[1].lower() not in extensions:
+            return False
+        normalized = file_path.replace(os.sep, '/').lower()
+        for glob in globs:
+            if fnmatch.fnmatch(path.basename(normalized), glob) or fnmatch.fnmatch(normalized, '*/' + glob):
+                return False
+        return True
+    return matches
+
+
+def bench_rules(args):
+    """Evaluar las reglas de limpieza por archivo: predicado compilado frente a comprobaciones sueltas"""
+    with tempfile.TemporaryDirectory() as workdir:
+        tree = make_tree(path.join(workdir, 'tree'), args.files)
+        now = time.time()
+        files = []
+        for root, _, names in os.walk(tree):
+            for i, name in enumerate(names):
+                file_path = path.join(root, name if i % 4 else name[:-4] + ('.log', '.part', '.bin')[i % 3])
+                files.append((file_path, 512 * (i + 1), now - (i % 20) * 86400))
+        compiled = wo.CleanupPolicy.from_dict(BENCH_RULES).compile(now=now)
+        naive = naive_rules(BENCH_RULES, now)
+        results = {}
+        for label, predicate in [("sin reglas", lambda file_path, size, mtime: True),
+                                 ("comprobaciones sueltas + fnmatch", naive),
+                                 ("predicado compilado", compiled)]:
+            best = None
+            for _ in range(args.rounds):
+                start = time.perf_counter()
+                matched = sum(1 for entry in files if predicate(*entry))
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            results[label] = matched
+            print(f"{label:<36} {best * 1e9 / len(files):8.0f} ns/archivo  ({matched} de {len(files)} se borrarían)")
+        assert results["predicado compilado"] == results["comprobaciones sueltas + fnmatch"], "las reglas no coinciden"
+        # Los archivos del árbol son recién creados: para la estimación vale cualquier antigüedad
+        recent = wo.CleanupPolicy.from_dict(dict(BENCH_RULES, older_than_days=0)).compile()
+        for label, policies in [("estimación sin reglas", None), ("estimación con reglas", {'temp': recent})]:
+            seconds, estimate = timed(wo.SpaceEstimator({'temp': [tree]}, policies=policies).run)
+            print(f"{label:<36} {seconds:8.2f} s  ({estimate.totals()[0]} archivos)")
+
+
+def bench_retries(args):
+    """Limpieza con fallos inyectados: archivos bloqueados un rato, sin permiso y rutas largas"""
+    faults = wo.DeleteFaults([('file_1.tmp', 'locked', 2), ('file_2.tmp', 'locked', None),
+                              ('file_3.tmp', 'permission', None), ('file_4.tmp', 'path_too_long', None)])
+    with tempfile.TemporaryDirectory() as workdir:
+        tree = make_tree(path.join(workdir, 'tree'), args.files)
+        engine = wo.CleanupEngine([tree])
+        engine.retries.base_delay = 0.05
+        retries = engine.retries
+        finish = retries.finish
+        main_pass = []
+
+        def timed_finish(token=None):
+            main_pass.append(time.perf_counter() - start)
+            return finish(token)
+        retries.finish = timed_finish
+        wo.delete_faults = faults
+        try:
+            start = time.perf_counter()
+            engine.run()
+            seconds = time.perf_counter() - start
+        finally:
+            wo.delete_faults = None
+        left = sum(len(names) for _, _, names in os.walk(tree))
+        print(f"{'pasada principal':<36} {main_pass[0]:8.2f} s  ({engine.files_removed - retries.recovered} archivos)")
+        print(f"{'total con la pasada final':<36} {seconds:8.2f} s  ({retries.recovered} recuperados de "
+              f"{retries.deferred} diferidos, {retries.retried} reintentos)")
+        print(f"{'fallos simulados':<36} {faults.injected:8d}")
+        print(f"{'archivos que quedan':<36} {left:8d}     (en el informe: {len(engine.failures)})")
+        for category, count in engine.failures.counts().items():
+            print(f"  {wo.DELETE_FAILURE_NAMES[category]:<34} {count:8d}")
+        assert left == len(engine.failures), "todo archivo que queda debe figurar en el informe"
+
+
+def bench_rmtree(args):
+    """Borrar un árbol grande (como Windows.old): shutil.rmtree frente al borrado paralelo"""
+    def parallel(tree, dir_fd):
+        wo.DIR_FD_DELETE, previous = dir_fd, wo.DIR_FD_DELETE
+        updates = []
+        try:
+            files, size = wo.delete_tree(tree, callback=lambda files, size, meter: updates.append(meter.rates()))
+        finally:
+            wo.DIR_FD_DELETE = previous
+        peak = max(updates, default=(0.0, 0.0))
+        return f"{files} archivos, pico {wo.ThroughputMeter().describe(peak)}"
+
+    variants = [("shutil.rmtree", lambda tree: shutil.rmtree(tree) or ""),
+                ("delete_tree por rutas", lambda tree: parallel(tree, False))]
+    if wo.DIR_FD_DELETE:
+        variants.append(("delete_tree con dir_fd", lambda tree: parallel(tree, True)))
+    with tempfile.TemporaryDirectory() as workdir:
+        for label, function in variants:
+            tree = make_tree(path.join(workdir, 'tree'), args.files)
+            seconds, detail = timed(function, tree)
+            assert not path.exists(tree), f"{label} dejó archivos"
+            rate = f"{args.files / seconds:,.0f}".replace(',', '.')
+            print(f"{label:<36} {seconds:8.2f} s  {rate:>10} archivos/s  {detail}")
+
+
+def legacy_tooltip(widget, text):
+    """add_tooltip anterior: un Toplevel nuevo en cada <Enter>"""
+    import tkinter
+
+    def show(event):
+        tooltip = tkinter.Toplevel()
+        tooltip.wm_overrideredirect(True)
+        tkinter.Label(tooltip, text=text).pack()
+        widget.bind('<Leave>', lambda event: tooltip.destroy())
+    widget.bind('<Enter>', show)
+
+
+def hover_storm(attach, events):
+    """Simular events pares <Enter>/<Leave> sobre 20 botones y contar las ventanas"""
+    import tkinter
+    root = tkinter.Tk()
+    ticker = wo.UiTicker(root)
+    pool = wo.TooltipPool(root, ticker, show_delay_ms=0)
+    buttons = [tkinter.Button(root, text=f"Juego {i}") for i in range(20)]
+    for button in buttons:
+        button.pack()
+        attach(pool, button, f"Tooltip de {button['text']}")
+    root.update()
+    counts = set()
+    start = time.perf_counter()
+    for i in range(events):
+        button = buttons[i % len(buttons)]
+        button.event_generate('<Enter>')
+        if i % 7 == 0:
+            button.event_generate('<Enter>')  # <Enter> repetido sin <Leave>, como al mover rápido
+        if i % 10 == 0:
+            root.update()  # De vez en cuando el tooltip llega a mostrarse
+        button.event_generate('<Leave>')
+        if i % 100 == 0:
+            root.update()
+            counts.add(sum(isinstance(child, tkinter.Toplevel) for child in root.winfo_children()))
+    seconds = time.perf_counter() - start
+    root.destroy()
+    return seconds, counts, pool
+
+
+def bench_tooltips(args):
+    """Miles de <Enter>/<Leave>: un Toplevel por evento frente a la ventana compartida"""
+    for label, attach in [("Toplevel por evento", lambda pool, widget, text: legacy_tooltip(widget, text)),
+                          ("ventana compartida", lambda pool, widget, text: pool.attach(widget, text))]:
+        seconds, counts, pool = hover_storm(attach, args.rounds)
+        print(f"{label:<36} {seconds * 1000:8.1f} ms  (ventanas vistas: {sorted(counts)})")
+    assert counts <= {0, 1} and pool.windows_created == 1, "el número de ventanas debe ser constante"
+    print(f"{'tooltips mostrados':<36} {pool.shown:8d}     (ventanas creadas: {pool.windows_created})")
+
+
+BENCHMARKS = {
+    'walker': bench_walker,
+    'registry': bench_registry,
+    'profile': bench_profile,
+    'dag': bench_dag,
+    'journal': bench_journal,
+    'startup': bench_startup,
+    'hardware': bench_hardware,
+    'launcher': bench_launcher,
+    'importtime': bench_importtime,
+    'tooltips': bench_tooltips,
+    'estimate': bench_estimate,
+    'index': bench_index,
+    'rules': bench_rules,
+    'retries': bench_retries,
+    'rmtree': bench_rmtree,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks del Windows Optimizer")
+    parser.add_argument('scenario', choices=sorted(BENCHMARKS))
+    parser.add_argument('--files', type=int, default=500000,
+                        help="Número de archivos del árbol sintético")
+    parser.add_argument('--rounds', type=int, default=5,
+                        help="Repeticiones (se informa la mejor)")
+    parser.add_argument('--delay', type=float, default=0.1,
+                        help="Duración simulada de cada comando o import (dag, importtime)")
+    args = parser.parse_args()
+    BENCHMARKS[args.scenario](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
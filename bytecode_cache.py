@@ -0,0 +1,70 @@
+"""Caché cifrada del bytecode del optimizador para el lanzador.
+
+El lanzador descifraba y compilaba todo windows_optimizer.py en cada inicio.
+Aquí se guarda el code object (marshal) cifrado y autenticado con la misma
+clave Fernet. La entrada se identifica por el hash del código cifrado y la
+versión de Python; si alguno cambia se vuelve a descifrar y compilar.
+"""
+import hashlib
+import importlib.util
+import marshal
+import os
+import sys
+
+from cryptography.fernet import InvalidToken
+
+CACHE_FORMAT = b'WOPYC1'
+
+
+def default_cache_path():
+    base = os.environ.get('LOCALAPPDATA')
+    base = os.path.join(base, 'WindowsOptimizer') if base else os.path.join(os.path.expanduser('~'), '.windows_optimizer')
+    return os.path.join(base, 'code.cache')
+
+
+def cache_key(encrypted_data):
+    """Hash del código cifrado + versión de Python y de su formato de bytecode"""
+    digest = hashlib.sha256(encrypted_data)
+    digest.update(sys.version.encode())
+    digest.update(importlib.util.MAGIC_NUMBER)
+    return digest.hexdigest().encode()
+
+
+def read_cache(cipher_suite, key, cache_file):
+    """Devolver el code object guardado o None si falta, no coincide o fue alterado"""
+    try:
+        with open(cache_file, 'rb') as file:
+            header = file.readline().rstrip(b'\n')
+            token = file.read()
+    except OSError:
+        return None
+    if header != CACHE_FORMAT + b' ' + key:
+        return None
+    try:
+        return marshal.loads(cipher_suite.decrypt(token))
+    except (InvalidToken, ValueError, EOFError, TypeError):
+        return None
+
+
+def write_cache(cipher_suite, key, code, cache_file):
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        temporary = cache_file + '.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(CACHE_FORMAT + b' ' + key + b'\n')
+            file.write(cipher_suite.encrypt(marshal.dumps(code)))
+        os.replace(temporary, cache_file)
+    except OSError:
+        pass  # Sin caché el siguiente inicio vuelve a compilar
+
+
+def load_code(cipher_suite, encrypted_data, cache_file=None):
+    """Devolver (code object, desde caché) para ejecutar con exec()"""
+    cache_file = cache_file or default_cache_path()
+    key = cache_key(encrypted_data)
+    code = read_cache(cipher_suite, key, cache_file)
+    if code is not None:
+        return code, True
+    code = compile(cipher_suite.decrypt(encrypted_data), '<string>', 'exec')
+    write_cache(cipher_suite, key, code, cache_file)
+    return code, False
@@ -1,18 +1,31 @@
-from cryptography.fernet import Fernet
-import base64
 import os
 import sys
-import tkinter as tk
-from tkinter import messagebox, ttk
-import webbrowser
-import subprocess
-import psutil
-import shutil
 import time
-import wmi
-import win32com.client
-import win32api
-import win32con
+import startup_profiler
+
+# Medición del arranque (WO_STARTUP_PROFILE=1 o --profile-startup)
+profiler = startup_profiler.current()
+
+with profiler.phase('import cryptography'):
+    from cryptography.fernet import Fernet
+with profiler.phase('import tkinter'):
+    import tkinter as tk
+    from tkinter import messagebox, ttk
+with profiler.phase('import stdlib'):
+    import base64
+    import subprocess
+    import shutil
+from bytecode_cache import load_code
+from lazy_modules import lazy_import
+
+# Módulos pesados que la mayoría de las sesiones no usan: se importan al
+# primer acceso (PyInstaller los incluye por hiddenimports)
+psutil = lazy_import('psutil')
+webbrowser = lazy_import('webbrowser')
+wmi = lazy_import('wmi')
+win32com = lazy_import('win32com', 'client')
+win32api = lazy_import('win32api')
+win32con = lazy_import('win32con')
 
 def resource_path(relative_path):
     """ Obtener la ruta absoluta al recurso """
@@ -26,22 +39,27 @@ def resource_path(relative_path):
 
 def decrypt_and_run():
     try:
-        # Lee la clave del archivo usando resource_path
-        with open(resource_path('key.txt'), 'rb') as file:
-            key = file.read()
-        
-        # Lee el código encriptado usando resource_path
-        with open(resource_path('encrypted_code.txt'), 'rb') as file:
-            encrypted_data = file.read()
-        
-        # Crear el objeto Fernet con la clave
-        cipher_suite = Fernet(key)
+        with profiler.phase('read encrypted files'):
+            # Lee la clave del archivo usando resource_path
+            with open(resource_path('key.txt'), 'rb') as file:
+                key = file.read()
+            
+            # Lee el código encriptado usando resource_path
+            with open(resource_path('encrypted_code.txt'), 'rb') as file:
+                encrypted_data = file.read()
         
-        # Desencriptar el código
-        decrypted_code = cipher_suite.decrypt(encrypted_data)
+        with profiler.phase('decrypt + compile'):
+            # Crear el objeto Fernet con la clave
+            cipher_suite = Fernet(key)
+            
+            # Desencriptar y compilar el código (o reutilizar el bytecode en caché)
+            code, cached = load_code(cipher_suite, encrypted_data)
+        if cached:
+            profiler.mark('bytecode cache hit')
         
         # Crear la ventana principal primero
-        root = tk.Tk()
+        with profiler.phase('tk root'):
+            root = tk.Tk()
         
         # Crear un namespace local para la ejecución con todas las dependencias
         namespace = {
@@ -72,10 +90,12 @@ def decrypt_and_run():
         }
         
         # Ejecutar el código desencriptado con el namespace
-        exec(decrypted_code, namespace)
+        with profiler.phase('exec module'):
+            exec(code, namespace)
         
         # Crear la instancia de WindowsOptimizer
-        app = namespace['WindowsOptimizer'](root)
+        with profiler.phase('WindowsOptimizer()'):
+            app = namespace['WindowsOptimizer'](root)
         
         # Iniciar el loop principal
         root.mainloop()
@@ -1,47 +1,60 @@
-# -*- mode: python ; coding: utf-8 -*-
-
-block_cipher = None
-
-a = Analysis(
-    ['encrypted_launcher.py'],
-    pathex=[],
-    binaries=[],
-    datas=[
-        ('key.txt', '.'),
-        ('encrypted_code.txt', '.'),
-    ],
-    hiddenimports=['cryptography', 'wmi', 'win32com.client', 'win32api', 'win32con', 'psutil'],
-    hookspath=[],
-    hooksconfig={},
-    runtime_hooks=[],
-    excludes=[],
-    win_no_prefer_redirects=False,
-    win_private_assemblies=False,
-    cipher=block_cipher,
-    noarchive=False
-)
-
-pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
-
-exe = EXE(
-    pyz,
-    a.scripts,
-    a.binaries,
-    a.zipfiles,
-    a.datas,
-    [],
-    name='Windows Optimizer',
-    debug=False,
-    bootloader_ignore_signals=False,
-    strip=False,
-    upx=True,
-    upx_exclude=[],
-    runtime_tmpdir=None,
-    console=False,
-    disable_windowed_traceback=False,
-    target_arch=None,
-    codesign_identity=None,
-    entitlements_file=None,
-    uac_admin=True,
-    icon='C:\\Users\\Agustin\\Desktop\\windows optimizer\\icon.ico'
+# -*- mode: python ; coding: utf-8 -*-
+
+import sys
+
+sys.path.insert(0, SPECPATH)
+from encryptor import payload_matches
+
+# El código cifrado se empaqueta tal cual: no construir con un encrypted_code.txt viejo
+if not payload_matches(SPECPATH):
+    raise SystemExit("encrypted_code.txt no coincide con windows_optimizer.py: ejecuta python encryptor.py")
+
+block_cipher = None
+
+a = Analysis(
+    ['encrypted_launcher.py'],
+    pathex=[],
+    binaries=[],
+    datas=[
+        ('key.txt', '.'),
+        ('encrypted_code.txt', '.'),
+        ('profiles', 'profiles'),
+    ],
+    # windows_optimizer.py llega cifrado, así que PyInstaller no ve sus imports
+    hiddenimports=['cryptography', 'wmi', 'win32com.client', 'win32api', 'win32con', 'pythoncom', 'psutil', 'webbrowser',
+                   'fnmatch', 'errno', 'heapq', 'zlib', 'queue', 'json', 're', 'tomllib',
+                   'concurrent.futures'],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=[],
+    win_no_prefer_redirects=False,
+    win_private_assemblies=False,
+    cipher=block_cipher,
+    noarchive=False
+)
+
+pyz = PYZ(a.pure, a.zipped_data, cipher=block_cipher)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    a.binaries,
+    a.zipfiles,
+    a.datas,
+    [],
+    name='Windows Optimizer',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=True,
+    upx_exclude=[],
+    runtime_tmpdir=None,
+    console=False,
+    disable_windowed_traceback=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    uac_admin=True,
+    icon='C:\\Users\\Agustin\\Desktop\\windows optimizer\\icon.ico'
 ) 
\ No newline at end of file
@@ -1,27 +1,62 @@
-from cryptography.fernet import Fernet
-import base64
-
-def encrypt_code():
-    # Generar una nueva clave
-    key = Fernet.generate_key()
-    cipher_suite = Fernet(key)
-    
-    # Leer el código original
-    with open('windows_optimizer.py', 'r', encoding='utf-8') as file:
-        code = file.read()
-    
-    # Encriptar el código
-    encrypted_code = cipher_suite.encrypt(code.encode())
-    
-    # Guardar la clave y el código encriptado
-    with open('key.txt', 'wb') as file:
-        file.write(key)
-    
-    with open('encrypted_code.txt', 'wb') as file:
-        file.write(encrypted_code)
-    
-    print(f"Clave generada: {key.decode()}")
-    print("Código encriptado guardado en 'encrypted_code.txt'")
-
-if __name__ == "__main__":
-    encrypt_code() 
\ No newline at end of file
+from cryptography.fernet import Fernet, InvalidToken
+import base64
+import os
+import sys
+
+SOURCE = 'windows_optimizer.py'
+KEY_FILE = 'key.txt'
+PAYLOAD_FILE = 'encrypted_code.txt'
+
+
+def load_or_create_key(base='.'):
+    """Reutilizar key.txt si existe; si no, generar una clave nueva"""
+    key_path = os.path.join(base, KEY_FILE)
+    if os.path.exists(key_path):
+        with open(key_path, 'rb') as file:
+            return file.read().strip()
+    key = Fernet.generate_key()
+    with open(key_path, 'wb') as file:
+        file.write(key)
+    return key
+
+
+def encrypt_code(base='.'):
+    key = load_or_create_key(base)
+    cipher_suite = Fernet(key)
+    
+    # Leer el código original
+    with open(os.path.join(base, SOURCE), 'r', encoding='utf-8') as file:
+        code = file.read()
+    
+    # Encriptar el código
+    encrypted_code = cipher_suite.encrypt(code.encode())
+    
+    with open(os.path.join(base, PAYLOAD_FILE), 'wb') as file:
+        file.write(encrypted_code)
+    
+    print(f"Clave usada: {key.decode()}")
+    print(f"Código encriptado guardado en '{PAYLOAD_FILE}'")
+
+
+def payload_matches(base='.'):
+    """True si encrypted_code.txt descifrado con key.txt es igual a windows_optimizer.py"""
+    try:
+        with open(os.path.join(base, KEY_FILE), 'rb') as file:
+            cipher_suite = Fernet(file.read().strip())
+        with open(os.path.join(base, PAYLOAD_FILE), 'rb') as file:
+            decrypted = cipher_suite.decrypt(file.read())
+        with open(os.path.join(base, SOURCE), 'r', encoding='utf-8') as file:
+            return decrypted.decode('utf-8') == file.read()
+    except (OSError, ValueError, InvalidToken):  # UnicodeDecodeError es un ValueError
+        return False
+
+
+if __name__ == "__main__":
+    # python encryptor.py --check: falla si el código cifrado no coincide con windows_optimizer.py
+    if '--check' in sys.argv[1:]:
+        if not payload_matches():
+            print(f"'{PAYLOAD_FILE}' no coincide con '{SOURCE}': ejecuta python encryptor.py")
+            sys.exit(1)
+        print(f"'{PAYLOAD_FILE}' está al día")
+    else:
+        encrypt_code()
@@ -0,0 +1,60 @@
+"""Módulos perezosos: el import real ocurre en el primer acceso a un atributo.
+
+wmi, win32com.client, win32api, win32con, psutil y webbrowser se usan solo
+en algunas acciones; con un proxy el lanzador y windows_optimizer.py no
+pagan su importación al arrancar. Si el módulo no está instalado, el
+ImportError aparece al usarlo y no al iniciar la aplicación.
+"""
+import importlib
+import sys
+import threading
+import types
+
+_lock = threading.RLock()
+
+
+class LazyModule(types.ModuleType):
+    """Proxy de un módulo; submodules se importan junto con él (p. ej. win32com.client)"""
+
+    def __init__(self, name, *submodules):
+        super().__init__(name)
+        self.__dict__['_lazy_submodules'] = submodules
+        self.__dict__['_lazy_module'] = None
+
+    def _lazy_load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with _lock:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    for submodule in self.__dict__['_lazy_submodules']:
+                        importlib.import_module(f"{self.__name__}.{submodule}")
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    @property
+    def lazy_loaded(self):
+        return self.__dict__['_lazy_module'] is not None
+
+    def __getattr__(self, attribute):
+        # Solo se llama para atributos que el proxy no tiene
+        return getattr(self._lazy_load(), attribute)
+
+    def __setattr__(self, attribute, value):
+        setattr(self._lazy_load(), attribute, value)
+
+    def __dir__(self):
+        return dir(self._lazy_load())
+
+    def __repr__(self):
+        state = 'cargado' if self.lazy_loaded else 'sin cargar'
+        return f"<módulo perezoso '{self.__name__}' ({state})>"
+
+
+def lazy_import(name, *submodules):
+    """Devolver el módulo si ya está importado, o un proxy que lo importará al usarlo"""
+    module = sys.modules.get(name)
+    if module is not None and all(f"{name}.{submodule}" in sys.modules for submodule in submodules):
+        return module
+    return LazyModule(name, *submodules)
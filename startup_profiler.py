@@ -0,0 +1,218 @@
+"""Medición por fases del arranque (lanzador y WindowsOptimizer.__init__).
+
+Se activa con la variable de entorno WO_STARTUP_PROFILE=1 (o una ruta .json)
+o con el argumento --profile-startup[=ruta]. WO_STARTUP_CPROFILE=1 o
+--profile-startup-cprofile guardan además un volcado de cProfile por fase.
+
+El informe JSON indica cuándo empezó y cuánto duró cada fase, en ms desde
+la creación del proceso, así que el tiempo de extracción de PyInstaller
+aparece como la fase 'bootstrap'. Para comparar dos informes:
+
+    python startup_profiler.py antes.json despues.json
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+ENV_FLAG = 'WO_STARTUP_PROFILE'
+ENV_CPROFILE = 'WO_STARTUP_CPROFILE'
+CLI_FLAG = '--profile-startup'
+CLI_CPROFILE = '--profile-startup-cprofile'
+
+_NO_PHASE = nullcontext()
+
+
+def default_report_path():
+    base = os.environ.get('LOCALAPPDATA')
+    base = os.path.join(base, 'WindowsOptimizer') if base else os.path.join(os.path.expanduser('~'), '.windows_optimizer')
+    return os.path.join(base, 'startup', time.strftime('startup-%Y%m%d-%H%M%S.json'))
+
+
+def process_start_time():
+    """Hora de creación del proceso (incluye la extracción de PyInstaller)"""
+    try:
+        import psutil
+        return psutil.Process().create_time()
+    except Exception:
+        return None
+
+
+class StartupProfiler:
+    def __init__(self, enabled=False, output=None, cprofile=False):
+        self.enabled = enabled
+        self.output = output or default_report_path()
+        self.cprofile = cprofile
+        self.origin = time.perf_counter()
+        self.origin_wall = time.time()
+        self.phases = []
+        self.marks = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._registered = False
+
+    @classmethod
+    def from_environment(cls, argv=None):
+        argv = sys.argv if argv is None else argv
+        output = os.environ.get(ENV_FLAG)
+        enabled = bool(output) and output != '0'
+        for arg in argv[1:]:
+            if arg == CLI_FLAG:
+                enabled = True
+            elif arg.startswith(CLI_FLAG + '='):
+                enabled, output = True, arg.split('=', 1)[1]
+        cprofile = os.environ.get(ENV_CPROFILE, '0') != '0' or CLI_CPROFILE in argv
+        if output in (None, '', '1'):
+            output = None
+        return cls(enabled=enabled or cprofile, output=output, cprofile=cprofile)
+
+    def _now_ms(self):
+        return (time.perf_counter() - self.origin) * 1000
+
+    def phase(self, name):
+        """Context manager que mide una fase (no hace nada si está desactivado)"""
+        if not self.enabled:
+            return _NO_PHASE
+        return self._phase(name)
+
+    @contextmanager
+    def _phase(self, name):
+        depth = getattr(self._local, 'depth', 0)
+        profile = None
+        # cProfile no admite perfiles anidados: solo las fases de primer nivel
+        if self.cprofile and depth == 0 and threading.current_thread() is threading.main_thread():
+            import cProfile
+            profile = cProfile.Profile()
+        self._local.depth = depth + 1
+        start = self._now_ms()
+        if profile is not None:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+            end = self._now_ms()
+            self._local.depth = depth
+            entry = {'name': name, 'start_ms': round(start, 3), 'duration_ms': round(end - start, 3),
+                     'depth': depth, 'thread': threading.current_thread().name}
+            with self._lock:
+                self.phases.append(entry)
+                if profile is not None:
+                    entry['profile'] = self._dump(profile, len(self.phases), name)
+
+    def _dump(self, profile, index, name):
+        directory = os.path.splitext(self.output)[0] + '-cprofile'
+        safe = ''.join(char if char.isalnum() else '_' for char in name)
+        target = os.path.join(directory, f"{index:02d}-{safe}.prof")
+        try:
+            os.makedirs(directory, exist_ok=True)
+            profile.dump_stats(target)
+            return target
+        except OSError:
+            return None
+
+    def mark(self, name):
+        """Registrar un instante (p. ej. el primer dibujado de la ventana)"""
+        if self.enabled:
+            with self._lock:
+                self.marks.setdefault(name, round(self._now_ms(), 3))
+
+    def watch_first_paint(self, root):
+        """Marcar 'first_paint' cuando la ventana se muestra y escribir el informe"""
+        if not self.enabled:
+            return
+
+        def on_map(event):
+            if event.widget is root and 'first_paint' not in self.marks:
+                root.after_idle(self._first_paint)
+        root.bind('<Map>', on_map, add='+')
+
+    def _first_paint(self):
+        self.mark('first_paint')
+        self.write()
+
+    def report(self):
+        start = process_start_time()
+        bootstrap = max(0.0, (self.origin_wall - start) * 1000) if start else 0.0
+        with self._lock:
+            phases = [dict(phase, start_ms=round(phase['start_ms'] + bootstrap, 3))
+                      for phase in sorted(self.phases, key=lambda phase: phase['start_ms'])]
+            marks = {name: round(value + bootstrap, 3) for name, value in self.marks.items()}
+        phases.insert(0, {'name': 'bootstrap', 'start_ms': 0.0, 'duration_ms': round(bootstrap, 3),
+                          'depth': 0, 'thread': 'MainThread'})
+        return {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.origin_wall)),
+            'python': sys.version.split()[0],
+            'frozen': bool(getattr(sys, 'frozen', False)),
+            'phases': phases,
+            'marks': marks,
+            'total_ms': round(bootstrap + self._now_ms(), 3)
+        }
+
+    def write(self):
+        """Escribir el informe JSON (se vuelve a escribir al salir con las fases tardías)"""
+        if not self.enabled:
+            return None
+        if not self._registered:
+            self._registered = True
+            atexit.register(self.write)
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.output)), exist_ok=True)
+            with open(self.output, 'w', encoding='utf-8') as file:
+                json.dump(self.report(), file, ensure_ascii=False, indent=2)
+            return self.output
+        except OSError:
+            return None
+
+
+_current = None
+_current_lock = threading.Lock()
+
+
+def current():
+    """Perfilador del proceso, configurado una sola vez desde el entorno y argv"""
+    global _current
+    with _current_lock:
+        if _current is None:
+            _current = StartupProfiler.from_environment()
+        return _current
+
+
+def compare(old, new, threshold_ms=5.0):
+    """Líneas con las fases cuya duración cambió más que threshold_ms"""
+    def durations(report):
+        totals = {}
+        for phase in report['phases']:
+            totals[phase['name']] = totals.get(phase['name'], 0.0) + phase['duration_ms']
+        return totals
+
+    before, after = durations(old), durations(new)
+    lines = []
+    for name in list(before) + [name for name in after if name not in before]:
+        delta = after.get(name, 0.0) - before.get(name, 0.0)
+        if abs(delta) >= threshold_ms:
+            lines.append(f"{name:<32} {before.get(name, 0.0):9.1f} → {after.get(name, 0.0):9.1f} ms  ({delta:+.1f})")
+    for name in sorted(set(old.get('marks', {})) | set(new.get('marks', {}))):
+        lines.append(f"{name:<32} {old.get('marks', {}).get(name, 0.0):9.1f} → {new.get('marks', {}).get(name, 0.0):9.1f} ms")
+    lines.append(f"{'total':<32} {old['total_ms']:9.1f} → {new['total_ms']:9.1f} ms  ({new['total_ms'] - old['total_ms']:+.1f})")
+    return lines
+
+
+def main(argv):
+    if len(argv) != 3:
+        print(__doc__)
+        return 2
+    reports = []
+    for report_path in argv[1:]:
+        with open(report_path, encoding='utf-8') as file:
+            reports.append(json.load(file))
+    print("\n".join(compare(*reports)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
@@ -0,0 +1,238 @@
+"""Motor de limpieza, reintentos, StatCache, CleanupIndex y CleanupPolicy sobre un árbol temporal"""
+import os
+
+import pytest
+
+import windows_optimizer as wo
+
+
+def make_tree(root, files):
+    """Crear files ({ruta relativa: bytes}) bajo root y devolver root como texto"""
+    for relative, size in files.items():
+        target = root / relative
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(b'x' * size)
+    return str(root)
+
+
+def rewrite(file_path, size):
+    """Cambiar el contenido sin crear ni borrar nada: la fecha del directorio no cambia"""
+    with open(file_path, 'r+b') as file:
+        file.truncate(0)
+        file.write(b'y' * size)
+
+
+@pytest.fixture
+def faults(monkeypatch):
+    def install(*rules):
+        monkeypatch.setattr(wo, 'delete_faults', wo.DeleteFaults(rules))
+        return wo.delete_faults
+    return install
+
+
+def fast_retries(engine):
+    engine.retries.base_delay = 0.01
+    engine.retries.max_delay = 0.02
+    return engine
+
+
+def test_engine_empties_each_root_with_its_own_stats(tmp_path):
+    first = make_tree(tmp_path / 'a', {'1.tmp': 10, 'sub/2.tmp': 20, 'sub/deep/3.tmp': 30})
+    second = make_tree(tmp_path / 'b', {'4.log': 5})
+
+    engine = wo.CleanupEngine([first, second, None, str(tmp_path / 'missing')], max_workers=4)
+    stats = engine.run()
+
+    assert list(stats) == [first, second]
+    assert (stats[first]['files'], stats[first]['bytes']) == (3, 60)
+    assert (stats[second]['files'], stats[second]['bytes']) == (1, 5)
+    assert engine.files_removed == 4 and engine.bytes_removed == 65
+    assert os.listdir(first) == [] and os.listdir(second) == []
+    assert len(engine.failures) == 0
+
+
+def test_engine_removes_links_without_following_them(tmp_path):
+    outside = make_tree(tmp_path / 'outside', {'keep.txt': 7})
+    root = make_tree(tmp_path / 'root', {'file.tmp': 1})
+    try:
+        os.symlink(outside, os.path.join(root, 'link'))
+    except (OSError, NotImplementedError):
+        pytest.skip("no se pueden crear enlaces simbólicos")
+
+    wo.CleanupEngine([root]).run()
+
+    assert os.listdir(root) == []
+    assert os.listdir(outside) == ['keep.txt']
+
+
+def test_engine_keeps_files_rejected_by_policy(tmp_path):
+    root = make_tree(tmp_path / 'root', {'a.tmp': 1, 'b.log': 1, 'sub/c.tmp': 1})
+    policy = wo.CleanupPolicy(extensions=['tmp']).compile()
+
+    stats = wo.CleanupEngine([root], policy=policy).run()
+
+    assert stats[root]['files'] == 2 and stats[root]['kept'] == 1
+    assert os.listdir(root) == ['b.log']
+
+
+def test_locked_files_are_retried_and_permanent_failures_reported(tmp_path, faults):
+    root = make_tree(tmp_path / 'root', {'busy.log': 3, 'sub/denied.dat': 4, 'sub/ok.tmp': 5})
+    injected = faults(('*.log', 'locked', 2), ('*.dat', 'permission', None))
+
+    engine = fast_retries(wo.CleanupEngine([root]))
+    stats = engine.run()
+
+    assert stats[root]['recovered'] == 1
+    assert stats[root]['files'] == 2 and stats[root]['bytes'] == 8
+    assert stats[root]['errors'] == 1  # Solo cuenta lo que siguió fallando
+    assert engine.failures.counts() == {'permission': 1}
+    assert engine.failures.paths['permission'] == [os.path.join(root, 'sub', 'denied.dat')]
+    assert os.listdir(root) == ['sub'] and os.listdir(os.path.join(root, 'sub')) == ['denied.dat']
+    assert injected.injected >= 3
+    assert 'Sin permiso: 1' in engine.failures.summary()
+
+
+def test_retry_queue_removes_parents_emptied_by_a_retry(tmp_path, faults):
+    root = make_tree(tmp_path / 'root', {'sub/busy.log': 2})
+    busy = os.path.join(root, 'sub', 'busy.log')
+    faults(('busy.log', 'locked', 1))
+
+    retries = wo.DeleteRetryQueue([root], base_delay=0.01)
+    with pytest.raises(OSError) as error:
+        wo.remove_path(busy)
+    assert retries.add(busy, 2, error.value) == 'locked'
+    failures = retries.finish()
+
+    assert len(failures) == 0
+    assert (retries.recovered, retries.recovered_bytes) == (1, 2)
+    assert os.listdir(root) == []
+
+
+def test_missing_file_is_not_a_failure(tmp_path):
+    retries = wo.DeleteRetryQueue([str(tmp_path)])
+    assert retries.add(str(tmp_path / 'gone'), 0, FileNotFoundError(2, 'No existe')) is None
+    assert len(retries.finish()) == 0
+
+
+def test_cached_listing_is_restated_before_deleting(tmp_path):
+    root = make_tree(tmp_path / 'root', {'grew.bin': 10, 'shrank.bin': 500, 'sub/same.bin': 500})
+    estimate = wo.SpaceEstimator({'temp': [root]}).run()
+    assert len(estimate.cache) == 2
+
+    # El archivo cambia pero su directorio no: el listado guardado sigue siendo válido
+    rewrite(os.path.join(root, 'grew.bin'), 500)
+    rewrite(os.path.join(root, 'shrank.bin'), 10)
+
+    cache = estimate.fresh_cache()
+    policy = wo.CleanupPolicy(larger_than=100).compile()
+    engine = wo.CleanupEngine([root], cache=cache, policy=policy)
+    stats = engine.run()
+
+    assert cache.hits == 2 and cache.misses == 0
+    assert stats[root]['files'] == 2 and stats[root]['bytes'] == 1000
+    assert os.listdir(root) == ['shrank.bin']
+
+
+def test_changed_directory_is_read_again(tmp_path):
+    root = make_tree(tmp_path / 'root', {'old.tmp': 1})
+    estimate = wo.SpaceEstimator({'temp': [root]}).run()
+    make_tree(tmp_path / 'root', {'new.tmp': 1})
+    os.utime(root, ns=(0, 0))
+
+    cache = estimate.fresh_cache()
+    stats = wo.CleanupEngine([root], cache=cache).run()
+
+    assert cache.misses == 1
+    assert stats[root]['files'] == 2
+
+
+def test_index_round_trip(tmp_path):
+    root = make_tree(tmp_path / 'root', {'a.tmp': 10, 'sub/b.log': 20, 'sub/deep/c.log': 30})
+    index_path = str(tmp_path / 'data' / 'cleanup.index')
+    first = wo.SpaceEstimator({'temp': [root]}, index=wo.CleanupIndex(index_path)).run()
+    assert first.unchanged == 0
+
+    index = wo.CleanupIndex(index_path)
+    assert len(index) == 3
+    second = wo.SpaceEstimator({'temp': [root]}, index=index).run()
+
+    assert second.unchanged == second.directories == 3
+    assert second.totals() == first.totals()
+    assert second.type_totals() == first.type_totals()
+    assert index.hits == 3
+
+
+def test_index_rereads_changed_and_forgets_removed_directories(tmp_path):
+    root = make_tree(tmp_path / 'root', {'sub/a.tmp': 10, 'gone/b.tmp': 20})
+    index_path = str(tmp_path / 'cleanup.index')
+    wo.SpaceEstimator({'temp': [root]}, index=wo.CleanupIndex(index_path)).run()
+
+    make_tree(tmp_path / 'root', {'sub/new.tmp': 5})
+    for name in os.listdir(os.path.join(root, 'gone')):
+        os.unlink(os.path.join(root, 'gone', name))
+    os.rmdir(os.path.join(root, 'gone'))
+    for directory in (root, os.path.join(root, 'sub')):
+        os.utime(directory, ns=(0, 0))  # Sin depender de la resolución de fechas del sistema de archivos
+
+    index = wo.CleanupIndex(index_path)
+    estimate = wo.SpaceEstimator({'temp': [root]}, index=index).run()
+    assert estimate.totals()[:2] == (2, 15)
+    assert estimate.unchanged == 0
+
+    assert set(wo.CleanupIndex(index_path).load()) == {root, os.path.join(root, 'sub')}
+
+
+def test_corrupt_index_is_ignored(tmp_path):
+    index_path = tmp_path / 'cleanup.index'
+    index_path.write_bytes(b'WOIDX1\nno es zlib')
+    assert wo.CleanupIndex(str(index_path)).load() == {}
+
+
+def test_policy_matching():
+    sep = os.sep
+    policy = wo.CleanupPolicy(extensions=['TMP', '.log'], exclude=['*.keep.tmp', 'Desktop.ini', 'Juegos/*']).compile()
+    assert policy(f'{sep}a{sep}file.tmp', 0, 0)
+    assert policy(f'{sep}a{sep}FILE.LOG', 0, 0)
+    assert not policy(f'{sep}a{sep}file.txt', 0, 0)
+    assert not policy(f'{sep}a{sep}b.keep.tmp', 0, 0)
+    assert not policy(f'{sep}a{sep}Juegos{sep}save.tmp', 0, 0)
+    assert policy(f'{sep}Juegos{sep}sub{sep}save.tmp', 0, 0)
+    assert not policy.needs_stat
+
+
+def test_policy_size_and_age_rules():
+    now = 1_000_000_000
+    policy = wo.CleanupPolicy.from_dict({'older_than_days': 7, 'larger_than': '1 KB', 'smaller_than': 4096}).compile(now=now)
+    old = now - 8 * 86400
+    assert policy('file', 2048, old)
+    assert not policy('file', 1024, old)
+    assert not policy('file', 4096, old)
+    assert not policy('file', 2048, now - 6 * 86400)
+    assert policy.needs_stat
+
+    boot = wo.CleanupPolicy(not_modified_this_boot=True).compile(boot_time=now)
+    assert boot('file', 0, now - 1) and not boot('file', 0, now + 1)
+
+
+@pytest.mark.parametrize('rules', [
+    {'older_than_days': -1},
+    {'larger_than': 'mucho'},
+    {'extensions': 'tmp'},
+    {'exclude': ['']},
+    {'desconocida': 1},
+    [],
+])
+def test_invalid_rules_raise(rules):
+    with pytest.raises(wo.CleanupRuleError):
+        wo.CleanupPolicy.from_dict(rules, 'temp')
+
+
+def test_cleanup_rules_file_replaces_defaults(tmp_path):
+    rules_path = tmp_path / 'cleanup_rules.json'
+    rules_path.write_text('{"downloads": {}, "temp": {"extensions": ["tmp"]}}', encoding='utf-8')
+    policies = wo.load_cleanup_policies(str(rules_path))
+    assert set(policies) == {'temp'}
+
+    rules_path.write_text('[]', encoding='utf-8')
+    with pytest.raises(wo.CleanupRuleError):
+        wo.load_cleanup_policies(str(rules_path))
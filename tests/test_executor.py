@@ -0,0 +1,75 @@
+"""CommandExecutor con FakeBackend y SubprocessBackend: timeout, cancelación y orden de run_many"""
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+import windows_optimizer as wo
+
+
+def test_timeout_kills_command_and_marks_result():
+    executor = wo.CommandExecutor()
+    command = f'"{sys.executable}" -c "import time; time.sleep(30)"'
+    start = time.perf_counter()
+    result = executor.run(command, timeout=0.5)
+    assert time.perf_counter() - start < 10
+    assert result.timed_out
+    assert not result.ok
+    assert executor.history == [result]
+
+
+@pytest.mark.skipif(os.name == 'nt', reason="usa la sintaxis de sh")
+def test_timeout_does_not_wait_for_children_holding_the_pipes():
+    start = time.perf_counter()
+    returncode, stdout, _, timed_out = wo.SubprocessBackend().run('sleep 30; echo done', timeout=0.5)
+    assert time.perf_counter() - start < 10
+    assert timed_out
+    assert 'done' not in stdout
+
+
+def test_cancel_marks_running_command_as_cancelled():
+    executor = wo.CommandExecutor(wo.FakeBackend(delay=5))
+    token = wo.CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    start = time.perf_counter()
+    result = executor.run('chkdsk C: /f', token=token)
+    assert time.perf_counter() - start < 2
+    assert result.cancelled
+    assert not result.ok
+
+
+def test_cancelled_token_skips_pending_commands():
+    backend = wo.FakeBackend()
+    executor = wo.CommandExecutor(backend)
+    token = wo.CancelToken()
+    token.cancel()
+    results = executor.run_many(['ipconfig /flushdns', ('sc config "a" start=disabled', 'net stop "a"')], token=token)
+    assert backend.calls == []
+    assert results[0].cancelled
+    assert all(result.cancelled for result in results[1])
+
+
+def test_command_that_finished_before_cancel_is_not_cancelled():
+    executor = wo.CommandExecutor(wo.FakeBackend())
+    token = wo.CancelToken()
+    result = executor.run('ipconfig /flushdns', token=token)
+    token.cancel()
+    assert result.ok and not result.cancelled
+
+
+def test_run_many_keeps_input_order_and_sequences_tuples():
+    backend = wo.FakeBackend(responses={'fail': (3, '', 'error')}, delay=0.01)
+    executor = wo.CommandExecutor(backend, max_concurrency=4)
+    commands = [f'cmd {index}' for index in range(10)]
+    commands.insert(3, ('step 1', 'fail step 2', 'step 3'))
+    finished = []
+    results = executor.run_many(commands, callback=lambda index, result: finished.append(index))
+
+    assert sorted(finished) == list(range(len(commands)))
+    assert [result.command for result in results[:3]] == ['cmd 0', 'cmd 1', 'cmd 2']
+    assert [result.command for result in results[3]] == ['step 1', 'fail step 2', 'step 3']
+    assert [result.returncode for result in results[3]] == [0, 3, 0]
+    steps = [call for call in backend.calls if 'step' in call]
+    assert steps == ['step 1', 'fail step 2', 'step 3']
@@ -0,0 +1,142 @@
+"""ChangeJournal.rollback con MemoryRegistryBackend y FakeBackend"""
+import pytest
+
+import windows_optimizer as wo
+
+KEY = "HKCU\\Software\\WindowsOptimizerTest"
+SERVICE = "SysMain"
+
+
+class FailingRegistryBackend(wo.MemoryRegistryBackend):
+    """Registro en memoria cuyas escrituras fallan mientras fail sea True"""
+
+    def __init__(self):
+        super().__init__()
+        self.fail = False
+
+    def write_key(self, hive, key, values):
+        if self.fail:
+            raise PermissionError(5, "Acceso denegado")
+        super().write_key(hive, key, values)
+
+
+@pytest.fixture
+def setup(tmp_path):
+    backend = FailingRegistryBackend()
+    registry = wo.RegistryWriter(backend)
+    commands = wo.FakeBackend()
+    executor = wo.CommandExecutor(commands)
+    planner = wo.TweakPlanner(registry, executor, wo.SystemStateReader(registry, services={SERVICE: True}))
+    journal = wo.ChangeJournal(str(tmp_path))
+    registry.apply(wo.RegistryBatch().set(KEY, 'Value', 1))
+    return journal, planner, backend, commands
+
+
+def current_value(backend):
+    return backend.read_values('HKCU', KEY.split('\\', 1)[1], ['Value'])['Value']
+
+
+def apply_value(planner, run, data):
+    planner.apply(planner.plan(registry=wo.RegistryBatch().set(KEY, 'Value', data)), journal=run)
+
+
+def test_rollback_restores_first_old_value(setup):
+    journal, planner, backend, _ = setup
+    run = journal.begin('prueba')
+    apply_value(planner, run, 2)
+    apply_value(planner, run, 3)
+    assert current_value(backend) == (wo.REG_DWORD, 3)
+
+    restored = journal.rollback(journal.latest(), planner)
+    assert restored == 1
+    assert current_value(backend) == (wo.REG_DWORD, 1)
+    assert journal.load(run.source)[2]
+    assert journal.latest() is None
+
+
+def test_rollback_restores_services(setup):
+    journal, planner, _, commands = setup
+    planner.registry.apply(wo.RegistryBatch().set(f"{wo.SERVICES_KEY}\\{SERVICE}", 'Start', 2))
+    run = journal.begin('servicios')
+    planner.apply(planner.plan(services={SERVICE: 'disabled'}), journal=run)
+    commands.calls.clear()
+
+    journal.rollback(run.source, planner)
+    assert 'net start "SysMain"' in commands.calls
+    assert 'sc config "SysMain" start=auto' in commands.calls
+
+
+def test_failed_registry_write_keeps_run_undoable(setup):
+    journal, planner, backend, _ = setup
+    run = journal.begin('prueba')
+    apply_value(planner, run, 2)
+
+    backend.fail = True
+    with pytest.raises(wo.RollbackError) as error:
+        journal.rollback(run.source, planner)
+    assert error.value.failures
+    assert not journal.load(run.source)[2]
+    assert journal.latest() == run.source
+
+    backend.fail = False
+    assert journal.rollback(run.source, planner) == 1
+    assert current_value(backend) == (wo.REG_DWORD, 1)
+    assert journal.load(run.source)[2]
+
+
+def set_start(planner, start=2):
+    planner.registry.apply(wo.RegistryBatch().set(f"{wo.SERVICES_KEY}\\{SERVICE}", 'Start', start))
+
+
+def test_failed_command_keeps_run_undoable(setup):
+    journal, planner, _, commands = setup
+    set_start(planner)
+    run = journal.begin('servicios')
+    planner.apply(planner.plan(services={SERVICE: 'disabled'}), journal=run)
+
+    commands.responses['net start'] = (2, '', 'El servicio no se pudo iniciar')
+    with pytest.raises(wo.RollbackError) as error:
+        journal.rollback(run.source, planner)
+    assert any('net start' in failure for failure in error.value.failures)
+    assert journal.latest() == run.source
+
+    del commands.responses['net start']
+    journal.rollback(run.source, planner)
+    assert journal.latest() is None
+
+
+def test_failed_service_commands_are_not_journaled(setup):
+    journal, planner, _, commands = setup
+    set_start(planner)
+    commands.responses['sc config'] = (1060, '', 'El servicio especificado no existe')
+    commands.responses['net stop'] = (2, '', 'El servicio no se ha iniciado')
+    run = journal.begin('servicios')
+    planner.apply(planner.plan(services={SERVICE: 'disabled'}), journal=run)
+
+    assert run.changes == 0
+    assert journal.latest() is None
+
+
+def test_unknown_service_is_not_restarted(setup):
+    journal, planner, _, commands = setup
+    planner.state.services = {}
+    set_start(planner)
+    run = journal.begin('servicios')
+    planner.apply(planner.plan(services={SERVICE: 'disabled'}), journal=run)
+    assert 'net stop "SysMain"' not in commands.calls
+    commands.calls.clear()
+
+    journal.rollback(run.source, planner)
+    assert commands.calls == ['sc config "SysMain" start=auto']
+
+
+def test_already_started_service_counts_as_restored(setup):
+    journal, planner, _, commands = setup
+    set_start(planner)
+    run = journal.begin('servicios')
+    planner.apply(planner.plan(services={SERVICE: 'disabled'}), journal=run)
+
+    commands.responses['net start'] = (2, 'El servicio solicitado ya ha sido iniciado.\n\n'
+                                          'Puede obtener más ayuda con el comando NET HELPMSG 2182.', '')
+    journal.rollback(run.source, planner)
+    assert journal.latest() is None
@@ -0,0 +1,108 @@
+"""TweakPlanner con MemoryRegistryBackend y FakeBackend"""
+import pytest
+
+import windows_optimizer as wo
+
+KEY = "HKCU\\Software\\WindowsOptimizerTest"
+
+
+class FailingRegistryBackend(wo.MemoryRegistryBackend):
+    def write_key(self, hive, key, values):
+        raise PermissionError(5, "Acceso denegado")
+
+
+@pytest.fixture
+def commands():
+    return wo.FakeBackend()
+
+
+def make_planner(backend, commands, services=None):
+    registry = wo.RegistryWriter(backend)
+    state = wo.SystemStateReader(registry, services=services or {})
+    return wo.TweakPlanner(registry, wo.CommandExecutor(commands), state)
+
+
+def test_plan_only_contains_changed_values(commands):
+    backend = wo.MemoryRegistryBackend()
+    planner = make_planner(backend, commands)
+    planner.registry.apply(wo.RegistryBatch().set(KEY, 'Same', 1).set(KEY, 'Changed', 1))
+
+    wanted = wo.RegistryBatch().set(KEY, 'Same', 1).set(KEY, 'Changed', 2).set(KEY, 'Text', 'hola', 'REG_SZ')
+    plan = planner.plan(registry=wanted)
+
+    assert (plan.total, plan.already_applied, plan.pending) == (3, 1, 2)
+    assert plan.previous_registry == {('HKCU', KEY.split('\\', 1)[1], 'Changed'): (wo.REG_DWORD, 1),
+                                      ('HKCU', KEY.split('\\', 1)[1], 'Text'): None}
+    planner.apply(plan)
+
+    again = planner.plan(registry=wanted)
+    assert again.pending == 0 and len(again.registry) == 0
+    assert "3 de 3" in again.summary()
+
+
+def test_value_type_change_is_pending(commands):
+    planner = make_planner(wo.MemoryRegistryBackend(), commands)
+    planner.registry.apply(wo.RegistryBatch().set(KEY, 'Value', '1', 'REG_SZ'))
+    plan = planner.plan(registry=wo.RegistryBatch().set(KEY, 'Value', 1))
+    assert plan.pending == 1
+
+
+def test_services_and_power_scheme_are_diffed(commands):
+    planner = make_planner(wo.MemoryRegistryBackend(), commands, services={'SysMain': False, 'WSearch': True})
+    services_key = f"{wo.SERVICES_KEY}\\"
+    planner.registry.apply(wo.RegistryBatch().set(services_key + 'SysMain', 'Start', 4)
+                           .set(services_key + 'WSearch', 'Start', 2)
+                           .set(wo.POWER_SCHEME_KEY, 'ActivePowerScheme', wo.BALANCED_SCHEME.upper(), 'REG_SZ'))
+
+    plan = planner.plan(services={'SysMain': 'disabled', 'WSearch': 'disabled'}, power_scheme=wo.BALANCED_SCHEME)
+
+    assert plan.already_applied == 2
+    assert plan.services == {'WSearch': ('disabled', True)}
+    assert plan.power_scheme is None
+def test_apply_reports_registry_errors(commands):
+    planner = make_planner(FailingRegistryBackend(), commands)
+    plan = planner.plan(registry=wo.RegistryBatch().set(KEY, 'Value', 1))
+    planner.apply(plan)
+    assert len(plan.failures) == 1
+    assert plan.failures[0].startswith("Registro")
+    assert "1 ajustes no se aplicaron" in plan.failure_summary()
+
+
+def test_apply_reports_failed_commands(commands):
+    commands.responses['net stop'] = (2, '', 'Acceso denegado')
+    commands.responses['powercfg'] = (1, '', 'Plan no válido')
+    planner = make_planner(wo.MemoryRegistryBackend(), commands, services={'SysMain': True})
+    plan = planner.plan(services={'SysMain': 'disabled'}, power_scheme=wo.BALANCED_SCHEME)
+    planner.apply(plan)
+    assert plan.failures == ['net stop "SysMain": código 2',
+                             f'powercfg /setactive {wo.BALANCED_SCHEME}: código 1']
+
+
+def test_successful_apply_has_no_failures(commands):
+    planner = make_planner(wo.MemoryRegistryBackend(), commands)
+    plan = planner.plan(registry=wo.RegistryBatch().set(KEY, 'Value', 1))
+    planner.apply(plan)
+    assert plan.failures == []
+    assert plan.failure_summary() == ""
+
+
+def test_profile_report_collects_step_failures(commands):
+    commands.responses['powercfg'] = (1, '', 'Plan no válido')
+    commands.responses['bcdedit'] = (5, '', 'Acceso denegado')
+    plan = wo.ProfileLibrary.compile({
+        'name': 'prueba', 'title': 'Prueba', 'message': 'Hecho',
+        'steps': [
+            {'status': 'Energía', 'power_scheme': 'balanced'},
+            {'status': 'Registro', 'registry': [{'key': KEY, 'value': 'Value', 'type': 'REG_DWORD', 'data': 1}]},
+            {'status': 'Comandos', 'commands': ['bcdedit /set useplatformtick yes']}
+        ]
+    })
+    planner = make_planner(FailingRegistryBackend(), commands)
+    report = plan.execute(planner, planner.executor)
+
+    failed = dict(report.errors)
+    assert set(failed) == {'Energía', 'Registro', 'Comandos'}
+    assert 'powercfg' in failed['Energía']
+    assert failed['Registro'].startswith('Registro')
+    assert failed['Comandos'] == 'bcdedit /set useplatformtick yes: código 5'
+    assert '• Comandos:' in report.error_summary()
@@ -0,0 +1,145 @@
+"""TooltipPool y UiTicker con ventanas falsas: no hace falta pantalla"""
+import pytest
+
+import windows_optimizer as wo
+
+
+class FakeRoot:
+    """Raíz de Tk mínima: after() guarda el callback y flush() lo ejecuta"""
+
+    def __init__(self):
+        self.timers = {}
+        self._next = 0
+
+    def after(self, delay, callback):
+        self._next += 1
+        self.timers[self._next] = callback
+        return self._next
+
+    def after_cancel(self, timer):
+        self.timers.pop(timer, None)
+
+    def flush(self):
+        while self.timers:
+            self.timers.pop(min(self.timers))()
+
+
+class FakeWidget:
+    def __init__(self, *args, **kwargs):
+        self.bindings = {}
+        self.exists = True
+        self.visible = False
+
+    def bind(self, sequence, handler, add=None):
+        self.bindings.setdefault(sequence, []).append(handler)
+
+    def fire(self, sequence):
+        for handler in self.bindings.get(sequence, []):
+            handler(None)
+
+    def winfo_exists(self):
+        return self.exists
+
+    def winfo_rootx(self):
+        return 0
+
+    def winfo_rooty(self):
+        return 0
+
+    def winfo_width(self):
+        return 100
+
+    def withdraw(self):
+        self.visible = False
+
+    def deiconify(self):
+        self.visible = True
+
+    def wm_overrideredirect(self, flag):
+        pass
+
+    def attributes(self, *args):
+        pass
+
+    def configure(self, **options):
+        pass
+
+    def geometry(self, spec):
+        pass
+
+    def lift(self):
+        pass
+
+    def pack(self, **options):
+        pass
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(wo, 'Toplevel', FakeWidget)
+    monkeypatch.setattr(wo, 'Label', FakeWidget)
+    root = FakeRoot()
+    pool = wo.TooltipPool(root, wo.UiTicker(root), show_delay_ms=0)
+    return pool, root
+
+
+def test_one_window_for_every_hovered_widget(pool):
+    pool, root = pool
+    widgets = [FakeWidget() for _ in range(50)]
+    for index, widget in enumerate(widgets):
+        pool.attach(widget, f"Tooltip {index}")
+
+    for widget in widgets:
+        widget.fire('<Enter>')
+        root.flush()
+        assert pool.owner is widget and pool.window.visible
+        widget.fire('<Leave>')
+        assert not pool.window.visible
+
+    assert pool.windows_created == 1
+    assert pool.shown == len(widgets)
+
+
+def test_sweeping_across_widgets_keeps_one_pending_tooltip(pool):
+    pool, root = pool
+    widgets = [FakeWidget() for _ in range(20)]
+    for widget in widgets:
+        pool.attach(widget, "Tooltip")
+        widget.fire('<Enter>')
+    assert len(pool.ticker.entries) == 1
+
+    root.flush()
+    assert pool.windows_created == 1
+    assert pool.shown == 1
+    assert pool.owner is widgets[-1]
+
+
+def test_destroyed_window_is_recreated_once(pool):
+    pool, root = pool
+    widget = FakeWidget()
+    pool.attach(widget, "Tooltip")
+    widget.fire('<Enter>')
+    root.flush()
+    pool.window.exists = False
+
+    widget.fire('<Enter>')
+    root.flush()
+    assert pool.windows_created == 2
+
+
+def test_failing_ticker_callback_is_logged_and_removed(capsys):
+    root = FakeRoot()
+    ticker = wo.UiTicker(root)
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise RuntimeError("fallo de prueba")
+
+    ticker.register(broken, 0)
+    healthy = ticker.register(lambda: calls.append(2), 0)
+    root.timers.pop(min(root.timers))()  # Un solo tick: el otro callback sigue registrado
+
+    assert ticker.entries == [healthy]
+    assert 'RuntimeError: fallo de prueba' in capsys.readouterr().err
+    assert calls == [1, 2]
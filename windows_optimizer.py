@@ -1,28 +1,3554 @@
 from tkinter import ttk, messagebox, Tk, Label, Frame, Button, Toplevel, BooleanVar, Canvas
 import os
+import sys
+import re
+import json
+import fnmatch
+import errno
+import heapq
 from os import path, environ
 import subprocess
-import psutil
-import webbrowser
-from functools import partial  # Para optimizar los callbacks
+from functools import partial, wraps  # Para optimizar los callbacks
 import shutil
 import time
+import threading
+import traceback
+import queue
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+import startup_profiler
+from lazy_modules import lazy_import
+
+# Se importan al primer uso: el arranque no paga psutil, webbrowser ni WMI/COM
+psutil = lazy_import('psutil')
+webbrowser = lazy_import('webbrowser')
+wmi = lazy_import('wmi')
+pythoncom = lazy_import('pythoncom')
+
+try:
+    import winreg
+except ImportError:  # Fuera de Windows se usa el registro en memoria
+    winreg = None
+
+try:
+    import tomllib
+except ImportError:  # Python < 3.11: los perfiles .toml no están disponibles
+    tomllib = None
+
+# Atributo de Windows para puntos de reanálisis (junctions, enlaces simbólicos)
+FILE_ATTRIBUTE_REPARSE_POINT = 0x400
+
+# Borrado relativo a descriptores de directorio (Linux y otros POSIX; en Windows no existe)
+DIR_FD_DELETE = os.unlink in os.supports_dir_fd and os.scandir in os.supports_fd
+DIR_FD_FLAGS = (os.O_RDONLY | getattr(os, 'O_DIRECTORY', 0) | getattr(os, 'O_NOFOLLOW', 0)
+                | getattr(os, 'O_CLOEXEC', 0))
+
+
+def env_path(variable, *parts):
+    """Construir una ruta a partir de una variable de entorno (None si no existe)"""
+    base = environ.get(variable)
+    if not base:
+        return None
+    return path.join(base, *parts)
+
+
+def app_data_path(*parts):
+    """Ruta dentro de la carpeta de datos de la aplicación (%APPDATA%\\WindowsOptimizer)"""
+    return (env_path('APPDATA', 'WindowsOptimizer', *parts) or
+            path.join(path.expanduser('~'), '.windows_optimizer', *parts))
+
+
+def resource_path(*parts):
+    """Ruta absoluta a un recurso empaquetado (PyInstaller) o junto al módulo"""
+    base = getattr(sys, '_MEIPASS', None)
+    if base is None:
+        module_file = globals().get('__file__')
+        base = path.dirname(path.abspath(module_file)) if module_file else path.abspath(".")
+    return path.join(base, *parts)
+
+
+def is_link_entry(entry):
+    """Detectar enlaces simbólicos y junctions para no recorrer su destino"""
+    if entry.is_symlink():
+        return True
+    try:
+        attributes = entry.stat(follow_symlinks=False).st_file_attributes
+    except (AttributeError, OSError):
+        return False
+    return bool(attributes & FILE_ATTRIBUTE_REPARSE_POINT)
+
+
+def scan_directory(directory):
+    """Leer un directorio una sola vez y separar archivos de subdirectorios.
+
+    Devuelve dos listas de os.DirEntry; el tipo y los datos de stat quedan
+    cacheados en cada entrada, sin llamadas extra a isfile/isdir.
+    """
+    files = []
+    subdirs = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False) and not is_link_entry(entry):
+                    subdirs.append(entry)
+                else:
+                    files.append(entry)
+            except OSError:
+                files.append(entry)
+    return files, subdirs
+
+
+def remove_path(file_path):
+    """Eliminar un archivo o enlace por ruta (listados guardados en un StatCache)"""
+    if delete_faults is not None:
+        delete_faults.check(file_path)
+    try:
+        os.unlink(file_path)
+    except IsADirectoryError:
+        os.rmdir(file_path)
+    except PermissionError:
+        # Junctions y enlaces a directorios en Windows
+        if not path.isdir(file_path):
+            raise
+        os.rmdir(file_path)
+
+
+def remove_entry(entry):
+    """Eliminar un archivo o enlace a partir de su DirEntry"""
+    if delete_faults is not None:
+        delete_faults.check(entry.path)
+    try:
+        os.unlink(entry.path)
+    except IsADirectoryError:
+        os.rmdir(entry.path)
+    except PermissionError:
+        # Junctions y enlaces a directorios en Windows
+        if not entry.is_dir(follow_symlinks=False):
+            raise
+        os.rmdir(entry.path)
+
+
+def remove_at(dir_fd, name, file_path):
+    """Eliminar name relativo al descriptor de su directorio (file_path solo para las pruebas de fallos)"""
+    if delete_faults is not None:
+        delete_faults.check(file_path)
+    try:
+        os.unlink(name, dir_fd=dir_fd)
+    except IsADirectoryError:
+        os.rmdir(name, dir_fd=dir_fd)
+
+
+class ThroughputMeter:
+    """Velocidad de borrado en vivo sobre una ventana deslizante de unos segundos.
+
+    update() recibe los totales acumulados desde cualquier hilo; como
+    mucho se guarda una muestra cada SAMPLE_SECONDS, así llamarlo en cada
+    directorio no cuesta nada.
+    """
+    SAMPLE_SECONDS = 0.1
+
+    def __init__(self, window=2.0):
+        self.window = window
+        self.start = time.perf_counter()
+        self._latest = (self.start, 0, 0)
+        self._samples = deque([self._latest])
+        self._lock = threading.Lock()
+
+    def update(self, files, size):
+        now = time.perf_counter()
+        with self._lock:
+            self._latest = (now, files, size)
+            if now - self._samples[-1][0] >= self.SAMPLE_SECONDS:
+                self._samples.append(self._latest)
+                while len(self._samples) > 2 and now - self._samples[1][0] >= self.window:
+                    self._samples.popleft()
+
+    def rates(self):
+        """(archivos/s, bytes/s) en la ventana reciente"""
+        with self._lock:
+            first, latest = self._samples[0], self._latest
+        elapsed = latest[0] - first[0]
+        if elapsed <= 0:
+            return 0.0, 0.0
+        return (latest[1] - first[1]) / elapsed, (latest[2] - first[2]) / elapsed
+
+    def average(self):
+        """(archivos/s, bytes/s) desde el inicio"""
+        with self._lock:
+            now, files, size = self._latest
+        elapsed = now - self.start
+        return (files / elapsed, size / elapsed) if elapsed > 0 else (0.0, 0.0)
+
+    def describe(self, rates=None):
+        files_rate, bytes_rate = rates or self.rates()
+        return f"{files_rate:,.0f} archivos/s · {bytes_rate / (1024 * 1024):.1f} MB/s".replace(',', '.')
+
+
+class OperationCancelled(Exception):
+    """La acción se canceló desde el panel de progreso"""
+
+
+class CancelToken:
+    """Cancelación cooperativa de una acción.
+
+    El botón Cancelar llama a cancel(); el código que trabaja consulta
+    cancelled (o check(), que lanza OperationCancelled) entre elemento y
+    elemento. on_cancel() registra funciones que se ejecutan al cancelar,
+    por ejemplo terminar un proceso hijo en curso.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def check(self):
+        if self._event.is_set():
+            raise OperationCancelled()
+
+    def wait(self, timeout=None):
+        """Esperar hasta timeout segundos; devuelve True si se canceló"""
+        return self._event.wait(timeout)
+
+    def on_cancel(self, callback):
+        """Llamar callback al cancelar (en el acto si ya está cancelado)"""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return callback
+        callback()
+        return callback
+
+    def remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+
+DELETE_FAILURE_NAMES = {
+    'locked': "En uso por otro proceso",
+    'permission': "Sin permiso",
+    'path_too_long': "Ruta demasiado larga",
+    'other': "Otros errores"
+}
+# Categoría de cada código de error de Windows (winerror) y de POSIX (errno)
+WINERROR_CATEGORIES = {32: 'locked', 33: 'locked', 5: 'permission', 206: 'path_too_long'}
+ERRNO_CATEGORIES = {errno.EBUSY: 'locked', getattr(errno, 'ETXTBSY', errno.EBUSY): 'locked',
+                    errno.EACCES: 'permission', errno.EPERM: 'permission', errno.ENAMETOOLONG: 'path_too_long'}
+MAX_PATH = 260
+
+
+def classify_delete_error(error, file_path=''):
+    """Categoría de DELETE_FAILURE_NAMES de un OSError al borrar"""
+    winerror = getattr(error, 'winerror', None)
+    if winerror is not None:
+        category = WINERROR_CATEGORIES.get(winerror)
+        if category is None and winerror == 3 and len(file_path) >= MAX_PATH:
+            category = 'path_too_long'  # ERROR_PATH_NOT_FOUND al superar MAX_PATH
+    else:
+        category = ERRNO_CATEGORIES.get(error.errno)
+    return category or 'other'
+
+
+def extended_path(file_path):
+    """Ruta con el prefijo \\\\?\\ de Windows, que admite más de MAX_PATH caracteres"""
+    if os.name != 'nt' or file_path.startswith('\\\\?\\'):
+        return file_path
+    file_path = path.abspath(file_path)
+    if file_path.startswith('\\\\'):
+        return '\\\\?\\UNC\\' + file_path[2:]
+    return '\\\\?\\' + file_path
+
+
+class DeleteFaults:
+    """Fallos de borrado simulados para probar los reintentos fuera de Windows.
+
+    Cada regla es (glob, categoría, veces): los archivos cuyo nombre cumple
+    el glob fallan con un error de esa categoría sus primeras 'veces'
+    intentos (None = siempre). Se activa con la variable WO_DELETE_FAULTS,
+    p. ej. WO_DELETE_FAULTS="*.log:locked:3,*.dat:permission", o asignando
+    delete_faults desde una prueba o un benchmark.
+    """
+    ENV = 'WO_DELETE_FAULTS'
+    ERRORS = {'locked': errno.EBUSY, 'permission': errno.EACCES,
+              'path_too_long': errno.ENAMETOOLONG, 'other': errno.EIO}
+
+    def __init__(self, rules=()):
+        self.rules = [(glob.lower(), category, times) for glob, category, times in rules]
+        self.injected = 0
+        self._attempts = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls):
+        spec = os.environ.get(cls.ENV)
+        if not spec:
+            return None
+        rules = []
+        for item in spec.split(','):
+            glob, _, rest = item.strip().partition(':')
+            category, _, times = rest.partition(':')
+            category = category or 'locked'
+            # Una regla mal escrita se ignora: es solo una ayuda para probar
+            if glob and category in cls.ERRORS and (not times or times.isdigit()):
+                rules.append((glob, category, int(times) if times else None))
+        return cls(rules)
+
+    def check(self, file_path):
+        """Lanzar el OSError configurado si file_path tiene que fallar en este intento"""
+        name = path.basename(file_path).lower()
+        for glob, category, times in self.rules:
+            if not fnmatch.fnmatchcase(name, glob):
+                continue
+            with self._lock:
+                attempt = self._attempts.get(file_path, 0)
+                if times is not None and attempt >= times:
+                    return
+                self._attempts[file_path] = attempt + 1
+                self.injected += 1
+            code = self.ERRORS[category]
+            raise OSError(code, f"{os.strerror(code)} (simulado)", file_path)
+
+
+delete_faults = DeleteFaults.from_environment()
+
+
+class DeleteFailures:
+    """Archivos que no se pudieron borrar, agrupados por categoría"""
+    EXAMPLES = 3
+
+    def __init__(self):
+        self.paths = {category: [] for category in DELETE_FAILURE_NAMES}
+        self._lock = threading.Lock()
+
+    def add(self, file_path, category):
+        with self._lock:
+            self.paths[category].append(file_path)
+
+    def merge(self, other):
+        with self._lock:
+            for category, paths in other.paths.items():
+                self.paths[category].extend(paths)
+
+    def __len__(self):
+        return sum(len(paths) for paths in self.paths.values())
+
+    def counts(self):
+        return {category: len(paths) for category, paths in self.paths.items() if paths}
+
+    def summary(self):
+        """Una línea por categoría con algunas rutas de ejemplo"""
+        lines = []
+        for category, paths in self.paths.items():
+            if not paths:
+                continue
+            lines.append(f"• {DELETE_FAILURE_NAMES[category]}: {len(paths)}")
+            lines.extend(f"    {file_path}" for file_path in paths[:self.EXAMPLES])
+            if len(paths) > self.EXAMPLES:
+                lines.append(f"    ... y {len(paths) - self.EXAMPLES} más")
+        return "\n".join(lines)
+
+
+class DeleteRetryQueue:
+    """Reintentos diferidos de los archivos que no se pudieron borrar.
+
+    En Windows un archivo bloqueado o sin permiso suele estarlo solo un
+    momento (un antivirus, un programa que lo tiene abierto). add() encola
+    el fallo sin detener la pasada principal y un hilo lo reintenta con
+    espera exponencial mientras el resto del árbol se sigue borrando.
+    finish() hace la pasada final cuando ya terminó todo, borra las
+    carpetas que quedaron vacías (sin salir de roots) y deja en failures lo
+    que siguió fallando. Las rutas demasiado largas se reintentan en
+    Windows con el prefijo \\\\?\\.
+    """
+    RETRYABLE = ('locked', 'permission', 'path_too_long') if os.name == 'nt' else ('locked', 'permission')
+
+    def __init__(self, roots=(), attempts=4, base_delay=0.25, max_delay=4.0, on_removed=None, on_failed=None):
+        self.roots = [path.normcase(path.abspath(root)).rstrip(os.sep) + os.sep for root in roots]
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.on_removed = on_removed  # on_removed(root, bytes), también desde el hilo de reintentos
+        self.on_failed = on_failed  # on_failed(root, categoría)
+        self.failures = DeleteFailures()
+        self.deferred = 0
+        self.recovered = 0
+        self.recovered_bytes = 0
+        self.retried = 0
+        self._cond = threading.Condition()
+        self._heap = []  # (cuándo, orden, [ruta, bytes, raíz, categoría, intentos])
+        self._exhausted = []
+        self._parents = set()
+        self._sequence = 0
+        self._thread = None
+        self._closing = False
+
+    def add(self, file_path, size, error, root=None):
+        """Registrar un borrado fallido; devuelve su categoría o None si el archivo ya no existe"""
+        if isinstance(error, FileNotFoundError):
+            return None
+        category = classify_delete_error(error, file_path)
+        item = [file_path, size, root, category, 0]
+        with self._cond:
+            if category not in self.RETRYABLE or self._closing:
+                retry = False
+            else:
+                retry = True
+                self.deferred += 1
+                self._schedule(item)
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, daemon=True)
+                    self._thread.start()
+        if not retry:
+            self._fail(item)
+        return category
+
+    def fail(self, file_path, error, root=None):
+        """Registrar un fallo que no se reintenta (p. ej. un directorio que no se pudo leer)"""
+        self._fail([file_path, 0, root, classify_delete_error(error, file_path), 0])
+
+    def _fail(self, item):
+        self.failures.add(item[0], item[3])
+        if self.on_failed:
+            self.on_failed(item[2], item[3])
+
+    def _schedule(self, item, heap=None):
+        # Se llama con el lock tomado (o desde finish, con el hilo ya detenido)
+        delay = min(self.max_delay, self.base_delay * 2 ** item[4])
+        heapq.heappush(self._heap if heap is None else heap, (time.monotonic() + delay, self._sequence, item))
+        self._sequence += 1
+        if heap is None:
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._closing:
+                    if self._heap:
+                        delay = self._heap[0][0] - time.monotonic()
+                        if delay <= 0:
+                            break
+                        self._cond.wait(delay)
+                    else:
+                        self._cond.wait()
+                if self._closing:
+                    return
+                _, _, item = heapq.heappop(self._heap)
+            if self._attempt(item):
+                continue
+            with self._cond:
+                if item[3] in self.RETRYABLE and item[4] < self.attempts and not self._closing:
+                    self._schedule(item)
+                else:
+                    self._exhausted.append(item)
+
+    def _attempt(self, item):
+        """Volver a intentar el borrado; True si el archivo ya no está"""
+        file_path, size, root, category, attempts = item
+        item[4] = attempts + 1
+        try:
+            remove_path(extended_path(file_path) if category == 'path_too_long' else file_path)
+        except FileNotFoundError:
+            return True
+        except OSError as error:
+            item[3] = classify_delete_error(error, file_path)
+            with self._cond:
+                self.retried += 1
+            return False
+        with self._cond:
+            self.retried += 1
+            self.recovered += 1
+            self.recovered_bytes += size
+            self._parents.add(path.dirname(file_path))
+        if self.on_removed:
+            self.on_removed(root, size)
+        return True
+
+    def finish(self, token=None):
+        """Pasada final: terminar los reintentos pendientes y devolver failures.
+
+        Lo que ya agotó sus intentos recibe uno último ahora que el resto del
+        árbol está borrado; lo que seguía esperando turno continúa con su
+        espera hasta agotarlos. Al cancelar con token se deja de esperar.
+        """
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join()
+        with self._cond:
+            heap, exhausted = self._heap, self._exhausted
+            self._heap, self._exhausted = [], []
+        for item in exhausted:
+            if token is not None and token.cancelled or not self._attempt(item):
+                self._fail(item)
+        while heap:
+            due, _, item = heapq.heappop(heap)
+            delay = due - time.monotonic()
+            if token is not None and (token.cancelled or delay > 0 and token.wait(delay)):
+                self._fail(item)
+                continue
+            if token is None and delay > 0:
+                time.sleep(delay)
+            if self._attempt(item):
+                continue
+            if item[3] in self.RETRYABLE and item[4] < self.attempts:
+                self._schedule(item, heap)
+            else:
+                self._fail(item)
+        self._remove_empty_parents()
+        return self.failures
+
+    def _remove_empty_parents(self):
+        # Las carpetas de los archivos recuperados no se pudieron borrar en la pasada principal
+        for directory in sorted(self._parents, key=len, reverse=True):
+            while self._inside_roots(directory):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    break
+                directory = path.dirname(directory)
+        self._parents.clear()
+
+    def _inside_roots(self, directory):
+        key = path.normcase(path.abspath(directory))
+        return any(key.startswith(root) for root in self.roots)
+
+
+class TreeWalker:
+    """Recorrido en streaming de un árbol de directorios con os.scandir.
+
+    Genera tuplas (entry, is_dir) de forma perezosa: primero los archivos de
+    cada directorio y los directorios después de su contenido (post-orden),
+    listo para borrar sobre la marcha. estimated_total se va ajustando
+    durante el recorrido, así la barra de progreso no necesita una pasada
+    previa de conteo. Con un CancelToken el recorrido se detiene al
+    cancelar y cancelled queda en True.
+    """
+
+    def __init__(self, root, token=None):
+        self.root = root
+        self.token = token
+        self.cancelled = False
+        self.seen = 0  # Entradas descubiertas hasta ahora
+        self.yielded = 0
+        self.scanned_dirs = 0
+        self.pending_dirs = 0
+        self.errors = 0
+
+    @property
+    def estimated_total(self):
+        if not self.scanned_dirs:
+            return 0
+        # Suponer que los directorios pendientes tienen el tamaño medio visto
+        average = self.seen / self.scanned_dirs
+        return max(self.yielded, int(self.seen + self.pending_dirs * average))
+
+    def __iter__(self):
+        stack = [(self.root, None)]
+        self.pending_dirs = 1
+        token = self.token
+        while stack:
+            if token is not None and token.cancelled:
+                self.cancelled = True
+                return
+            directory, entry = stack.pop()
+            if entry is not None and directory is None:
+                # Marcador de post-orden: el directorio ya fue vaciado
+                self.yielded += 1
+                yield entry, True
+                continue
+
+            self.pending_dirs -= 1
+            try:
+                files, subdirs = scan_directory(directory)
+            except OSError:
+                self.errors += 1
+                continue
+            self.scanned_dirs += 1
+            self.seen += len(files) + len(subdirs)
+            self.pending_dirs += len(subdirs)
+
+            for subdir in subdirs:
+                stack.append((None, subdir))
+                stack.append((subdir.path, subdir))
+            for file_entry in files:
+                if token is not None and token.cancelled:
+                    self.cancelled = True
+                    return
+                self.yielded += 1
+                yield file_entry, False
+
+
+class _DirTask:
+    """Directorio pendiente dentro del motor de limpieza"""
+    __slots__ = ('path', 'root', 'parent', 'pending')
+
+    def __init__(self, path, root, parent=None):
+        self.path = path
+        self.root = root
+        self.parent = parent
+        self.pending = 1  # El propio escaneo + un contador por subdirectorio
+
+
+class CleanupEngine:
+    """Motor de limpieza paralelo sobre varias carpetas raíz.
+
+    Cada raíz tiene su propia cola de directorios pendientes. Cada hilo
+    trabaja primero sobre la cola de su raíz asignada (LIFO, en profundidad)
+    y, cuando se vacía, roba subárboles del frente de las colas de las demás
+    raíces. Las raíces se vacían pero no se eliminan. Si se cancela, los
+    hilos terminan el archivo en curso y dejan el resto en su sitio. Con un
+    StatCache de una estimación reciente, los directorios que no cambiaron
+    se borran desde el listado guardado sin volver a leerlos; el tamaño y la
+    fecha de cada archivo se vuelven a consultar antes de aplicar policy y
+    borrar, porque cambiar un archivo no cambia su directorio. Donde el
+    sistema lo permite (DIR_FD_DELETE) cada directorio se abre una vez y sus
+    archivos se borran relativos a ese descriptor, sin resolver la ruta
+    completa en cada uno. meter lleva la velocidad en vivo. policy es un
+    predicado compilado por CleanupPolicy: los archivos que no lo cumplen se
+    conservan. Los archivos que fallan pasan a un DeleteRetryQueue y al
+    terminar quedan clasificados en failures.
+    """
+
+    def __init__(self, roots, max_workers=None, cache=None, policy=None):
+        # Ignorar rutas no definidas, duplicadas o inexistentes
+        self.roots = [root for root in dict.fromkeys(roots) if root and path.isdir(root)]
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self.cache = cache
+        self.policy = policy
+        self._cond = threading.Condition()
+        self._queues = [deque() for _ in self.roots]
+        self._outstanding = 0
+        self._root_outstanding = [0] * len(self.roots)
+        self._stats = [{'files': 0, 'bytes': 0, 'errors': 0, 'kept': 0, 'recovered': 0, 'seconds': 0.0}
+                       for _ in self.roots]
+        self.retries = DeleteRetryQueue(self.roots, on_removed=self._recovered, on_failed=self._failed)
+        self.failures = self.retries.failures
+        self._start = 0.0
+        self.files_removed = 0
+        self.bytes_removed = 0
+        self.meter = ThroughputMeter()
+        self.cancelled = False
+        self._token = None
+
+    def run(self, callback=None, token=None):
+        """Limpiar todas las raíces y devolver estadísticas por raíz.
+
+        callback(root, files, bytes) se llama desde los hilos de trabajo
+        cada vez que se termina de procesar un directorio.
+        """
+        self._callback = callback
+        self._token = token
+        self._start = time.perf_counter()
+        self.meter = ThroughputMeter()
+        if not self.roots:
+            return {}
+        if token is not None:
+            wake = token.on_cancel(self._wake)
+
+        with self._cond:
+            for index, root in enumerate(self.roots):
+                self._push(_DirTask(root, index))
+
+        workers = [threading.Thread(target=self._worker, args=(i % len(self.roots),), daemon=True)
+                   for i in range(max(self.max_workers, len(self.roots)))]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        # Pasada final de los archivos bloqueados, con el resto del árbol ya borrado
+        self.retries.finish(token)
+        if token is not None:
+            token.remove(wake)
+            self.cancelled = token.cancelled
+
+        return {root: dict(stats) for root, stats in zip(self.roots, self._stats)}
+
+    def _recovered(self, root, size):
+        with self._cond:
+            stats = self._stats[root]
+            stats['files'] += 1
+            stats['bytes'] += size
+            stats['recovered'] += 1
+            self.files_removed += 1
+            self.bytes_removed += size
+            self.meter.update(self.files_removed, self.bytes_removed)
+
+    def _failed(self, root, category):
+        with self._cond:
+            self._stats[root]['errors'] += 1
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _push(self, task):
+        # Se llama siempre con el lock tomado
+        self._queues[task.root].append(task)
+        self._outstanding += 1
+        self._root_outstanding[task.root] += 1
+        self._cond.notify()
+
+    def _next_task(self, home):
+        with self._cond:
+            while True:
+                if self._token is not None and self._token.cancelled:
+                    return None
+                if self._queues[home]:
+                    return self._queues[home].pop()
+                # Robar trabajo de las demás raíces
+                for offset in range(1, len(self._queues)):
+                    queue = self._queues[(home + offset) % len(self._queues)]
+                    if queue:
+                        return queue.popleft()
+                if self._outstanding == 0:
+                    return None
+                self._cond.wait()
+
+    def _worker(self, home):
+        while True:
+            task = self._next_task(home)
+            if task is None:
+                return
+            self._process(task)
+
+    def _process(self, task):
+        files = size = errors = kept = 0
+        retries = self.retries
+        policy = self.policy
+        # Reglas de tamaño o fecha: se evalúan con el stat nuevo; las de nombre, antes de hacerlo
+        fresh_policy = policy is not None and getattr(policy, 'needs_stat', True)
+        listing = self.cache.listing(task.path) if self.cache is not None else None
+        dir_fd = None
+        try:
+            if DIR_FD_DELETE:
+                # O_NOFOLLOW: un subdirectorio cambiado por un enlace entre el escaneo y aquí no se sigue
+                flags = DIR_FD_FLAGS if task.parent is not None else DIR_FD_FLAGS & ~getattr(os, 'O_NOFOLLOW', 0)
+                dir_fd = os.open(task.path, flags)
+            if listing is not None:
+                # El listado guardado solo evita el scandir: los datos de cada archivo se leen de nuevo
+                entries, subdirs = listing  # (ruta, bytes, asignados, mtime) y rutas de subdirectorios
+            else:
+                entries, subdirs = scan_directory(task.path if dir_fd is None else dir_fd)
+                subdirs = [path.join(task.path, subdir.name) for subdir in subdirs]
+        except OSError as error:
+            entries, subdirs = (), []
+            errors += 1
+            retries.fail(task.path, error, task.root)
+        token = self._token
+        try:
+            for entry in entries:
+                if token is not None and token.cancelled:
+                    subdirs = []
+                    break
+                if listing is not None:
+                    entry_path = entry[0]
+                    name = path.basename(entry_path)
+                else:
+                    name = entry.name
+                    entry_path = path.join(task.path, name)
+                entry_size = 0
+                try:
+                    if policy is not None and not fresh_policy and not policy(entry_path, 0, 0):
+                        kept += 1
+                        continue
+                    # Tamaño y fecha actuales: el archivo pudo cambiar sin que cambie su directorio
+                    if listing is None:
+                        stat = entry.stat(follow_symlinks=False)
+                    elif dir_fd is not None:
+                        stat = os.stat(name, dir_fd=dir_fd, follow_symlinks=False)
+                    else:
+                        stat = os.stat(entry_path, follow_symlinks=False)
+                    entry_size = stat.st_size
+                    if fresh_policy and not policy(entry_path, entry_size, stat.st_mtime):
+                        kept += 1
+                        continue
+                    if dir_fd is not None:
+                        remove_at(dir_fd, name, entry_path)
+                    elif listing is not None:
+                        remove_path(entry_path)
+                    else:
+                        remove_entry(entry)
+                    files += 1
+                    size += entry_size
+                except OSError as error:
+                    # Bloqueado o sin permiso: se reintenta en segundo plano, la pasada sigue
+                    if retries.add(entry_path, entry_size, error, task.root) is not None:
+                        errors += 1
+        finally:
+            if dir_fd is not None:
+                os.close(dir_fd)
+
+        with self._cond:
+            stats = self._stats[task.root]
+            stats['files'] += files
+            stats['bytes'] += size
+            stats['kept'] += kept
+            self.files_removed += files
+            self.bytes_removed += size
+            self.meter.update(self.files_removed, self.bytes_removed)
+
+            task.pending += len(subdirs)
+            for subdir in subdirs:
+                self._push(_DirTask(subdir, task.root, task))
+            task.pending -= 1
+            finished = task.pending == 0
+
+        # Eliminar los directorios ya vacíos, de hijo a padre. Cada directorio
+        # se borra antes de avisar al padre, así el padre nunca se intenta
+        # borrar con hijos todavía presentes.
+        current = task
+        while finished and current.parent is not None:
+            try:
+                os.rmdir(current.path)
+            except OSError:
+                pass
+            with self._cond:
+                current = current.parent
+                current.pending -= 1
+                finished = current.pending == 0
+
+        with self._cond:
+            self._outstanding -= 1
+            self._root_outstanding[task.root] -= 1
+            if self._root_outstanding[task.root] == 0:
+                stats['seconds'] = time.perf_counter() - self._start
+            if self._outstanding == 0:
+                self._cond.notify_all()
+
+        if self._callback and (files or errors):
+            self._callback(self.roots[task.root], files, size)
+
+
+def delete_tree(folder, token=None, cache=None, failures=None, callback=None):
+    """Borrar una carpeta completa y devolver (archivos, bytes) liberados.
+
+    A diferencia de shutil.rmtree los subárboles se reparten entre varios
+    hilos y se puede cancelar entre archivos: lo ya borrado se cuenta y el
+    resto de la carpeta se conserva. Los archivos bloqueados se reintentan
+    al final; lo que no se pudo borrar se añade a failures (DeleteFailures).
+    callback(archivos, bytes, meter) informa el avance desde los hilos de
+    trabajo con el ThroughputMeter del borrado.
+    """
+    engine = CleanupEngine([folder], cache=cache)
+    if callback is not None:
+        engine.run(callback=lambda root, files, size: callback(engine.files_removed, engine.bytes_removed,
+                                                               engine.meter),
+                   token=token)
+    else:
+        engine.run(token=token)
+    if failures is not None:
+        failures.merge(engine.failures)
+    if engine.roots and not engine.cancelled:
+        try:
+            os.rmdir(folder)
+        except OSError:
+            pass
+    return engine.files_removed, engine.bytes_removed
+
+
+def cleanup_targets():
+    """Carpetas que vacía cada acción de limpieza; la estimación en seco recorre las mismas"""
+    return {
+        'temp': [
+            env_path('TEMP'),  # Carpeta temporal del usuario actual
+            env_path('SYSTEMROOT', 'Temp'),  # Carpeta temporal del sistema
+            env_path('SYSTEMROOT', 'Prefetch'),  # Prefetch
+            env_path('LOCALAPPDATA', 'Temp'),  # AppData Local Temp
+            env_path('LOCALAPPDATA', 'Microsoft', 'Windows', 'INetCache'),  # Cache de Internet
+            env_path('LOCALAPPDATA', 'Microsoft', 'Windows', 'History'),  # Historial
+            env_path('APPDATA', 'Microsoft', 'Windows', 'Recent')  # Archivos recientes
+        ],
+        'system': [
+            "C:\\Windows.old",
+            path.expanduser('~\\AppData\\Local\\Google\\Chrome\\User Data\\Default\\Cache'),
+            path.expanduser('~\\AppData\\Local\\Microsoft\\Edge\\User Data\\Default\\Cache'),
+            "C:\\Windows\\Prefetch",
+            "C:\\Windows\\SoftwareDistribution"
+        ],
+        'recycle_bin': ["C:\\$Recycle.Bin"],
+        'downloads': [path.join(path.expanduser('~'), 'Downloads')],
+        'fivem': [env_path('LOCALAPPDATA', 'FiveM', 'FiveM.app', 'cache')]
+    }
+
+
+CLEANUP_TARGET_NAMES = {
+    'temp': "Archivos temporales",
+    'system': "Limpieza del sistema",
+    'recycle_bin': "Papelera de reciclaje",
+    'downloads': "Descargas",
+    'fivem': "Caché de FiveM"
+}
+
+
+class CleanupRuleError(ValueError):
+    """Regla de limpieza con formato incorrecto; el mensaje indica la regla culpable"""
+
+
+SIZE_UNITS = {'b': 1, 'kb': 1024, 'mb': 1024 ** 2, 'gb': 1024 ** 3}
+
+# Reglas por defecto de cada acción; cleanup_rules.json en la carpeta de datos las reemplaza.
+# 'temp' no lleva reglas por defecto: con una política la estimación no puede usar el índice
+DEFAULT_CLEANUP_RULES = {
+    # Las descargas en curso y la configuración de la carpeta no se tocan
+    'downloads': {'exclude': ['*.crdownload', '*.part', '*.partial', '*.opdownload', 'desktop.ini']}
+}
+
+
+def parse_size(value, rule):
+    """Bytes a partir de un número o de un texto como '100 MB'"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0:
+        return int(value)
+    match = re.fullmatch(r'\s*(\d+(?:\.\d+)?)\s*([kmg]?b)\s*', str(value).lower())
+    if not match:
+        raise CleanupRuleError(f"{rule}: tamaño no válido '{value}' (usa bytes o p. ej. '100 MB')")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+class CleanupPolicy:
+    """Reglas de una limpieza compiladas en un solo predicado.
+
+    compile() genera una función matches(ruta, bytes, mtime) con todas las
+    condiciones activas en una sola expresión: las comparaciones numéricas
+    primero y los globs de exclusión al final, agrupados como indica
+    exclude_matchers(). Los recorridos la evalúan con los datos de stat que ya tienen
+    de cada DirEntry, así que filtrar no añade llamadas al sistema.
+    """
+    RULES = ('older_than_days', 'larger_than', 'smaller_than', 'extensions', 'exclude', 'not_modified_this_boot')
+
+    def __init__(self, older_than_days=None, larger_than=None, smaller_than=None, extensions=(),
+                 exclude=(), not_modified_this_boot=False):
+        self.older_than_days = older_than_days
+        self.larger_than = larger_than
+        self.smaller_than = smaller_than
+        self.extensions = frozenset('.' + extension.lower().lstrip('.') for extension in extensions)
+        self.exclude = tuple(exclude)
+        self.not_modified_this_boot = not_modified_this_boot
+
+    @classmethod
+    def from_dict(cls, data, origin='reglas'):
+        if not isinstance(data, dict):
+            raise CleanupRuleError(f"{origin}: se esperaba un objeto con reglas")
+        unknown = sorted(set(data) - set(cls.RULES))
+        if unknown:
+            raise CleanupRuleError(f"{origin}: reglas desconocidas {', '.join(unknown)}")
+        days = data.get('older_than_days')
+        if days is not None and (isinstance(days, bool) or not isinstance(days, (int, float)) or days < 0):
+            raise CleanupRuleError(f"{origin}.older_than_days: se esperaba un número de días")
+        extensions = data.get('extensions', [])
+        exclude = data.get('exclude', [])
+        for rule, values in (('extensions', extensions), ('exclude', exclude)):
+            if not isinstance(values, list) or not all(isinstance(value, str) and value for value in values):
+                raise CleanupRuleError(f"{origin}.{rule}: se esperaba una lista de textos")
+        return cls(older_than_days=days,
+                   larger_than=parse_size(data['larger_than'], f"{origin}.larger_than") if 'larger_than' in data else None,
+                   smaller_than=parse_size(data['smaller_than'], f"{origin}.smaller_than") if 'smaller_than' in data else None,
+                   extensions=extensions,
+                   exclude=exclude,
+                   not_modified_this_boot=bool(data.get('not_modified_this_boot', False)))
+
+    def exclude_matchers(self):
+        """Clasificar los globs de exclusión (en minúsculas) según cómo se pueden comprobar.
+
+        Devuelve (sufijos, nombres, regex): '*.part' pasa a un endswith sobre
+        el nombre, 'desktop.ini' a una búsqueda en un conjunto y el resto se
+        une en una regex por número de componentes. Un glob sin '/' compara
+        el nombre del archivo; 'Juegos/*' compara las dos últimas partes de
+        la ruta, es decir, protege lo que está directamente en una carpeta
+        Juegos.
+        """
+        suffixes, names, groups = [], set(), {}
+        for glob in self.exclude:
+            glob = glob.replace('\\', '/').strip('/').lower()
+            if '/' not in glob and not any(char in glob for char in '*?['):
+                names.add(glob)
+            elif '/' not in glob and glob.startswith('*') and not any(char in glob[1:] for char in '*?['):
+                suffixes.append(glob[1:])
+            else:
+                groups.setdefault(glob.count('/') + 1, []).append(fnmatch.translate(glob))
+        patterns = {parts: re.compile('|'.join(translated)) for parts, translated in sorted(groups.items())}
+        return tuple(suffixes), frozenset(names), patterns
+
+    def compile(self, now=None, boot_time=None):
+        """Función matches(ruta, bytes, mtime) -> True si el archivo se puede borrar.
+
+        matches.needs_stat indica si el resultado depende del tamaño o la
+        fecha: en ese caso quien la usa debe pasarle datos de un stat hecho
+        justo antes de borrar, nunca los de un listado guardado.
+        """
+        namespace = {}
+        conditions = []
+        if self.larger_than is not None:
+            conditions.append(f"size > {self.larger_than}")
+        if self.smaller_than is not None:
+            conditions.append(f"size < {self.smaller_than}")
+        if self.older_than_days is not None:
+            cutoff = (time.time() if now is None else now) - self.older_than_days * 86400
+            conditions.append(f"mtime < {cutoff!r}")
+        if self.not_modified_this_boot:
+            boot = psutil.boot_time() if boot_time is None else boot_time
+            conditions.append(f"mtime < {boot!r}")
+        suffixes, names, patterns = self.exclude_matchers()
+        if self.extensions or suffixes or names or 1 in patterns:
+            # El nombre en minúsculas se calcula una vez para todas las comprobaciones
+            conditions.append(f"(name := file_path[file_path.rfind({os.sep!r}) + 1:].lower())")
+        if self.extensions:
+            namespace['extensions'] = tuple(sorted(self.extensions))
+            conditions.append("name.endswith(extensions)")
+        if suffixes:
+            namespace['suffixes'] = suffixes
+            conditions.append("not name.endswith(suffixes)")
+        if names:
+            namespace['names'] = names
+            conditions.append("name not in names")
+        for parts, pattern in patterns.items():
+            namespace[f'excluded_{parts}'] = pattern.match
+            if parts == 1:
+                tail = "name"
+            else:
+                tail = f"'/'.join(file_path.lower().rsplit({os.sep!r}, {parts})[-{parts}:])"
+            conditions.append(f"not excluded_{parts}({tail})")
+        source = "def matches(file_path, size, mtime):\n    return " + (" and ".join(conditions) or "True")
+        exec(compile(source, '<reglas de limpieza>', 'exec'), namespace)
+        matches = namespace['matches']
+        matches.needs_stat = self.needs_stat()
+        return matches
+
+    def needs_stat(self):
+        """True si alguna regla depende del tamaño o la fecha (hay que leerlos justo antes de borrar)"""
+        return (self.larger_than is not None or self.smaller_than is not None
+                or self.older_than_days is not None or self.not_modified_this_boot)
+
+
+def load_cleanup_policies(rules_path=None):
+    """Reglas por acción: las de DEFAULT_CLEANUP_RULES o las de cleanup_rules.json si existe"""
+    rules = dict(DEFAULT_CLEANUP_RULES)
+    rules_path = rules_path or app_data_path('cleanup_rules.json')
+    try:
+        with open(rules_path, encoding='utf-8') as file:
+            custom = json.load(file)
+    except FileNotFoundError:
+        custom = {}
+    except (OSError, ValueError) as error:
+        raise CleanupRuleError(f"{rules_path}: {error}")
+    if not isinstance(custom, dict):
+        raise CleanupRuleError(f"{rules_path}: se esperaba un objeto con una entrada por acción")
+    rules.update(custom)
+    return {group: CleanupPolicy.from_dict(data, group) for group, data in rules.items() if data}
+
+
+def format_bytes(size):
+    for unit in ('B', 'KB', 'MB'):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.2f} GB"
+
+
+def cluster_size(folder):
+    """Bytes por clúster del volumen de folder (4096 si no se puede consultar)"""
+    if os.name == 'nt':
+        import ctypes
+        sectors, sector_bytes, free, total = (ctypes.c_ulong() for _ in range(4))
+        drive = path.splitdrive(path.abspath(folder))[0] + '\\'
+        if ctypes.windll.kernel32.GetDiskFreeSpaceW(drive, ctypes.byref(sectors), ctypes.byref(sector_bytes),
+                                                    ctypes.byref(free), ctypes.byref(total)):
+            return sectors.value * sector_bytes.value
+        return 4096
+    try:
+        return os.statvfs(folder).f_frsize or 4096
+    except (OSError, AttributeError):
+        return 4096
+
+
+def allocated_size(stat, cluster):
+    """Espacio ocupado en disco: st_blocks si existe, si no el tamaño redondeado al clúster"""
+    blocks = getattr(stat, 'st_blocks', None)
+    if blocks is not None:
+        return blocks * 512
+    return -(-stat.st_size // cluster) * cluster
+
+
+class StatCache:
+    """Listados de directorio tomados por una estimación en seco.
+
+    listing() solo devuelve el listado guardado si la fecha de modificación
+    del directorio no cambió desde entonces (un stat por directorio en lugar
+    de uno por archivo); si cambió, el llamador vuelve a leerlo.
+    """
+
+    def __init__(self):
+        self.directories = {}  # ruta -> (mtime_ns, [(ruta, bytes, asignados, mtime)], [subdirectorios])
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.directories)
+
+    def store(self, directory, mtime_ns, files, subdirs):
+        with self._lock:
+            self.directories[directory] = (mtime_ns, files, subdirs)
+
+    def listing(self, directory):
+        cached = self.directories.get(directory)
+        try:
+            fresh = cached is not None and os.stat(directory).st_mtime_ns == cached[0]
+        except OSError:
+            fresh = False
+        with self._lock:
+            if not fresh:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return cached[1], cached[2]
+
+
+class CleanupIndex:
+    """Índice persistente de los directorios de limpieza (mtime, archivos y bytes).
+
+    Si la fecha de modificación de un directorio no cambió, sus archivos y
+    subdirectorios son los mismos que en el último análisis: la estimación
+    toma sus totales del índice con un solo stat y baja a los
+    subdirectorios guardados sin leer el directorio. Reescribir un archivo
+    ya existente no cambia la fecha del directorio, así que sus bytes se
+    actualizan la próxima vez que el directorio cambie.
+
+    El archivo es JSON comprimido con zlib detrás de una cabecera de formato.
+    """
+    FORMAT = b'WOIDX1'
+
+    def __init__(self, index_path=None):
+        self.index_path = index_path or app_data_path('cleanup.index')
+        self.entries = None  # ruta -> [mtime_ns, archivos, bytes, asignados, [subdirectorios], {extensión: [...]}]
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.load())
+
+    def load(self):
+        with self._lock:
+            if self.entries is None:
+                self.entries = self._read()
+            return self.entries
+
+    def _read(self):
+        try:
+            with open(self.index_path, 'rb') as file:
+                header = file.readline().rstrip(b'\n')
+                data = file.read()
+            if header != self.FORMAT:
+                return {}
+            entries = json.loads(zlib.decompress(data))
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError, zlib.error):
+            return {}
+
+    def lookup(self, directory, mtime_ns):
+        """Fila guardada del directorio si no cambió desde el último análisis"""
+        row = self.load().get(directory)
+        fresh = row is not None and row[0] == mtime_ns
+        with self._lock:
+            if fresh:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return row if fresh else None
+
+    def update(self, roots, records, prune=True):
+        """Guardar los directorios analizados; con prune se olvidan los que ya no existen bajo roots"""
+        entries = self.load()
+        with self._lock:
+            if prune:
+                prefixes = [path.join(path.normcase(root), '') for root in roots]
+                for directory in list(entries):
+                    if directory in records:
+                        continue
+                    key = path.normcase(directory)
+                    if any(key == prefix[:-1] or key.startswith(prefix) for prefix in prefixes):
+                        del entries[directory]
+            entries.update(records)
+
+    def save(self):
+        entries = self.load()
+        try:
+            os.makedirs(path.dirname(self.index_path), exist_ok=True)
+            temporary = self.index_path + '.tmp'
+            with self._lock:
+                data = zlib.compress(json.dumps(entries, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+            with open(temporary, 'wb') as file:
+                file.write(self.FORMAT + b'\n')
+                file.write(data)
+            os.replace(temporary, self.index_path)
+        except OSError:
+            pass  # Sin índice el próximo análisis vuelve a leer todo
+
+
+class SpaceEstimate:
+    """Resultado de la estimación: bytes lógicos y asignados por carpeta y por tipo de archivo"""
+    MAX_AGE_SECONDS = 600  # Pasado este tiempo la limpieza vuelve a leer los directorios
+
+    def __init__(self, groups):
+        self.groups = groups  # grupo -> carpetas
+        self.folders = {}  # carpeta -> [archivos, bytes, asignados, errores]
+        self.types = {}  # carpeta -> {extensión: [archivos, bytes, asignados]}
+        self.cache = StatCache()
+        self.created = time.time()
+        self.seconds = 0.0
+        self.cancelled = False
+        self.directories = 0
+        self.unchanged = 0  # Directorios tomados del CleanupIndex sin leerlos
+
+    def add(self, folder, totals, types, errors=0):
+        entry = self.folders.setdefault(folder, [0, 0, 0, 0])
+        for index, value in enumerate(totals):
+            entry[index] += value
+        entry[3] += errors
+        folder_types = self.types.setdefault(folder, {})
+        for extension, values in types.items():
+            counts = folder_types.setdefault(extension, [0, 0, 0])
+            for index, value in enumerate(values):
+                counts[index] += value
+
+    def totals(self, folders=None):
+        """(archivos, bytes, asignados) de las carpetas indicadas o de todas"""
+        rows = [self.folders[folder] for folder in (folders or self.folders) if folder in self.folders]
+        return tuple(sum(row[index] for row in rows) for index in range(3))
+
+    def type_totals(self, folders=None):
+        merged = {}
+        for folder in (folders or self.types):
+            for extension, values in self.types.get(folder, {}).items():
+                counts = merged.setdefault(extension, [0, 0, 0])
+                for index, value in enumerate(values):
+                    counts[index] += value
+        return merged
+
+    def fresh_cache(self):
+        """StatCache reutilizable por la limpieza real, o None si la estimación es antigua"""
+        if self.cancelled or time.time() - self.created > self.MAX_AGE_SECONDS:
+            return None
+        return self.cache
+
+    def report(self, top_types=6):
+        """Texto con el espacio a liberar por acción, carpeta y tipo de archivo"""
+        files, logical, allocated = self.totals()
+        lines = [f"💾 Liberarás {format_bytes(logical)} ({format_bytes(allocated)} ocupados en disco)",
+                 f"   {files} archivos en {len(self.folders)} carpetas"]
+        if self.unchanged:
+            lines.append(f"   {self.unchanged} de {self.directories} directorios sin cambios desde el último análisis")
+        for group, folders in self.groups.items():
+            group_files, group_logical, group_allocated = self.totals(folders)
+            lines.append("")
+            lines.append(f"{CLEANUP_TARGET_NAMES.get(group, group)}: {format_bytes(group_logical)} "
+                         f"({group_files} archivos, {format_bytes(group_allocated)} en disco)")
+            if len(folders) > 1:
+                for folder in folders:
+                    if self.folders.get(folder, [0])[0]:
+                        lines.append(f"  • {folder}: {format_bytes(self.folders[folder][1])}")
+        types = sorted(self.type_totals().items(), key=lambda item: item[1][1], reverse=True)
+        if types:
+            lines.append("")
+            lines.append("Tipos de archivo con más espacio:")
+            for extension, (count, type_logical, _) in types[:top_types]:
+                lines.append(f"  • {extension}: {format_bytes(type_logical)} ({count} archivos)")
+        if self.cancelled:
+            lines.append("")
+            lines.append("(Estimación cancelada: los valores son parciales)")
+        return "\n".join(lines)
+
+
+class SpaceEstimator:
+    """Estimación en seco del espacio que liberaría cada acción de limpieza.
+
+    Recorre todas las carpetas en paralelo, un directorio por tarea, sin
+    borrar nada. Las carpetas repetidas entre acciones se recorren una sola
+    vez. Los listados quedan en el StatCache de la estimación para que la
+    limpieza real no vuelva a leerlos ni a hacer stat de cada archivo. Con
+    un CleanupIndex solo se leen los directorios que cambiaron desde el
+    análisis anterior.
+    """
+
+    def __init__(self, targets, max_workers=None, index=None, policies=None):
+        self.groups = {}
+        self.roots = []
+        self.policies = policies or {}  # grupo -> predicado compilado
+        canonical = {}  # Misma carpeta escrita de otra forma -> primera ruta vista
+        for group, folders in targets.items():
+            for folder in folders:
+                if not folder or not path.isdir(folder):
+                    continue
+                key = path.normcase(path.abspath(folder))
+                if key not in canonical:
+                    canonical[key] = folder
+                    self.roots.append(folder)
+                group_folders = self.groups.setdefault(group, [])
+                if canonical[key] not in group_folders:
+                    group_folders.append(canonical[key])
+        self.max_workers = max_workers or min(32, (os.cpu_count() or 1) * 4)
+        self.index = index
+
+    def root_policy(self, root):
+        """Predicado de una carpeta: un archivo cuenta si alguna acción que la limpia lo borraría"""
+        predicates = []
+        for group, folders in self.groups.items():
+            if root in folders:
+                predicate = self.policies.get(group)
+                if predicate is None:
+                    return None  # Una acción la vacía entera
+                predicates.append(predicate)
+        if len(predicates) == 1:
+            return predicates[0]
+
+        def matches(file_path, size, mtime):
+            return any(predicate(file_path, size, mtime) for predicate in predicates)
+        matches.needs_stat = any(getattr(predicate, 'needs_stat', True) for predicate in predicates)
+        return matches
+
+    def _scan(self, directory, cluster, token, policy=None):
+        """Analizar directory y, sin leerlos, los subárboles que no cambiaron.
+
+        Devuelve (filas, pendientes, errores): una fila (directorio, mtime_ns,
+        archivos o None si salió del índice, subdirectorios, totales, tipos)
+        por directorio y los subdirectorios que hay que leer en otras tareas.
+        """
+        rows, pending, errors = [], [], 0
+        # Las reglas dependen de la fecha de cada archivo: con reglas no se usa el índice
+        index = self.index if policy is None else None
+        stack = [directory]
+        while stack:
+            if token is not None and token.cancelled:
+                break
+            current = stack.pop()
+            try:
+                mtime_ns = os.stat(current).st_mtime_ns
+            except OSError:
+                errors += 1
+                continue
+            known = index.lookup(current, mtime_ns) if index is not None else None
+            if known is not None:
+                _, count, logical, allocated, names, types = known
+                subdirs = [path.join(current, name) for name in names]
+                rows.append((current, mtime_ns, None, subdirs, (count, logical, allocated), types))
+                stack.extend(subdirs)
+            elif current is directory:
+                scanned = self._read(current, cluster, policy)
+                if scanned is None:
+                    errors += 1
+                    continue
+                files, subdirs, totals, types = scanned
+                rows.append((current, mtime_ns, files, subdirs, totals, types))
+                pending.extend(subdirs)
+            else:
+                pending.append(current)  # Cambió: se lee en su propia tarea
+        return rows, pending, errors
+
+    @staticmethod
+    def _read(directory, cluster, policy=None):
+        """Leer un directorio: (archivos, subdirectorios, totales, tipos) o None si falla.
+
+        archivos los lista todos (para el StatCache); totales y tipos solo
+        cuentan los que cumplen policy.
+        """
+        try:
+            entries, subdirs = scan_directory(directory)
+        except OSError:
+            return None
+        files = []
+        types = {}
+        logical = allocated = 0
+        for entry in entries:
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            size = stat.st_size
+            used = allocated_size(stat, cluster)
+            files.append((entry.path, size, used, stat.st_mtime))
+            if policy is not None and not policy(entry.path, size, stat.st_mtime):
+                continue
+            logical += size
+            allocated += used
+            extension = path.splitext(entry.name)[1].lower() or '(sin extensión)'
+            counts = types.get(extension)
+            if counts is None:
+                types[extension] = [1, size, used]
+            else:
+                counts[0] += 1
+                counts[1] += size
+                counts[2] += used
+        return files, [subdir.path for subdir in subdirs], (sum(counts[0] for counts in types.values()), logical, allocated), types
+
+    def run(self, callback=None, token=None):
+        """Estimar todas las carpetas; callback(estimate) se llama en este hilo a medida que avanza"""
+        estimate = SpaceEstimate(self.groups)
+        start = time.perf_counter()
+        results = queue.Queue()
+        records = {}
+        outstanding = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='estimate') as pool:
+            def submit(folder, root, cluster, policy):
+                nonlocal outstanding
+                outstanding += 1
+                future = pool.submit(self._scan, folder, cluster, token, policy)
+                future.add_done_callback(lambda done: results.put((root, cluster, policy, done)))
+
+            for root in self.roots:
+                submit(root, root, cluster_size(root), self.root_policy(root))
+            while outstanding:
+                root, cluster, policy, future = results.get()
+                outstanding -= 1
+                rows, pending, errors = future.result()
+                if errors:
+                    estimate.add(root, (0, 0, 0), {}, errors=errors)
+                for directory, mtime_ns, files, subdirs, totals, types in rows:
+                    estimate.directories += 1
+                    if files is None:
+                        estimate.unchanged += 1
+                    else:
+                        estimate.cache.store(directory, mtime_ns, files, subdirs)
+                    if policy is None:
+                        records[directory] = [mtime_ns, *totals, [path.basename(subdir) for subdir in subdirs], types]
+                    estimate.add(root, totals, types)
+                for subdir in pending:
+                    submit(subdir, root, cluster, policy)
+                if callback:
+                    callback(estimate)
+        estimate.cancelled = token is not None and token.cancelled
+        if self.index is not None:
+            indexed = [root for root in self.roots if self.root_policy(root) is None]
+            self.index.update(indexed, records, prune=not estimate.cancelled)
+            self.index.save()
+        estimate.seconds = time.perf_counter() - start
+        return estimate
+
+
+def interval_ms_of(interval):
+    return interval() if callable(interval) else interval
+
+
+class _TickerEntry:
+    __slots__ = ('callback', 'interval', 'widget', 'due', 'calls', 'seconds', 'name')
+
+    def __init__(self, callback, interval, widget, due):
+        self.callback = callback
+        self.interval = interval
+        self.widget = widget
+        self.due = due
+        self.calls = 0
+        self.seconds = 0.0
+        self.name = getattr(callback, '__qualname__', repr(callback))
+
+    def interval_ms(self):
+        return interval_ms_of(self.interval)
+
+
+class UiTicker:
+    """Único temporizador after() para todo el trabajo periódico de la interfaz.
+
+    Los componentes se registran con register(callback, intervalo_ms, widget).
+    Un solo after() despierta cuando vence el primer callback; los que
+    devuelven False, lanzan una excepción (se escribe en stderr) o cuyo
+    widget ya no existe se eliminan solos. Solo se usa desde el hilo de Tk.
+    """
+    MIN_DELAY_MS = 1
+
+    def __init__(self, root):
+        self.root = root
+        self.entries = []
+        self._timer = None
+        self.ticks = 0
+        self.last_calls = 0
+        self.last_tick_ms = 0.0
+        self.max_tick_ms = 0.0
+        self.total_ms = 0.0
+
+    def register(self, callback, interval_ms, widget=None):
+        """Llamar callback cada interval_ms (número o función que lo devuelve)"""
+        entry = _TickerEntry(callback, interval_ms, widget, time.perf_counter() + interval_ms_of(interval_ms) / 1000)
+        self.entries.append(entry)
+        self._schedule()
+        return entry
+
+    def unregister(self, entry):
+        if entry in self.entries:
+            self.entries.remove(entry)
+
+    @staticmethod
+    def _alive(widget):
+        if widget is None:
+            return True
+        try:
+            return bool(widget.winfo_exists())
+        except Exception:
+            return False
+
+    def _schedule(self):
+        if self._timer is not None:
+            try:
+                self.root.after_cancel(self._timer)
+            except Exception:
+                pass
+            self._timer = None
+        if not self.entries:
+            return  # Sin trabajo periódico no queda ningún after() pendiente
+        delay = (min(entry.due for entry in self.entries) - time.perf_counter()) * 1000
+        try:
+            self._timer = self.root.after(max(self.MIN_DELAY_MS, int(delay + 0.999)), self._tick)
+        except Exception:
+            self._timer = None
+
+    def _tick(self):
+        self._timer = None
+        start = time.perf_counter()
+        calls = 0
+        for entry in list(self.entries):
+            # after() puede despertar una fracción de ms antes de lo pedido
+            if entry.due > start + self.MIN_DELAY_MS / 1000:
+                continue
+            if not self._alive(entry.widget):
+                self.unregister(entry)
+                continue
+            began = time.perf_counter()
+            try:
+                keep = entry.callback()
+            except Exception:
+                # Un callback que falla no detiene a los demás, pero se deja constancia
+                print(f"UiTicker: error en {entry.name}", file=sys.stderr)
+                traceback.print_exc()
+                keep = False
+            entry.seconds += time.perf_counter() - began
+            entry.calls += 1
+            calls += 1
+            if keep is False:
+                self.unregister(entry)
+            else:
+                entry.due = began + entry.interval_ms() / 1000
+        self.ticks += 1
+        self.last_calls = calls
+        self.last_tick_ms = (time.perf_counter() - start) * 1000
+        self.max_tick_ms = max(self.max_tick_ms, self.last_tick_ms)
+        self.total_ms += self.last_tick_ms
+        self._schedule()
+
+    def stats(self):
+        """Callbacks registrados, coste del último tick y tiempo acumulado por callback"""
+        return {
+            'registered': len(self.entries),
+            'ticks': self.ticks,
+            'last_calls': self.last_calls,
+            'last_tick_ms': round(self.last_tick_ms, 3),
+            'max_tick_ms': round(self.max_tick_ms, 3),
+            'total_ms': round(self.total_ms, 3),
+            'callbacks': {entry.name: {'calls': entry.calls, 'ms': round(entry.seconds * 1000, 3)}
+                          for entry in self.entries}
+        }
+
+
+class ProgressChannel:
+    """Canal de progreso seguro entre hilos devuelto por show_progress.
+
+    Cualquier hilo publica con post()/advance(); solo se guarda el último
+    valor de cada campo. La interfaz aplica los cambios en un tick fijo del
+    UiTicker (~30 Hz), así el coste de redibujar es constante sin importar
+    cuántos elementos se procesen. Cada canal maneja una fila del
+    ProgressPanel y la devuelve al panel al cerrarse; su token se cancela
+    con el botón Cancelar de la fila.
+    """
+    TICK_MS = 33
+
+    def __init__(self, row, maximum, ticker, on_close=None):
+        self.row = row
+        self.progress_bar = row.progress_bar
+        self.status_label = row.status_label
+        self.percent_label = row.percent_label
+        self._on_close = on_close
+        self.token = CancelToken()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._value = 0
+        self._maximum = maximum
+        self._closed = False
+        self._released = False
+        self._last_pump = 0.0
+        self._ui_thread = threading.current_thread()
+        ticker.register(self._tick, self.TICK_MS, widget=row.frame)
+
+    def post(self, value=None, status=None, maximum=None, detail=None, mode=None):
+        """Publicar un nuevo estado; los valores intermedios se descartan"""
+        with self._lock:
+            if value is not None:
+                self._value = value
+                self._pending['value'] = value
+            if maximum is not None:
+                self._maximum = maximum
+                self._pending['maximum'] = maximum
+            if status is not None:
+                self._pending['status'] = status
+            if detail is not None:
+                self._pending['detail'] = detail
+            if mode is not None:
+                self._pending['mode'] = mode
+        self.pump()
+
+    def advance(self, amount=1, status=None):
+        """Sumar al valor actual"""
+        with self._lock:
+            value = self._value + amount
+        self.post(value=value, status=status)
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+    def cancel(self):
+        """Pedir la cancelación (botón Cancelar); la acción se detiene en su próximo control"""
+        self.token.cancel()
+        self.post(status="Cancelando...")
+        if threading.current_thread() is self._ui_thread:
+            try:
+                self.row.cancel_button.configure(state='disabled')
+            except Exception:
+                pass
+
+    def close(self):
+        """Terminar el trabajo desde cualquier hilo; la fila vuelve al panel"""
+        with self._lock:
+            self._closed = True
+        if threading.current_thread() is self._ui_thread:
+            self._release()
+
+    def pump(self):
+        """Redibujar como mucho una vez por tick cuando se llama desde el hilo de la interfaz.
+
+        Solo se procesan las tareas pendientes de dibujo (update_idletasks):
+        un update() completo atendería clics y temporizadores en mitad de
+        quien llama, incluido el propio UiTicker.
+        """
+        if threading.current_thread() is not self._ui_thread:
+            return
+        now = time.perf_counter()
+        if now - self._last_pump < self.TICK_MS / 1000:
+            return
+        self._last_pump = now
+        self._drain()
+        try:
+            self.row.frame.update_idletasks()
+        except Exception:
+            pass
+
+    def _drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            maximum = self._maximum
+        if not pending:
+            return
+        try:
+            if 'mode' in pending:
+                self.progress_bar.configure(mode=pending['mode'])
+                if pending['mode'] == 'indeterminate':
+                    self.progress_bar.start(20)
+                else:
+                    self.progress_bar.stop()
+            if 'maximum' in pending:
+                self.progress_bar.configure(maximum=max(maximum, 1))
+            if 'value' in pending:
+                self.progress_bar['value'] = pending['value']
+                if 'detail' not in pending:
+                    percent = int((pending['value'] / max(maximum, 1)) * 100)
+                    self.percent_label.config(text=f"{min(percent, 100)}%")
+            if 'detail' in pending:
+                self.percent_label.config(text=pending['detail'])
+            if 'status' in pending:
+                self.status_label.config(text=pending['status'])
+        except Exception:
+            pass
+
+    def _tick(self):
+        if self._closed:
+            self._release()
+            return False
+        self._drain()
+
+    def _release(self):
+        if self._released:
+            return
+        self._released = True
+        if self._on_close is not None:
+            self._on_close(self.row)
+
+
+class _ProgressRow:
+    __slots__ = ('frame', 'title_label', 'percent_label', 'status_label', 'progress_bar', 'cancel_button')
+
+    def __init__(self, frame, title_label, percent_label, status_label, progress_bar, cancel_button):
+        self.frame = frame
+        self.title_label = title_label
+        self.percent_label = percent_label
+        self.status_label = status_label
+        self.progress_bar = progress_bar
+        self.cancel_button = cancel_button
+
+
+class ProgressPanel:
+    """Panel de actividad persistente y no modal para todas las acciones.
+
+    La ventana se crea con el primer trabajo y después solo se muestra u
+    oculta. Cada trabajo en curso ocupa una fila con su propia barra; las
+    filas terminadas se guardan y se reutilizan, así abrir un trabajo no
+    crea widgets salvo que haya más trabajos simultáneos que nunca.
+    """
+    ICONS = ["⚡", "💫", "✨", "⭐"]
+    ICON_MS = 500
+
+    def __init__(self, root, ticker):
+        self.root = root
+        self.ticker = ticker
+        self.window = None
+        self.rows_frame = None
+        self.icon_label = None
+        self.count_label = None
+        self.active = []
+        self.free = []
+        self.windows_created = 0
+        self.rows_created = 0
+        self._animating = False
+
+    def open(self, title, maximum):
+        """Añadir un trabajo al panel y devolver su ProgressChannel (hilo de Tk)"""
+        self._ensure_window()
+        row = self.free.pop() if self.free else self._create_row()
+        row.title_label.configure(text=title)
+        row.status_label.configure(text="Iniciando...")
+        row.percent_label.configure(text="0%")
+        row.progress_bar.stop()
+        row.progress_bar.configure(mode='determinate', maximum=max(maximum, 1))
+        row.progress_bar['value'] = 0
+        row.frame.pack(fill='x', pady=(10, 0))
+        self.active.append(row)
+        self._update_header()
+        if len(self.active) == 1:
+            self.window.deiconify()
+            self.window.lift()
+        if not self._animating:
+            self._animating = True
+            self.ticker.register(self._animate, self.ICON_MS, widget=self.window)
+        channel = ProgressChannel(row, maximum, self.ticker, on_close=self.release)
+        row.cancel_button.configure(command=channel.cancel, state='normal')
+        return channel
+
+    def release(self, row):
+        """Quitar la fila de un trabajo terminado y guardarla para el siguiente"""
+        if row not in self.active:
+            return
+        self.active.remove(row)
+        try:
+            row.progress_bar.stop()
+            row.frame.pack_forget()
+            self.free.append(row)
+            self._update_header()
+            if not self.active:
+                self.window.withdraw()
+        except Exception:
+            pass  # La ventana ya no existe: se vuelve a crear con el siguiente trabajo
+
+    def hide(self):
+        """Ocultar el panel; los trabajos siguen y vuelve a aparecer con el próximo"""
+        try:
+            self.window.withdraw()
+        except Exception:
+            pass
+
+    def _ensure_window(self):
+        if self.window is not None and UiTicker._alive(self.window):
+            return
+        self.active, self.free = [], []
+        self._animating = False
+        window = Toplevel(self.root)
+        window.withdraw()
+        window.title("Actividad")
+        window.configure(bg='#161b22')
+        window.transient(self.root)
+        window.resizable(False, False)
+        window.protocol("WM_DELETE_WINDOW", self.hide)
+        
+        main_frame = Frame(window, bg='#161b22', padx=30, pady=20)
+        main_frame.pack(expand=True, fill='both')
+        
+        header = Frame(main_frame, bg='#161b22')
+        header.pack(fill='x')
+        self.icon_label = Label(header, text=self.ICONS[0], fg='#66c0f4', bg='#161b22', font=('Segoe UI', 24))
+        self.icon_label.pack(side='left', padx=(0, 15))
+        self.count_label = Label(header, text="", fg='#c9d1d9', bg='#161b22', font=('Segoe UI', 11))
+        self.count_label.pack(side='left')
+        
+        self.rows_frame = Frame(main_frame, bg='#161b22')
+        self.rows_frame.pack(fill='both', expand=True)
+        
+        # Posición fija calculada una sola vez (el alto crece con las filas)
+        x = (window.winfo_screenwidth() // 2) - 230
+        y = (window.winfo_screenheight() // 2) - 150
+        window.geometry(f'+{x}+{y}')
+        self.window = window
+        self.windows_created += 1
+
+    def _create_row(self):
+        frame = Frame(self.rows_frame, bg='#161b22')
+        top = Frame(frame, bg='#161b22')
+        top.pack(fill='x')
+        title_label = Label(top, bg='#161b22', fg='#e2e8f0', font=('Segoe UI', 11, 'bold'), anchor='w')
+        title_label.pack(side='left')
+        cancel_button = Button(top, text="Cancelar", bg='#21262d', fg='#c9d1d9',
+                               activebackground='#30363d', activeforeground='#ffffff',
+                               relief='flat', borderwidth=0, padx=10, font=('Segoe UI', 9), cursor='hand2')
+        cancel_button.pack(side='right', padx=(10, 0))
+        percent_label = Label(top, bg='#161b22', fg='#66c0f4', font=('Segoe UI', 12, 'bold'))
+        percent_label.pack(side='right')
+        status_label = Label(frame, bg='#161b22', fg='#c9d1d9', font=('Segoe UI', 10), anchor='w')
+        status_label.pack(fill='x', pady=(2, 6))
+        progress_bar = ttk.Progressbar(frame, style="Modern.Horizontal.TProgressbar", length=400, mode='determinate')
+        progress_bar.pack(fill='x')
+        self.rows_created += 1
+        return _ProgressRow(frame, title_label, percent_label, status_label, progress_bar, cancel_button)
+
+    def _update_header(self):
+        count = len(self.active)
+        self.count_label.configure(text="1 tarea en curso" if count == 1 else f"{count} tareas en curso")
+
+    def _animate(self):
+        if not self.active:
+            self._animating = False
+            return False  # Sin trabajos no hay animación registrada
+        current = self.icon_label.cget("text")
+        self.icon_label.configure(text=self.ICONS[(self.ICONS.index(current) + 1) % len(self.ICONS)])
+
+
+def build_color_cycle(step=5):
+    """Precalcular el ciclo RGB del título (verde → rojo → azul → verde) como colores hex"""
+    r, g, b, direction = 0, 255, 0, 1
+    seen = set()
+    palette = []
+    while (r, g, b, direction) not in seen:
+        seen.add((r, g, b, direction))
+        palette.append(f'#{r:02x}{g:02x}{b:02x}')
+        if direction == 1:
+            if r < 255 and b == 0:
+                r, g = r + step, g - step
+            elif g < 255 and r == 0:
+                g, b = g + step, b - step
+            elif b < 255 and g == 0:
+                b, r = b + step, r - step
+            else:
+                direction = -1
+        else:
+            if r > 0 and b == 0:
+                r, g = r - step, g + step
+            elif g > 0 and r == 0:
+                g, b = g - step, b + step
+            elif b > 0 and g == 0:
+                b, r = b - step, r + step
+            else:
+                direction = 1
+        r, g, b = max(0, min(255, r)), max(0, min(255, g)), max(0, min(255, b))
+    return palette
+
+
+class ColorAnimator:
+    """Animación de color con paleta precalculada.
+
+    Cada tick solo reconfigura los widgets registrados con add(); no toca
+    estilos ttk globales. Se pausa con la ventana minimizada o sin foco y
+    mide el coste de cada tick: si la media supera max_tick_ms, baja la
+    frecuencia hasta MAX_INTERVAL_MS.
+    """
+    MAX_INTERVAL_MS = 400
+
+    def __init__(self, root, ticker, interval_ms=50, max_tick_ms=2.0):
+        self.root = root
+        self.ticker = ticker
+        self.palette = build_color_cycle()
+        self.index = 0
+        self.base_interval_ms = interval_ms
+        self.interval_ms = interval_ms
+        self.max_tick_ms = max_tick_ms
+        self.targets = []  # (widget, opción)
+        self.ticks = 0
+        self.last_tick_ms = 0.0
+        self.average_tick_ms = 0.0
+        self.paused = False
+
+    @property
+    def color(self):
+        return self.palette[self.index]
+
+    def add(self, widget, option='fg'):
+        widget.configure({option: self.color})
+        self.targets.append((widget, option))
+        return widget
+
+    def remove(self, widget):
+        self.targets = [target for target in self.targets if target[0] is not widget]
+
+    def is_visible(self):
+        """La animación solo corre con la ventana visible y con foco"""
+        try:
+            return self.root.state() != 'iconic' and self.root.focus_displayof() is not None
+        except Exception:
+            return False
+
+    def tick(self):
+        self.paused = not self.is_visible()
+        if self.paused or not self.targets:
+            return
+        start = time.perf_counter()
+        self.index = (self.index + 1) % len(self.palette)
+        color = self.palette[self.index]
+        alive = []
+        for widget, option in self.targets:
+            try:
+                widget.configure({option: color})
+                alive.append((widget, option))
+            except Exception:
+                pass  # Widget destruido: se deja de animar
+        self.targets = alive
+        self.last_tick_ms = (time.perf_counter() - start) * 1000
+        self.ticks += 1
+        self.average_tick_ms += (self.last_tick_ms - self.average_tick_ms) * 0.1
+        # Limitar el coste: si la media pasa el tope se anima con menos frecuencia
+        if self.average_tick_ms > self.max_tick_ms:
+            self.interval_ms = min(self.interval_ms * 2, self.MAX_INTERVAL_MS)
+        elif self.average_tick_ms < self.max_tick_ms / 2:
+            self.interval_ms = max(self.interval_ms // 2, self.base_interval_ms)
+
+    def stats(self):
+        return {'ticks': self.ticks, 'targets': len(self.targets), 'paused': self.paused,
+                'last_tick_ms': round(self.last_tick_ms, 3), 'average_tick_ms': round(self.average_tick_ms, 3),
+                'interval_ms': self.interval_ms, 'max_tick_ms': self.max_tick_ms}
+
+    def start(self):
+        self.ticker.register(self.tick, lambda: self.interval_ms)
+
+
+class TooltipPool:
+    """Una sola ventana de tooltip reutilizada por toda la aplicación.
+
+    La ventana y su Label se crean la primera vez que hacen falta; después
+    cada tooltip solo cambia texto, estilo y posición y se oculta con
+    withdraw(). Mostrarlo espera show_delay_ms (con el UiTicker), así que
+    pasar el ratón por encima de varias tarjetas no dibuja nada.
+    """
+    STYLES = {
+        'modern': {'bg': '#161b22', 'fg': '#c9d1d9', 'font': ('Segoe UI', 10), 'padx': 12, 'pady': 8},
+        'classic': {'bg': 'black', 'fg': 'white', 'font': ('Arial', 9), 'padx': 10, 'pady': 5},
+    }
+
+    def __init__(self, root, ticker, show_delay_ms=400):
+        self.root = root
+        self.ticker = ticker
+        self.show_delay_ms = show_delay_ms
+        self.window = None
+        self.label = None
+        self.owner = None  # Widget cuyo tooltip se ve ahora
+        self._pending = None  # (widget, entrada del ticker) esperando el retardo
+        self.windows_created = 0
+        self.shown = 0
+
+    def attach(self, widget, text, style='modern', fg=None):
+        """Mostrar text al pasar por widget; fg puede ser un color o una función que lo devuelve"""
+        options = dict(self.STYLES[style])
+        if fg is not None:
+            options['fg'] = fg
+        widget.bind('<Enter>', lambda event: self.schedule(widget, text, options), add='+')
+        widget.bind('<Leave>', lambda event: self.hide(widget), add='+')
+        widget.bind('<ButtonPress>', lambda event: self.hide(widget), add='+')
+        widget.bind('<Destroy>', lambda event: self.hide(widget), add='+')
+
+    def schedule(self, widget, text, options):
+        self._cancel()
+        entry = self.ticker.register(lambda: self._show(widget, text, options), self.show_delay_ms, widget=widget)
+        self._pending = (widget, entry)
+
+    def hide(self, widget=None):
+        """Ocultar el tooltip (solo si pertenece a widget, cuando se indica)"""
+        if widget is None or (self._pending and self._pending[0] is widget):
+            self._cancel()
+        if self.owner is not None and (widget is None or self.owner is widget):
+            self.owner = None
+            try:
+                self.window.withdraw()
+            except Exception:
+                pass
+
+    def _cancel(self):
+        if self._pending is not None:
+            self.ticker.unregister(self._pending[1])
+            self._pending = None
+
+    def _ensure_window(self):
+        if self.window is None or not UiTicker._alive(self.window):
+            self.window = Toplevel(self.root)
+            self.window.withdraw()
+            self.window.wm_overrideredirect(True)
+            self.window.attributes('-topmost', True)  # Mantener tooltip siempre visible
+            self.label = Label(self.window, justify='left')
+            self.label.pack()
+            self.windows_created += 1
+        return self.window
+
+    def _show(self, widget, text, options):
+        self._pending = None
+        try:
+            window = self._ensure_window()
+            style = {name: value() if callable(value) else value for name, value in options.items()}
+            window.configure(bg=style['bg'])
+            self.label.configure(text=text, **style)
+            x = widget.winfo_rootx() + widget.winfo_width() + 10
+            y = widget.winfo_rooty()
+            window.geometry(f"+{x}+{y}")
+            window.deiconify()
+            window.lift()
+            self.owner = widget
+            self.shown += 1
+        except Exception:
+            pass
+        return False  # Se muestra una vez por cada <Enter>
+
+
+class CommandResult:
+    """Resultado de un comando: código de salida, salida capturada y duración"""
+    __slots__ = ('command', 'returncode', 'stdout', 'stderr', 'seconds', 'timed_out', 'cancelled')
+
+    def __init__(self, command, returncode, stdout='', stderr='', seconds=0.0, timed_out=False, cancelled=False):
+        self.command = command
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.seconds = seconds
+        self.timed_out = timed_out
+        self.cancelled = cancelled
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out and not self.cancelled
+
+    def __repr__(self):
+        return f"CommandResult({self.command!r}, returncode={self.returncode}, seconds={self.seconds:.3f})"
+
+
+def terminate_process_tree(process, grace=3.0):
+    """Terminar un proceso lanzado con shell=True junto con sus hijos (chkdsk, defrag...)"""
+    try:
+        children = psutil.Process(process.pid).children(recursive=True)
+    except Exception:
+        children = []
+    # Primero el shell, para que no lance el siguiente comando de la línea
+    try:
+        process.terminate()
+    except OSError:
+        pass
+    for child in children:
+        try:
+            child.terminate()
+        except Exception:
+            pass
+    try:
+        _, alive = psutil.wait_procs(children, timeout=grace)
+        for child in alive:
+            child.kill()
+    except Exception:
+        pass
+
+
+class SubprocessBackend:
+    """Backend real: ejecuta el comando con cmd.exe"""
+    DRAIN_SECONDS = 5.0  # Espera máxima de la salida tras terminar un comando vencido
+
+    def run(self, command, timeout=None, token=None):
+        process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   stdin=subprocess.DEVNULL, text=True, errors='replace')
+        # Al cancelar se termina el proceso y sus hijos; communicate() vuelve en el acto
+        stop = token.on_cancel(partial(terminate_process_tree, process)) if token is not None else None
+        try:
+            stdout, stderr = process.communicate(timeout=timeout)
+            return process.returncode, stdout, stderr, False
+        except subprocess.TimeoutExpired:
+            # Matar solo cmd.exe no basta: los hijos conservan las tuberías y communicate() esperaría por ellos
+            terminate_process_tree(process)
+            try:
+                stdout, stderr = process.communicate(timeout=self.DRAIN_SECONDS)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                for pipe in (process.stdout, process.stderr):
+                    try:
+                        pipe.close()
+                    except OSError:
+                        pass
+                stdout, stderr = '', ''
+                try:
+                    # Recoger el proceso: fija returncode y no deja un zombi
+                    process.wait(timeout=self.DRAIN_SECONDS)
+                except subprocess.TimeoutExpired:
+                    pass
+            return process.returncode, stdout, stderr, True
+        finally:
+            if stop is not None:
+                token.remove(stop)
+
+
+class FakeBackend:
+    """Backend de prueba: registra las invocaciones sin ejecutar nada.
+
+    responses relaciona un prefijo de comando con (returncode, stdout, stderr).
+    """
+
+    def __init__(self, responses=None, delay=0.0):
+        self.responses = responses or {}
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def run(self, command, timeout=None, token=None):
+        with self._lock:
+            self.calls.append(command)
+        if self.delay:
+            if token is not None:
+                if token.wait(self.delay):
+                    return 1, '', 'cancelado', False
+            else:
+                time.sleep(self.delay)
+        for prefix, response in self.responses.items():
+            if command.startswith(prefix):
+                return response[0], response[1], response[2], False
+        return 0, '', '', False
+
+
+class CommandExecutor:
+    """Punto único de ejecución de comandos del sistema.
+
+    run() ejecuta un comando; run_many() ejecuta comandos independientes en
+    paralelo con un límite de concurrencia. Un elemento de run_many puede ser
+    una tupla de comandos, que se ejecutan en orden dentro del mismo hilo.
+    Cada resultado queda registrado en history con su duración. Con un
+    CancelToken los comandos pendientes no se lanzan y el que está en curso
+    se termina; sus resultados quedan marcados como cancelled.
+    """
+
+    def __init__(self, backend=None, max_concurrency=8, timeout=None):
+        self.backend = backend or SubprocessBackend()
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.history = []
+        self._lock = threading.Lock()
+
+    def run(self, command, timeout=None, token=None):
+        if token is not None and token.cancelled:
+            return CommandResult(command, -1, cancelled=True)
+        start = time.perf_counter()
+        try:
+            returncode, stdout, stderr, timed_out = self.backend.run(
+                command, timeout if timeout is not None else self.timeout, token=token)
+        except OSError as error:
+            returncode, stdout, stderr, timed_out = -1, '', str(error), False
+        # Un comando que terminó bien justo antes de cancelar no cuenta como cancelado
+        cancelled = token is not None and token.cancelled and returncode != 0
+        result = CommandResult(command, returncode, stdout, stderr,
+                               time.perf_counter() - start, timed_out, cancelled)
+        with self._lock:
+            self.history.append(result)
+        return result
+
+    def run_many(self, commands, max_concurrency=None, timeout=None, callback=None, token=None):
+        """Ejecutar comandos independientes en paralelo; devuelve los resultados en orden.
+
+        callback(index, result) se llama al terminar cada elemento.
+        """
+        commands = list(commands)
+        results = [None] * len(commands)
+        if not commands:
+            return results
+
+        def run_item(item):
+            if isinstance(item, (tuple, list)):
+                return [self.run(command, timeout, token) for command in item]
+            return self.run(item, timeout, token)
+
+        workers = min(max_concurrency or self.max_concurrency, len(commands))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(run_item, item): index for index, item in enumerate(commands)}
+            for future in as_completed(futures):
+                index = futures[future]
+                results[index] = future.result()
+                if callback:
+                    callback(index, results[index])
+        return results
+
+
+# Tipos de valor del registro (mismos números que winreg)
+REG_SZ = 1
+REG_EXPAND_SZ = 2
+REG_DWORD = 4
+REG_QWORD = 11
+
+REGISTRY_TYPES = {
+    'REG_SZ': REG_SZ,
+    'REG_EXPAND_SZ': REG_EXPAND_SZ,
+    'REG_DWORD': REG_DWORD,
+    'REG_QWORD': REG_QWORD
+}
+
+REGISTRY_HIVES = {
+    'HKLM': 'HKLM', 'HKEY_LOCAL_MACHINE': 'HKLM',
+    'HKCU': 'HKCU', 'HKEY_CURRENT_USER': 'HKCU',
+    'HKCR': 'HKCR', 'HKEY_CLASSES_ROOT': 'HKCR',
+    'HKU': 'HKU', 'HKEY_USERS': 'HKU'
+}
+
+
+def split_registry_key(full_key):
+    """Separar 'HKLM\\SOFTWARE\\...' en ('HKLM', 'SOFTWARE\\...')"""
+    hive, _, subkey = full_key.partition('\\')
+    try:
+        return REGISTRY_HIVES[hive.upper()], subkey
+    except KeyError:
+        raise ValueError(f"Colmena de registro desconocida: {hive}")
+
+
+class RegistryBatch:
+    """Conjunto de cambios del registro agrupados por colmena y clave"""
+
+    def __init__(self):
+        self.writes = {}  # (colmena, clave en minúsculas) -> [clave, {nombre: (tipo, dato)}]
+        self.removals = {}  # (colmena, clave en minúsculas) -> [clave, {nombres}]
+        self.deletes = []
+
+    def set(self, full_key, name, data, value_type=None):
+        if value_type is None:
+            value_type = REG_DWORD if isinstance(data, int) else REG_SZ
+        elif isinstance(value_type, str):
+            value_type = REGISTRY_TYPES[value_type]
+        hive, subkey = split_registry_key(full_key)
+        group = self.writes.setdefault((hive, subkey.lower()), [subkey, {}])
+        group[1][name] = (value_type, data)
+        return self
+
+    def delete_key(self, full_key):
+        self.deletes.append(split_registry_key(full_key))
+        return self
+
+    def delete_value(self, full_key, name):
+        hive, subkey = split_registry_key(full_key)
+        self.removals.setdefault((hive, subkey.lower()), [subkey, set()])[1].add(name)
+        return self
+
+    def __len__(self):
+        return (sum(len(values) for _, values in self.writes.values()) +
+                sum(len(names) for _, names in self.removals.values()) + len(self.deletes))
+
+
+class WinregBackend:
+    """Backend real basado en winreg: abre cada clave una sola vez"""
+
+    def _hive(self, hive):
+        return {
+            'HKLM': winreg.HKEY_LOCAL_MACHINE,
+            'HKCU': winreg.HKEY_CURRENT_USER,
+            'HKCR': winreg.HKEY_CLASSES_ROOT,
+            'HKU': winreg.HKEY_USERS
+        }[hive]
+
+    def write_key(self, hive, key, values):
+        access = winreg.KEY_SET_VALUE | winreg.KEY_WOW64_64KEY
+        with winreg.CreateKeyEx(self._hive(hive), key, 0, access) as handle:
+            for name, (value_type, data) in values.items():
+                winreg.SetValueEx(handle, name, 0, value_type, data)
+
+    def read_values(self, hive, key, names):
+        """Leer varios valores de una clave abriéndola una sola vez (None si no existen)"""
+        values = dict.fromkeys(names)
+        try:
+            with winreg.OpenKey(self._hive(hive), key, 0, winreg.KEY_READ | winreg.KEY_WOW64_64KEY) as handle:
+                for name in names:
+                    try:
+                        data, value_type = winreg.QueryValueEx(handle, name)
+                        values[name] = (value_type, data)
+                    except FileNotFoundError:
+                        pass
+        except FileNotFoundError:
+            pass
+        return values
+
+    def delete_tree(self, hive, key):
+        # Equivalente a 'reg delete /f': borrar primero las subclaves
+        access = winreg.KEY_ALL_ACCESS | winreg.KEY_WOW64_64KEY
+        try:
+            with winreg.OpenKey(self._hive(hive), key, 0, access) as handle:
+                while True:
+                    try:
+                        child = winreg.EnumKey(handle, 0)
+                    except OSError:
+                        break
+                    self.delete_tree(hive, f"{key}\\{child}")
+        except FileNotFoundError:
+            return
+        winreg.DeleteKeyEx(self._hive(hive), key, winreg.KEY_WOW64_64KEY, 0)
+
+    def delete_values(self, hive, key, names):
+        access = winreg.KEY_SET_VALUE | winreg.KEY_WOW64_64KEY
+        try:
+            with winreg.OpenKey(self._hive(hive), key, 0, access) as handle:
+                for name in names:
+                    try:
+                        winreg.DeleteValue(handle, name)
+                    except FileNotFoundError:
+                        pass
+        except FileNotFoundError:
+            pass
+
+
+class MemoryRegistryBackend:
+    """Registro en memoria para Linux y pruebas"""
+
+    def __init__(self):
+        self.keys = {}  # (colmena, clave en minúsculas) -> {nombre: (tipo, dato)}
+        self.opened = 0
+
+    def write_key(self, hive, key, values):
+        self.opened += 1
+        self.keys.setdefault((hive, key.lower()), {}).update(values)
+
+    def read_values(self, hive, key, names):
+        self.opened += 1
+        stored = self.keys.get((hive, key.lower()), {})
+        return {name: stored.get(name) for name in names}
+
+    def delete_tree(self, hive, key):
+        prefix = key.lower()
+        for stored in [stored for stored in self.keys
+                       if stored[0] == hive and (stored[1] == prefix or stored[1].startswith(prefix + '\\'))]:
+            del self.keys[stored]
+
+    def delete_values(self, hive, key, names):
+        self.opened += 1
+        stored = self.keys.get((hive, key.lower()), {})
+        for name in names:
+            stored.pop(name, None)
+
+
+class RegistryWriter:
+    """Aplica un RegistryBatch abriendo cada clave una vez y escribiendo sus valores en bloque"""
+
+    def __init__(self, backend=None):
+        if backend is None:
+            backend = WinregBackend() if winreg is not None else MemoryRegistryBackend()
+        self.backend = backend
+
+    def apply(self, batch):
+        """Aplicar el lote; devuelve (valores escritos, lista de errores)"""
+        written = 0
+        errors = []
+        for hive, key in batch.deletes:
+            try:
+                self.backend.delete_tree(hive, key)
+                written += 1
+            except OSError as error:
+                errors.append((f"{hive}\\{key}", error))
+        for (hive, _), (key, names) in batch.removals.items():
+            try:
+                self.backend.delete_values(hive, key, names)
+                written += len(names)
+            except OSError as error:
+                errors.append((f"{hive}\\{key}", error))
+        for (hive, _), (key, values) in batch.writes.items():
+            try:
+                self.backend.write_key(hive, key, values)
+                written += len(values)
+            except OSError as error:
+                errors.append((f"{hive}\\{key}", error))
+        return written, errors
+
+    def read(self, batch):
+        """Leer en una pasada los valores actuales de todas las escrituras del lote"""
+        current = {}
+        for (hive, lowered), (key, values) in batch.writes.items():
+            try:
+                current[(hive, lowered)] = self.backend.read_values(hive, key, list(values))
+            except OSError:
+                current[(hive, lowered)] = dict.fromkeys(values)
+        return current
+
+
+# Esquemas de energía de Windows
+HIGH_PERFORMANCE_SCHEME = '8c5e7fda-e8bf-4a96-9a85-a6e23a8c635c'
+BALANCED_SCHEME = '381b4222-f694-41f0-9685-ff5bb260df2e'
+
+# Ubicación del estado que el planificador consulta directamente en el registro
+POWER_SCHEME_KEY = "HKLM\\SYSTEM\\CurrentControlSet\\Control\\Power\\User\\PowerSchemes"
+SERVICES_KEY = "HKLM\\SYSTEM\\CurrentControlSet\\Services"
+
+# Valor 'Start' de un servicio según el tipo de inicio de 'sc config'
+SERVICE_START_TYPES = {'boot': 0, 'system': 1, 'auto': 2, 'demand': 3, 'disabled': 4}
+
+
+class SystemStateReader:
+    """Lectura en bloque del estado actual: registro, servicios y plan de energía.
+
+    services permite inyectar el estado de los servicios ({nombre: en ejecución})
+    para pruebas; si no se indica se consulta psutil en Windows.
+    """
+
+    def __init__(self, registry, services=None):
+        self.registry = registry
+        self.services = services
+
+    def read_registry(self, batch):
+        return self.registry.read(batch)
+
+    def read_services(self, names):
+        """Devolver {nombre: (valor Start, en ejecución)} para los servicios pedidos"""
+        lookup = RegistryBatch()
+        for name in names:
+            lookup.set(f"{SERVICES_KEY}\\{name}", 'Start', 0)
+        current = self.registry.read(lookup)
+        running = self._running_services(names)
+        states = {}
+        for name in names:
+            _, subkey = split_registry_key(f"{SERVICES_KEY}\\{name}")
+            value = current.get(('HKLM', subkey.lower()), {}).get('Start')
+            states[name] = (value[1] if value else None, running.get(name.lower(), False))
+        return states
+
+    def _running_services(self, names):
+        if self.services is not None:
+            return {name.lower(): running for name, running in self.services.items()}
+        if not hasattr(psutil, 'win_service_iter'):
+            return {}  # Estado desconocido: no se detiene ni se vuelve a iniciar nada
+        wanted = {name.lower() for name in names}
+        running = {}
+        for service in psutil.win_service_iter():
+            name = service.name().lower()
+            if name in wanted:
+                try:
+                    running[name] = service.status() == 'running'
+                except Exception:
+                    running[name] = True
+        return running
+
+    def read_power_scheme(self):
+        lookup = RegistryBatch().set(POWER_SCHEME_KEY, 'ActivePowerScheme', '')
+        for values in self.registry.read(lookup).values():
+            value = values.get('ActivePowerScheme')
+            if value:
+                return str(value[1]).lower()
+        return None
+
+
+class TweakPlan:
+    """Resultado de comparar el estado deseado con el actual"""
+
+    def __init__(self):
+        self.registry = RegistryBatch()
+        self.services = {}  # nombre -> (tipo de inicio o None, detener)
+        self.power_scheme = None
+        self.total = 0
+        self.already_applied = 0
+        # Valor previo de cada cambio pendiente, para el diario de cambios
+        self.previous_registry = {}  # (colmena, clave, nombre) -> (tipo, dato) o None
+        self.previous_services = {}  # nombre -> (valor Start, en ejecución)
+        self.previous_power_scheme = None
+        self.failures = []  # Escrituras y comandos que fallaron al aplicar el plan
+
+    @property
+    def pending(self):
+        return self.total - self.already_applied
+
+    def summary(self):
+        return f"{self.already_applied} de {self.total} ajustes ya estaban aplicados"
+
+    def failure_summary(self):
+        """Texto con los ajustes que no se aplicaron (vacío si todo salió bien)"""
+        if not self.failures:
+            return ""
+        return f"{len(self.failures)} ajustes no se aplicaron:\n" + "\n".join(f"• {failure}" for failure in self.failures)
+
+    def subset(self, registry=None, services=(), power_scheme=None):
+        """Parte pendiente del plan que corresponde a un paso concreto"""
+        part = TweakPlan()
+        if registry is not None:
+            for group_id, (key, values) in registry.writes.items():
+                pending = self.registry.writes.get(group_id, (key, {}))[1]
+                for name in values:
+                    if name in pending:
+                        value_type, data = pending[name]
+                        part.registry.set(f"{group_id[0]}\\{key}", name, data, value_type)
+                        previous = (group_id[0], key, name)
+                        if previous in self.previous_registry:
+                            part.previous_registry[previous] = self.previous_registry[previous]
+            part.registry.deletes.extend(registry.deletes)
+        for name in services:
+            if name in self.services:
+                part.services[name] = self.services[name]
+                part.previous_services[name] = self.previous_services.get(name)
+        if power_scheme and self.power_scheme == power_scheme:
+            part.power_scheme = power_scheme
+            part.previous_power_scheme = self.previous_power_scheme
+        return part
+
+
+class TweakPlanner:
+    """Planificador idempotente: solo ejecuta los pasos cuyo valor cambia"""
+
+    def __init__(self, registry, executor, state=None):
+        self.registry = registry
+        self.executor = executor
+        self.state = state or SystemStateReader(registry)
+
+    def plan(self, registry=None, services=None, power_scheme=None):
+        """Construir el plan.
+
+        registry: RegistryBatch con los valores deseados.
+        services: {nombre: tipo de inicio} ('disabled', 'demand'...); se
+        detienen los servicios que se desactivan y siguen en ejecución.
+        power_scheme: GUID del plan de energía deseado.
+        """
+        plan = TweakPlan()
+
+        if registry is not None:
+            current = self.state.read_registry(registry)
+            for group_id, (key, values) in registry.writes.items():
+                for name, wanted in values.items():
+                    plan.total += 1
+                    existing = current.get(group_id, {}).get(name)
+                    if existing == wanted:
+                        plan.already_applied += 1
+                    else:
+                        hive = group_id[0]
+                        plan.registry.set(f"{hive}\\{key}", name, wanted[1], wanted[0])
+                        plan.previous_registry[(hive, key, name)] = existing
+            plan.total += len(registry.deletes)
+            plan.registry.deletes.extend(registry.deletes)
+
+        if services:
+            states = self.state.read_services(list(services))
+            for name, start_type in services.items():
+                plan.total += 1
+                start, running = states[name]
+                change_start = start != SERVICE_START_TYPES[start_type]
+                stop = start_type == 'disabled' and running
+                if change_start or stop:
+                    plan.services[name] = (start_type if change_start else None, stop)
+                    plan.previous_services[name] = (start, running)
+                else:
+                    plan.already_applied += 1
+
+        if power_scheme:
+            plan.total += 1
+            active = self.state.read_power_scheme()
+            if active == power_scheme.lower():
+                plan.already_applied += 1
+            else:
+                plan.power_scheme = power_scheme
+                plan.previous_power_scheme = active
+
+        return plan
+
+    def apply(self, plan, callback=None, journal=None, token=None):
+        """Ejecutar solo los cambios pendientes del plan.
+
+        Si se indica journal (JournalRun), los valores anteriores del
+        registro y del plan de energía se guardan en disco antes de escribir
+        nada; los servicios se anotan al terminar sus comandos y solo con
+        los pasos que salieron bien. Con token, los servicios que aún no se
+        configuraron se omiten al cancelar. Lo que falla queda en
+        plan.failures.
+        """
+        plan.failures = []
+        if journal is not None:
+            journal.record(plan)
+        if len(plan.registry):
+            _, errors = self.registry.apply(plan.registry)
+            plan.failures.extend(f"Registro {key}: {error}" for key, error in errors)
+
+        names, commands = [], []
+        for name, (start_type, stop) in plan.services.items():
+            steps = []
+            if start_type:
+                steps.append(f'sc config "{name}" start={start_type}')
+            if stop:
+                steps.append(f'net stop "{name}"')
+            names.append(name)
+            commands.append(tuple(steps))
+
+        def finished(index, steps):
+            if journal is not None:
+                name = names[index]
+                start_type, stop = plan.services[name]
+                done = iter(steps)
+                configured = bool(start_type) and next(done).ok
+                stopped = stop and next(done).ok
+                journal.record_service(name, plan.previous_services.get(name), configured, stopped)
+            if callback:
+                callback(index, steps)
+
+        results = self.executor.run_many(commands, callback=finished, token=token)
+        failed = [result for steps in results for result in steps if not result.ok and not result.cancelled]
+
+        if plan.power_scheme:
+            result = self.executor.run(f'powercfg /setactive {plan.power_scheme}', token=token)
+            if not result.ok and not result.cancelled:
+                failed.append(result)
+        plan.failures.extend(f"{result.command}: código {result.returncode}" for result in failed)
+        return results
+
+
+# Tipo de inicio de 'sc config' a partir del valor 'Start' guardado en el diario
+SERVICE_START_NAMES = {value: name for name, value in SERVICE_START_TYPES.items()}
+
+
+def already_started(result):
+    """'net start' de un servicio que ya está en marcha (NET HELPMSG 2182): cuenta como restaurado"""
+    output = f"{result.stdout}\n{result.stderr}"
+    return result.command.startswith('net start') and result.returncode == 2 and '2182' in output
+
+
+class JournalRun:
+    """Diario de una ejecución: una línea JSON por valor anterior.
+
+    El archivo se crea con el primer cambio real; cada lote se vuelca a
+    disco (flush + fsync) antes de que el planificador escriba nada. Los
+    servicios se anotan después, solo con los comandos que tuvieron éxito.
+    """
+
+    def __init__(self, source, action):
+        self.source = source
+        self.action = action
+        self.changes = 0
+        self._lock = threading.Lock()
+
+    def record(self, plan):
+        lines = []
+        for (hive, key, name), old in plan.previous_registry.items():
+            lines.append({'kind': 'registry', 'key': f"{hive}\\{key}", 'name': name,
+                          'old': list(old) if old is not None else None})
+        if plan.power_scheme and plan.previous_power_scheme:
+            lines.append({'kind': 'power', 'old': plan.previous_power_scheme})
+        if lines:
+            self._append(lines)
+
+    def record_service(self, name, previous, configured, stopped):
+        """Anotar un servicio ya modificado: configured y stopped indican qué comandos salieron bien"""
+        if previous is None or not (configured or stopped):
+            return
+        start, running = previous
+        if start is None:
+            return  # Servicio sin valor Start: no existe o no se puede restaurar
+        self._append([{'kind': 'service', 'name': name, 'start': start, 'restart': bool(running and stopped)}])
+
+    def _append(self, lines):
+        with self._lock:
+            new_file = not path.exists(self.source)
+            if new_file:
+                os.makedirs(path.dirname(self.source), exist_ok=True)
+            with open(self.source, 'a', encoding='utf-8') as file:
+                if new_file:
+                    header = {'kind': 'run', 'action': self.action,
+                              'started': time.strftime('%Y-%m-%dT%H:%M:%S')}
+                    file.write(json.dumps(header, ensure_ascii=False) + '\n')
+                for line in lines:
+                    file.write(json.dumps(line, ensure_ascii=False) + '\n')
+                file.flush()
+                os.fsync(file.fileno())
+            self.changes += len(lines)
+
+
+class RollbackError(Exception):
+    """Algún ajuste no se pudo restaurar; la ejecución sigue pendiente de deshacer"""
+
+    def __init__(self, failures):
+        super().__init__("\n".join(failures))
+        self.failures = failures  # Descripción de cada escritura o comando que falló
+
+
+class ChangeJournal:
+    """Diario de cambios en disco: permite deshacer de una vez una ejecución completa"""
+
+    def __init__(self, directory=None):
+        if directory is None:
+            directory = app_data_path('journal')
+        self.directory = directory
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def begin(self, action):
+        with self._lock:
+            self._sequence += 1
+            sequence = self._sequence
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{sequence:03d}-{action}.jsonl"
+        return JournalRun(path.join(self.directory, name), action)
+
+    def runs(self):
+        """Ejecuciones registradas, de la más reciente a la más antigua"""
+        try:
+            names = [name for name in os.listdir(self.directory) if name.endswith('.jsonl')]
+        except OSError:
+            return []
+        return [path.join(self.directory, name) for name in sorted(names, reverse=True)]
+
+    @staticmethod
+    def load(source):
+        """Devolver (cabecera, cambios, ya deshecha)"""
+        header, changes, rolled_back = {}, [], False
+        with open(source, encoding='utf-8') as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry['kind'] == 'run':
+                    header = entry
+                elif entry['kind'] == 'rollback':
+                    rolled_back = True
+                else:
+                    changes.append(entry)
+        return header, changes, rolled_back
+
+    def latest(self):
+        """Ejecución más reciente que todavía se puede deshacer (None si no hay)"""
+        for source in self.runs():
+            try:
+                _, changes, rolled_back = self.load(source)
+            except (OSError, ValueError):
+                continue
+            if changes and not rolled_back:
+                return source
+        return None
+
+    def rollback(self, source, planner):
+        """Restaurar los valores anteriores de una ejecución en un solo lote.
+
+        Si un ajuste cambió varias veces en la misma ejecución se restaura
+        el primer valor registrado, que es el que había antes de empezar.
+        La ejecución solo se marca como deshecha si todo se restauró; si no,
+        se lanza RollbackError y se puede volver a intentar.
+        """
+        _, changes, rolled_back = self.load(source)
+        if rolled_back:
+            return 0
+
+        registry = RegistryBatch()
+        seen = set()
+        services = {}
+        power_scheme = None
+        for entry in changes:
+            if entry['kind'] == 'registry':
+                target = (entry['key'].lower(), entry['name'])
+                if target in seen:
+                    continue
+                seen.add(target)
+                if entry['old'] is None:
+                    registry.delete_value(entry['key'], entry['name'])
+                else:
+                    value_type, data = entry['old']
+                    registry.set(entry['key'], entry['name'], data, value_type)
+            elif entry['kind'] == 'service':
+                services.setdefault(entry['name'], (entry['start'], entry['restart']))
+            elif entry['kind'] == 'power' and power_scheme is None:
+                power_scheme = entry['old']
+
+        failures = []
+        if len(registry):
+            _, errors = planner.registry.apply(registry)
+            failures.extend(f"Registro {key}: {error}" for key, error in errors)
+
+        commands = []
+        for name, (start, restart) in services.items():
+            steps = []
+            if start in SERVICE_START_NAMES:
+                steps.append(f'sc config "{name}" start={SERVICE_START_NAMES[start]}')
+            if restart and start is not None:
+                steps.append(f'net start "{name}"')
+            if steps:
+                commands.append(tuple(steps))
+        results = []
+        for item in planner.executor.run_many(commands):
+            results.extend(item if isinstance(item, list) else [item])
+
+        if power_scheme:
+            results.append(planner.executor.run(f'powercfg /setactive {power_scheme}'))
+        failures.extend(f"{result.command}: código {result.returncode}" for result in results
+                        if not result.ok and not already_started(result))
+        if failures:
+            raise RollbackError(failures)
+
+        with open(source, 'a', encoding='utf-8') as file:
+            file.write(json.dumps({'kind': 'rollback', 'at': time.strftime('%Y-%m-%dT%H:%M:%S')}) + '\n')
+        return len(registry) + len(services) + (1 if power_scheme else 0)
+
+
+# Alias de los planes de energía que se pueden usar en los perfiles
+POWER_SCHEMES = {'high_performance': HIGH_PERFORMANCE_SCHEME, 'balanced': BALANCED_SCHEME}
+
+# Clases de prioridad de proceso (constantes de psutil, solo existen en Windows)
+PRIORITY_CLASSES = {
+    'idle': 'IDLE_PRIORITY_CLASS',
+    'below_normal': 'BELOW_NORMAL_PRIORITY_CLASS',
+    'normal': 'NORMAL_PRIORITY_CLASS',
+    'above_normal': 'ABOVE_NORMAL_PRIORITY_CLASS',
+    'high': 'HIGH_PRIORITY_CLASS',
+    'realtime': 'REALTIME_PRIORITY_CLASS'
+}
+
+GUID_PATTERN = re.compile(r'^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$', re.I)
+
+PROFILE_STEP_FIELDS = {'status', 'registry', 'services', 'power_scheme', 'commands', 'processes'}
+
+
+class ProfileError(ValueError):
+    """Perfil con formato incorrecto; el mensaje indica el campo culpable"""
+
+
+class PlanStep:
+    """Paso compilado de un perfil"""
+
+    def __init__(self, status):
+        self.status = status
+        self.registry = RegistryBatch()
+        self.services = {}  # nombre -> tipo de inicio
+        self.power_scheme = None
+        self.commands = []
+        self.kill = set()
+        self.priorities = {}  # nombre de proceso -> clase de prioridad
+
+    def touches_processes(self):
+        return bool(self.kill or self.priorities)
+
+
+class ProfileReport:
+    """Resultado de aplicar un perfil, con el tiempo de cada paso"""
+
+    def __init__(self, plan):
+        self.plan = plan
+        self.steps = []  # (estado, segundos, excepción o texto con lo que falló, o None)
+        self.seconds = 0.0
+        self.cancelled = False
+
+    @property
+    def errors(self):
+        return [(status, error) for status, _, error in self.steps if error]
+
+    def summary(self):
+        if self.cancelled:
+            return f"Cancelado tras {len(self.steps)} pasos\n{self.plan.summary()}"
+        return self.plan.summary()
+
+    def error_summary(self):
+        """Texto con los pasos que fallaron (vacío si no falló ninguno)"""
+        return "\n".join(f"• {status}: {error}" for status, error in self.errors)
+
+    def timings(self):
+        """Texto con la duración de cada paso, para el registro o el benchmark"""
+        lines = [f"{seconds * 1000:8.2f} ms  {status}" for status, seconds, _ in self.steps]
+        lines.append(f"{self.seconds * 1000:8.2f} ms  total")
+        return "\n".join(lines)
+
+
+class ExecutionPlan:
+    """Perfil validado y compilado, listo para ejecutarse tantas veces como haga falta"""
+
+    def __init__(self, name, title, message, steps):
+        self.name = name
+        self.title = title
+        self.message = message
+        self.steps = steps
+
+    def desired_state(self):
+        """Unir los valores de todos los pasos para leer el estado actual de una vez"""
+        registry = RegistryBatch()
+        services = {}
+        power_scheme = None
+        for step in self.steps:
+            for group_id, (key, values) in step.registry.writes.items():
+                for name, (value_type, data) in values.items():
+                    registry.set(f"{group_id[0]}\\{key}", name, data, value_type)
+            services.update(step.services)
+            power_scheme = step.power_scheme or power_scheme
+        return registry, services, power_scheme
+
+    def execute(self, planner, executor, channel=None, journal=None, token=None):
+        """Aplicar los pasos en orden midiendo cuánto tarda cada uno; al cancelar se detiene entre pasos"""
+        start = time.perf_counter()
+        registry, services, power_scheme = self.desired_state()
+        plan = planner.plan(registry=registry if len(registry) else None,
+                            services=services, power_scheme=power_scheme)
+        report = ProfileReport(plan)
+
+        for index, step in enumerate(self.steps, 1):
+            if token is not None and token.cancelled:
+                report.cancelled = True
+                break
+            if channel:
+                channel.post(status=step.status)
+            step_start = time.perf_counter()
+            error = None
+            failures = []
+            try:
+                part = plan.subset(step.registry, step.services, step.power_scheme)
+                planner.apply(part, journal=journal, token=token)
+                failures.extend(part.failures)
+                for command in step.commands:
+                    result = executor.run(command, token=token)
+                    if not result.ok and not result.cancelled:
+                        failures.append(f"{result.command}: código {result.returncode}")
+                if step.touches_processes():
+                    self._apply_process_rules(step)
+            except Exception as exc:  # Un paso fallido no detiene el resto del perfil
+                error = exc
+            if error is None and failures:
+                error = "; ".join(failures)
+            report.steps.append((step.status, time.perf_counter() - step_start, error))
+            if channel:
+                channel.post(value=100 * index // len(self.steps))
+
+        report.seconds = time.perf_counter() - start
+        return report
+
+    @staticmethod
+    def _apply_process_rules(step):
+        for proc in psutil.process_iter(['name']):
+            name = (proc.info['name'] or '').lower()
+            try:
+                if name in step.kill:
+                    proc.kill()
+                elif name in step.priorities:
+                    priority = getattr(psutil, PRIORITY_CLASSES[step.priorities[name]], None)
+                    if priority is not None:
+                        proc.nice(priority)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+
+
+class ProfileLibrary:
+    """Carga, valida y compila los perfiles JSON/TOML.
+
+    Los perfiles del usuario (%APPDATA%\\WindowsOptimizer\\profiles) tienen
+    prioridad sobre los incluidos con la aplicación. Cada archivo se compila
+    una sola vez mientras no cambie su fecha de modificación.
+    """
+    EXTENSIONS = ('.json', '.toml')
+
+    def __init__(self, directories=None):
+        if directories is None:
+            directories = [app_data_path('profiles'),
+                           resource_path('profiles')]
+        self.directories = [directory for directory in directories if directory]
+        self._compiled = {}  # nombre -> (ruta, mtime, ExecutionPlan)
+
+    def find(self, name):
+        for directory in self.directories:
+            for extension in self.EXTENSIONS:
+                candidate = path.join(directory, name + extension)
+                if path.isfile(candidate):
+                    return candidate
+        raise ProfileError(f"No se encontró el perfil '{name}'")
+
+    def names(self):
+        found = set()
+        for directory in self.directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        stem, extension = path.splitext(entry.name)
+                        if extension in self.EXTENSIONS and entry.is_file():
+                            found.add(stem)
+            except OSError:
+                continue
+        return sorted(found)
+
+    def load(self, name):
+        """Devolver el ExecutionPlan del perfil (compilado una vez y cacheado)"""
+        source = self.find(name)
+        mtime = os.stat(source).st_mtime_ns
+        cached = self._compiled.get(name)
+        if cached and cached[0] == source and cached[1] == mtime:
+            return cached[2]
+        plan = self.compile(self.read(source), path.basename(source))
+        self._compiled[name] = (source, mtime, plan)
+        return plan
+
+    @staticmethod
+    def read(source):
+        if source.endswith('.toml'):
+            if tomllib is None:
+                raise ProfileError(f"{path.basename(source)}: los perfiles TOML requieren Python 3.11")
+            with open(source, 'rb') as file:
+                try:
+                    return tomllib.load(file)
+                except tomllib.TOMLDecodeError as error:
+                    raise ProfileError(f"{path.basename(source)}: {error}")
+        with open(source, encoding='utf-8') as file:
+            try:
+                return json.load(file)
+            except json.JSONDecodeError as error:
+                raise ProfileError(f"{path.basename(source)}: {error}")
+
+    @classmethod
+    def compile(cls, data, origin='perfil'):
+        """Validar el contenido de un perfil y convertirlo en un ExecutionPlan"""
+        def fail(where, message):
+            raise ProfileError(f"{origin}: {where}: {message}")
+
+        if not isinstance(data, dict):
+            fail('raíz', "se esperaba un objeto")
+        for field in ('name', 'title', 'message'):
+            if not isinstance(data.get(field), str):
+                fail(field, "falta o no es texto")
+        if not isinstance(data.get('steps'), list) or not data['steps']:
+            fail('steps', "debe ser una lista con al menos un paso")
+
+        steps = []
+        for index, raw in enumerate(data['steps']):
+            where = f"steps[{index}]"
+            if not isinstance(raw, dict):
+                fail(where, "se esperaba un objeto")
+            unknown = set(raw) - PROFILE_STEP_FIELDS
+            if unknown:
+                fail(where, f"campos desconocidos: {', '.join(sorted(unknown))}")
+            if not isinstance(raw.get('status'), str):
+                fail(f"{where}.status", "falta o no es texto")
+            step = PlanStep(raw['status'])
+
+            for number, value in enumerate(raw.get('registry', [])):
+                item = f"{where}.registry[{number}]"
+                if not isinstance(value, dict) or not {'key', 'value', 'data'} <= set(value):
+                    fail(item, "se esperaban 'key', 'value' y 'data'")
+                value_type = value.get('type')
+                if value_type is not None and value_type not in REGISTRY_TYPES:
+                    fail(f"{item}.type", f"tipo desconocido '{value_type}'")
+                numeric = value_type in ('REG_DWORD', 'REG_QWORD') or (value_type is None and isinstance(value['data'], int))
+                if numeric and (not isinstance(value['data'], int) or isinstance(value['data'], bool)):
+                    fail(f"{item}.data", "se esperaba un número entero")
+                if not numeric and not isinstance(value['data'], str):
+                    fail(f"{item}.data", "se esperaba texto")
+                try:
+                    step.registry.set(value['key'], value['value'], value['data'], value_type)
+                except ValueError as error:
+                    fail(f"{item}.key", error)
+
+            services = raw.get('services', {})
+            if not isinstance(services, dict):
+                fail(f"{where}.services", "se esperaba un objeto {servicio: tipo de inicio}")
+            for service, start_type in services.items():
+                if start_type not in SERVICE_START_TYPES:
+                    fail(f"{where}.services.{service}", f"tipo de inicio desconocido '{start_type}'")
+                step.services[service] = start_type
+
+            scheme = raw.get('power_scheme')
+            if scheme is not None:
+                scheme = POWER_SCHEMES.get(scheme, scheme)
+                if not isinstance(scheme, str) or not GUID_PATTERN.match(scheme):
+                    fail(f"{where}.power_scheme", "se esperaba un alias conocido o un GUID")
+                step.power_scheme = scheme.lower()
+
+            commands = raw.get('commands', [])
+            if not isinstance(commands, list) or not all(isinstance(command, str) for command in commands):
+                fail(f"{where}.commands", "se esperaba una lista de comandos")
+            step.commands = list(commands)
+
+            processes = raw.get('processes', {})
+            if not isinstance(processes, dict) or set(processes) - {'kill', 'priority'}:
+                fail(f"{where}.processes", "solo se admiten 'kill' y 'priority'")
+            kill = processes.get('kill', [])
+            if not isinstance(kill, list) or not all(isinstance(name, str) for name in kill):
+                fail(f"{where}.processes.kill", "se esperaba una lista de nombres de proceso")
+            step.kill = {name.lower() for name in kill}
+            priorities = processes.get('priority', {})
+            if not isinstance(priorities, dict):
+                fail(f"{where}.processes.priority", "se esperaba un objeto {clase: [procesos]}")
+            for priority, names in priorities.items():
+                if priority not in PRIORITY_CLASSES:
+                    fail(f"{where}.processes.priority", f"clase desconocida '{priority}'")
+                if not isinstance(names, list) or not all(isinstance(name, str) for name in names):
+                    fail(f"{where}.processes.priority.{priority}", "se esperaba una lista de nombres de proceso")
+                for name in names:
+                    step.priorities[name.lower()] = priority
+            steps.append(step)
+
+        return ExecutionPlan(data['name'], data['title'], data['message'], steps)
+
+
+class GraphStep:
+    __slots__ = ('name', 'function', 'args', 'after', 'status', 'always')
+
+    def __init__(self, name, function, args, after, status, always=False):
+        self.name = name
+        self.function = function
+        self.args = args
+        self.after = tuple(after)
+        self.status = status
+        self.always = always
+
+
+class GraphTrace:
+    """Traza de una ejecución de TaskGraph: inicio, fin e hilo de cada paso"""
+
+    def __init__(self, steps):
+        self.steps = steps
+        self.entries = {}  # nombre -> (inicio, fin, hilo, error); tiempos relativos al arranque
+        self.skipped = []
+        self.cancelled = []
+        self.seconds = 0.0
+
+    @property
+    def errors(self):
+        return {name: entry[3] for name, entry in self.entries.items()
+                if entry[3] is not None and name not in self.cancelled}
+
+    def critical_path(self):
+        """Cadena de dependencias que determinó la duración total"""
+        if not self.entries:
+            return []
+        name = max(self.entries, key=lambda step: self.entries[step][1])
+        chain = [name]
+        while True:
+            done = [dep for dep in self.steps[name].after if dep in self.entries]
+            if not done:
+                break
+            name = max(done, key=lambda step: self.entries[step][1])
+            chain.append(name)
+        chain.reverse()
+        return chain
+
+    def report(self):
+        """Texto con la línea de tiempo de cada paso (* = ruta crítica)"""
+        critical = set(self.critical_path())
+        lines = []
+        for name, (start, end, thread, error) in sorted(self.entries.items(), key=lambda item: item[1][0]):
+            mark = '*' if name in critical else ' '
+            if name in self.cancelled:
+                state = "  (cancelado)"
+            else:
+                state = f"  ERROR: {error}" if error is not None else ''
+            lines.append(f"{mark} {start * 1000:8.1f} +{(end - start) * 1000:8.1f} ms  {name} [{thread}]{state}")
+        for name in self.skipped:
+            lines.append(f"  {'':>8}  {'':>9}     {name} (omitido: falló una dependencia)")
+        lines.append(f"  total {self.seconds * 1000:.1f} ms, ruta crítica: {' → '.join(self.critical_path())}")
+        return "\n".join(lines)
+
+
+class TaskGraph:
+    """Pasos de una acción con dependencias, ejecutados en paralelo cuando se puede.
+
+    Un paso arranca en cuanto terminan todos los pasos de after; los pasos
+    sin relación entre sí se ejecutan a la vez. Si un paso lanza una
+    excepción, los que dependen de él se omiten. Al cancelar, los pasos que
+    aún no empezaron no se ejecutan, salvo los marcados con always (por
+    ejemplo volver a iniciar un servicio detenido por un paso anterior).
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self.steps = {}
+
+    def add(self, name, function, *args, after=(), status=None, always=False):
+        if name in self.steps:
+            raise ValueError(f"Paso duplicado: {name}")
+        self.steps[name] = GraphStep(name, function, args, after, status or name, always)
+        return name
+
+    def __len__(self):
+        return len(self.steps)
+
+    def _check(self):
+        """Validar dependencias y detectar ciclos (orden topológico de Kahn)"""
+        for step in self.steps.values():
+            for dep in step.after:
+                if dep not in self.steps:
+                    raise ValueError(f"El paso '{step.name}' depende de '{dep}', que no existe")
+        waiting = {name: len(step.after) for name, step in self.steps.items()}
+        ready = [name for name, count in waiting.items() if count == 0]
+        visited = 0
+        while ready:
+            current = ready.pop()
+            visited += 1
+            for step in self.steps.values():
+                if current in step.after:
+                    waiting[step.name] -= 1
+                    if waiting[step.name] == 0:
+                        ready.append(step.name)
+        if visited != len(self.steps):
+            raise ValueError("Dependencias circulares entre los pasos")
+
+    def run(self, callback=None, token=None):
+        """Ejecutar el grafo; callback(paso, error) se llama al terminar u omitir cada paso"""
+        self._check()
+        trace = GraphTrace(self.steps)
+        dependents = {name: [] for name in self.steps}
+        waiting = {}
+        for step in self.steps.values():
+            waiting[step.name] = len(step.after)
+            for dep in step.after:
+                dependents[dep].append(step.name)
+
+        origin = time.perf_counter()
+
+        def run_step(step):
+            start = time.perf_counter() - origin
+            error = None
+            try:
+                if token is not None and not step.always:
+                    token.check()
+                step.function(*step.args)
+            except Exception as exc:
+                error = exc
+            end = time.perf_counter() - origin
+            return start, end, threading.current_thread().name, error
+
+        def skip(name, error):
+            for child in dependents[name]:
+                if child not in trace.skipped:
+                    trace.skipped.append(child)
+                    if callback:
+                        callback(self.steps[child], error)
+                    skip(child, error)
+
+        # Con más pasos listos que hilos, primero los que encabezan cadenas más largas
+        depth = {}
+
+        def chain_length(name):
+            if name not in depth:
+                depth[name] = 1 + max((chain_length(child) for child in dependents[name]), default=0)
+            return depth[name]
+
+        ready = sorted((name for name, count in waiting.items() if count == 0),
+                       key=chain_length, reverse=True)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='step') as pool:
+            running = {pool.submit(run_step, self.steps[name]): name for name in ready}
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    trace.entries[name] = future.result()
+                    error = trace.entries[name][3]
+                    if isinstance(error, OperationCancelled):
+                        # Los dependientes siguen su curso: se cancelan también salvo los always
+                        trace.cancelled.append(name)
+                        error = None
+                    if callback:
+                        callback(self.steps[name], trace.entries[name][3])
+                    if error is not None:
+                        skip(name, error)
+                        continue
+                    for child in sorted(dependents[name], key=chain_length, reverse=True):
+                        waiting[child] -= 1
+                        if waiting[child] == 0 and child not in trace.skipped:
+                            running[pool.submit(run_step, self.steps[child])] = child
+
+        trace.seconds = time.perf_counter() - origin
+        return trace
+
+
+class WmiHardwareProvider:
+    """Inventario de hardware con WMI (una sola conexión para todas las consultas)"""
+    name = 'wmi'
+
+    def collect(self):
+        # WMI necesita COM inicializado en cada hilo
+        pythoncom.CoInitialize()
+        try:
+            c = wmi.WMI()
+            return {
+                'cpu': c.Win32_Processor()[0].Name.strip(),
+                'ram_gb': round(float(c.Win32_ComputerSystem()[0].TotalPhysicalMemory) / 1024 / 1024 / 1024, 2),
+                'gpu': c.Win32_VideoController()[0].Name,
+                'board': c.Win32_BaseBoard()[0].Product,
+                'os': c.Win32_OperatingSystem()[0].Caption
+            }
+        finally:
+            pythoncom.CoUninitialize()
+
+
+class ProcHardwareProvider:
+    """Inventario con psutil, /proc y /sys: equivalente de Linux para pruebas"""
+    name = 'proc'
+
+    @staticmethod
+    def _read(file_path):
+        try:
+            with open(file_path, encoding='utf-8', errors='replace') as file:
+                return file.read().strip()
+        except OSError:
+            return None
+
+    def collect(self):
+        cpu = None
+        for line in (self._read('/proc/cpuinfo') or '').splitlines():
+            if line.startswith('model name'):
+                cpu = line.split(':', 1)[1].strip()
+                break
+
+        gpu = None
+        vendor = self._read('/sys/class/drm/card0/device/vendor')
+        device = self._read('/sys/class/drm/card0/device/device')
+        if vendor and device:
+            gpu = f"PCI {vendor[2:]}:{device[2:]}"
+
+        system = None
+        for line in (self._read('/etc/os-release') or '').splitlines():
+            if line.startswith('PRETTY_NAME='):
+                system = line.split('=', 1)[1].strip('"')
+                break
+
+        return {
+            'cpu': cpu,
+            'ram_gb': round(psutil.virtual_memory().total / 1024 / 1024 / 1024, 2),
+            'gpu': gpu,
+            'board': self._read('/sys/class/dmi/id/board_name'),
+            'os': system or f"{os.uname().sysname} {os.uname().release}"
+        }
+
+
+class HardwareInventory:
+    """Inventario de hardware reunido una vez en segundo plano.
+
+    El resultado se guarda en disco junto con la hora de arranque del
+    sistema: mientras no se reinicie, las siguientes ejecuciones lo leen del
+    archivo sin consultar WMI. La interfaz solo lee el diccionario en memoria.
+    """
+
+    def __init__(self, provider=None, cache_path=None):
+        if provider is None:
+            provider = WmiHardwareProvider() if os.name == 'nt' else ProcHardwareProvider()
+        self.provider = provider
+        self.cache_path = cache_path or app_data_path('hardware.json')
+        self.data = None
+        self.error = None
+        self.from_cache = False
+        self._ready = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._started = False
+
+    @staticmethod
+    def boot_key():
+        return int(psutil.boot_time())
+
+    def start(self):
+        """Lanzar la recogida en un hilo (solo la primera vez)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._collect, name='hardware-inventory', daemon=True).start()
+
+    def ready(self):
+        return self._ready.is_set()
+
+    def get(self, timeout=None):
+        """Esperar el inventario (None si falla o vence el tiempo)"""
+        self.start()
+        self._ready.wait(timeout)
+        return self.data
+
+    def when_ready(self, callback):
+        """Llamar callback(datos) al terminar; de inmediato si ya está listo.
+
+        El callback se ejecuta en el hilo del inventario si aún no terminó.
+        """
+        with self._lock:
+            if not self._ready.is_set():
+                self._callbacks.append(callback)
+                return
+        callback(self.data)
+
+    def cpu_type(self):
+        """'intel', 'amd' o 'unknown' (sin esperar si el inventario no está listo)"""
+        cpu = ((self.data or {}).get('cpu') or '').lower()
+        if 'intel' in cpu:
+            return 'intel'
+        if 'amd' in cpu:
+            return 'amd'
+        return 'unknown'
+
+    def _load_cache(self, boot):
+        try:
+            with open(self.cache_path, encoding='utf-8') as file:
+                cached = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if cached.get('boot_time') == boot and cached.get('provider') == self.provider.name:
+            return cached.get('data')
+        return None
+
+    def _save_cache(self, boot, data):
+        try:
+            os.makedirs(path.dirname(self.cache_path), exist_ok=True)
+            temporary = self.cache_path + '.tmp'
+            with open(temporary, 'w', encoding='utf-8') as file:
+                json.dump({'boot_time': boot, 'provider': self.provider.name, 'data': data}, file, ensure_ascii=False)
+            os.replace(temporary, self.cache_path)
+        except OSError:
+            pass  # Sin caché la próxima ejecución vuelve a consultar
+
+    def _collect(self):
+        try:
+            with startup_profiler.current().phase('hardware inventory'):
+                boot = self.boot_key()
+                data = self._load_cache(boot)
+                self.from_cache = data is not None
+                if data is None:
+                    data = self.provider.collect()
+                    self._save_cache(boot, data)
+            self.data = data
+        except Exception as error:
+            self.error = error
+        with self._lock:
+            self._ready.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self.data)
+            except Exception:
+                pass
+
+
+class BackgroundJobs:
+    """Ejecutor de acciones en hilos de trabajo.
+
+    Los hilos de trabajo nunca tocan widgets: encolan llamadas con
+    call_in_ui() y el hilo de Tk las ejecuta en un tick del UiTicker.
+    """
+    POLL_MS = 33
+
+    def __init__(self, ticker, max_workers=4):
+        self._calls = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._running = set()
+        self._ui_thread = threading.current_thread()
+        ticker.register(self._poll, self.POLL_MS)
+
+    def in_ui_thread(self):
+        return threading.current_thread() is self._ui_thread
+
+    def is_running(self, name):
+        return name in self._running
+
+    def submit(self, name, function, *args):
+        """Lanzar una acción en segundo plano; se ignora si ya está en curso"""
+        if name in self._running:
+            return False
+        self._running.add(name)
+        threading.Thread(target=self._run, args=(name, function, args),
+                         name=f"job-{name}", daemon=True).start()
+        return True
+
+    def _run(self, name, function, args):
+        try:
+            with self._slots:
+                function(*args)
+        finally:
+            self.call_in_ui(self._running.discard, name)
+
+    def call_in_ui(self, function, *args, wait=False):
+        """Ejecutar una función en el hilo de Tk (opcionalmente esperando el resultado)"""
+        if self.in_ui_thread():
+            return function(*args)
+        done = threading.Event() if wait else None
+        outcome = {}
+        self._calls.put((function, args, done, outcome))
+        if not wait:
+            return None
+        done.wait()
+        if 'error' in outcome:
+            raise outcome['error']
+        return outcome.get('result')
+
+    def _poll(self):
+        while True:
+            try:
+                function, args, done, outcome = self._calls.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                outcome['result'] = function(*args)
+            except Exception as error:
+                outcome['error'] = error
+            finally:
+                if done is not None:
+                    done.set()
+
+
+def background_action(method):
+    """Ejecutar la acción de un botón en un hilo de trabajo en lugar del hilo de Tk"""
+    @wraps(method)
+    def wrapper(self, *args):
+        if self.jobs.in_ui_thread():
+            self.jobs.submit(method.__name__, method, self, *args)
+            return None
+        return method(self, *args)
+    return wrapper
+
 
 class WindowsOptimizer:
     def __init__(self, root):
         self.root = root
         self.cache = {}  # Caché para operaciones repetitivas
+        self.profiler = startup_profiler.current()
+        self.ticker = UiTicker(self.root)  # Único after() periódico de la interfaz
+        self.tooltips = TooltipPool(self.root, self.ticker)  # Una ventana de tooltip compartida
         
         # Crear botón flotante (inicialmente oculto)
-        self.create_floating_button()
-        self.float_window.withdraw()  # Ocultar inicialmente
+        with self.profiler.phase('create_floating_button'):
+            self.create_floating_button()
+            self.float_window.withdraw()  # Ocultar inicialmente
         
         # Detectar cuando la ventana se minimiza
         self.root.bind("<Unmap>", self.on_minimize)
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
         
-        self.setup_styles()
-        self.setup_ui()
+        # Las acciones se ejecutan en segundo plano para no congelar la ventana
+        with self.profiler.phase('services'):
+            self.jobs = BackgroundJobs(self.ticker)
+            self.progress_panel = ProgressPanel(self.root, self.ticker)  # Una ventana para todos los trabajos
+            self.executor = CommandExecutor()
+            self.registry = RegistryWriter()
+            self.planner = TweakPlanner(self.registry, self.executor)
+            self.profiles = ProfileLibrary()
+            self.journal = ChangeJournal()
+            self.last_profile_report = None
+            self.last_trace = None
+            self.space_estimate = None  # Última estimación en seco (su StatCache lo reutiliza la limpieza)
+            self.cleanup_index = CleanupIndex()  # Directorios sin cambios entre análisis
+            self.cleanup_policies = None  # Reglas de limpieza, se leen al usarlas
+            
+            # El inventario de hardware se reúne en segundo plano desde el inicio
+            self.hardware = HardwareInventory()
+            self.hardware.start()
+        
+        with self.profiler.phase('setup_styles'):
+            self.setup_styles()
+        with self.profiler.phase('setup_ui'):
+            self.setup_ui()
+        self.profiler.watch_first_paint(self.root)
 
     def create_floating_button(self):
         """Crear botón flotante que siempre está visible"""
@@ -83,46 +3609,13 @@ class WindowsOptimizer:
         self.float_window.destroy()
         self.root.destroy()
 
-    def setup_styles(self):
-        """Configurar todos los estilos una sola vez"""
-        style = ttk.Style()
-        style.theme_use('default')
-        
-        # Diccionario de colores para fácil mantenimiento
-        self.colors = {
-            'bg': '#0d1117',
-            'fg': '#c9d1d9',
-            'accent': '#58a6ff',
-            'hover': '#1e293b',
-            'button': '#66c0f4',
-            'button_hover': '#1999ff'
-        }
-        
-        # Configurar estilos base
-        base_styles = {
-            'Tab.TFrame': {'background': self.colors['bg']},
-            'Custom.TNotebook': {'background': self.colors['bg'], 'borderwidth': 0},
-            'Custom.TNotebook.Tab': {
-                'background': '#161b22',
-                'foreground': '#8b949e',
-                'padding': [20, 12],
-                'font': ('Segoe UI', 11)
-            }
-        }
-        
-        for style_name, config in base_styles.items():
-            style.configure(style_name, **config)
-
     def setup_ui(self):
         self.root.title("Windows Optimizer")
         self.root.geometry("1024x768")  # Ventana más grande para estilo web
         self.root.minsize(1024, 768)
         
-        # Variables para el color
-        self.r = 0
-        self.g = 255
-        self.b = 0
-        self.color_direction = 1
+        # Animación de color: solo los widgets registrados cambian en cada tick
+        self.animator = ColorAnimator(self.root, self.ticker)
         
         # Configurar el tema oscuro moderno
         self.root.configure(bg='#0d1117')  # Color de fondo estilo GitHub dark
@@ -188,6 +3681,7 @@ class WindowsOptimizer:
                                    bg='#0d1117',
                                    font=('Rajdhani', 24, 'bold'))  # Fuente gaming moderna
         self.header_title.pack(side='left')
+        self.animator.add(self.header_title, 'fg')
         
         # Crear notebook con pestañas personalizadas
         self.tab_control = ttk.Notebook(main_container, style='Custom.TNotebook')
@@ -212,78 +3706,44 @@ class WindowsOptimizer:
         
         self.tab_control.pack(expand=True, fill='both')
         
-        self.setup_cleanup_tab()
-        self.setup_optimization_tab()
-        self.setup_network_tab()
-        self.setup_games_tab()
-        self.setup_cpu_tab()
-        self.setup_work_study_tab()
-        self.setup_about_tab()
+        # Cada pestaña se construye la primera vez que se selecciona; al inicio
+        # solo se construye la de limpieza (la pestaña CPU consulta WMI)
+        self.tab_builders = {
+            str(self.tab1): self.setup_cleanup_tab,
+            str(self.tab2): self.setup_optimization_tab,
+            str(self.tab3): self.setup_network_tab,
+            str(self.tab4): self.setup_games_tab,
+            str(self.tab5): self.setup_cpu_tab,
+            str(self.tab6): self.setup_work_study_tab,
+            str(self.tab7): self.setup_about_tab
+        }
+        self.tab_control.bind('<<NotebookTabChanged>>', self.on_tab_changed)
+        self.build_tab(self.tab1)
+        
+        # Estilos ttk globales: se configuran una vez, no en cada tick
+        self.update_button_style()
         
         # Iniciar la animación de color
-        self.update_colors()
-
-    def rgb_to_hex(self, r, g, b):
-        return f'#{r:02x}{g:02x}{b:02x}'
+        self.animator.start()
 
-    def update_colors(self):
-        """Actualización de colores más eficiente"""
-        if not hasattr(self, '_last_update'):
-            self._last_update = 0
-        
-        current_time = time.time()
-        if current_time - self._last_update < 0.05:  # Limitar a 20 FPS
-            return
-        
-        self._last_update = current_time
-        # Actualizar valores RGB
-        if self.color_direction == 1:
-            if self.r < 255 and self.b == 0:
-                self.r += 5
-                self.g -= 5
-            elif self.g < 255 and self.r == 0:
-                self.g += 5
-                self.b -= 5
-            elif self.b < 255 and self.g == 0:
-                self.b += 5
-                self.r -= 5
-            else:
-                self.color_direction = -1
-        else:
-            if self.r > 0 and self.b == 0:
-                self.r -= 5
-                self.g += 5
-            elif self.g > 0 and self.r == 0:
-                self.g -= 5
-                self.b += 5
-            elif self.b > 0 and self.g == 0:
-                self.b -= 5
-                self.r += 5
-            else:
-                self.color_direction = 1
+    def build_tab(self, tab):
+        """Construir el contenido de una pestaña si todavía no se construyó"""
+        builder = self.tab_builders.pop(str(tab), None)
+        if builder is not None:
+            with self.profiler.phase(builder.__name__):
+                builder()
 
-        # Mantener los valores dentro del rango 0-255
-        self.r = max(0, min(255, self.r))
-        self.g = max(0, min(255, self.g))
-        self.b = max(0, min(255, self.b))
+    def build_all_tabs(self):
+        for tab in list(self.tab_builders):
+            self.build_tab(tab)
 
-        # Actualizar estilos
-        self.update_button_style()
-        
-        # Actualizar el color del título
-        self.header_title.configure(fg=self.rgb_to_hex(self.r, self.g, self.b))
-        
-        # Programar la próxima actualización
-        self.root.after(50, self.update_colors)
+    def on_tab_changed(self, event):
+        self.build_tab(self.tab_control.select())
 
     def update_button_style(self):
-        current_color = self.rgb_to_hex(self.r, self.g, self.b)
+        current_color = self.animator.color
         style = ttk.Style()
         
-        # Estilo para el separador
-        style.configure('Separator.TFrame',
-                       background=current_color)
-        
         # Estilo para las pestañas
         style.configure('TNotebook.Tab', 
                        background='black',
@@ -332,31 +3792,7 @@ class WindowsOptimizer:
                        bordercolor='black')
 
     def add_tooltip(self, button, tooltip_text):
-        def show_tooltip(event, tooltip_text=tooltip_text):
-            tooltip = Toplevel()
-            tooltip.wm_overrideredirect(True)
-            tooltip.configure(bg='black')
-            
-            x = event.widget.winfo_rootx() + event.widget.winfo_width() + 10
-            y = event.widget.winfo_rooty()
-            
-            tooltip.geometry(f"+{x}+{y}")
-            
-            label = Label(tooltip, 
-                           text=tooltip_text,
-                           justify='left',
-                           bg='black',
-                           fg=self.rgb_to_hex(self.r, self.g, self.b),
-                           font=('Arial', 9))
-            label.pack(padx=10, pady=5)
-            
-            def hide_tooltip(event, tooltip=tooltip):
-                tooltip.destroy()
-            
-            button.tooltip = tooltip
-            button.bind('<Leave>', hide_tooltip)
-        
-        button.bind('<Enter>', show_tooltip)
+        self.tooltips.attach(button, tooltip_text, style='classic', fg=lambda: self.animator.color)
 
     def create_modern_button(self, parent, text, command, tooltip=None):
         """Crear botón con estilo web moderno"""
@@ -440,53 +3876,7 @@ class WindowsOptimizer:
         return button
 
     def add_modern_tooltip(self, widget, text):
-        def show_tooltip(event):
-            # Destruir tooltip anterior si existe
-            if hasattr(widget, 'tooltip'):
-                try:
-                    widget.tooltip.destroy()
-                except:
-                    pass
-                
-            tooltip = Toplevel()
-            tooltip.wm_overrideredirect(True)
-            tooltip.configure(bg='#161b22')
-            tooltip.attributes('-topmost', True)  # Mantener tooltip siempre visible
-            
-            # Calcular posición
-            x = event.widget.winfo_rootx() + event.widget.winfo_width() + 10
-            y = event.widget.winfo_rooty()
-            
-            label = Label(tooltip,
-                         text=text,
-                         justify='left',
-                         bg='#161b22',
-                         fg='#c9d1d9',
-                         font=('Segoe UI', 10),
-                         padx=12,
-                         pady=8)
-            label.pack()
-            
-            # Ajustar posición
-            tooltip.update_idletasks()
-            tooltip.geometry(f"+{x}+{y}")
-            
-            def hide_tooltip(event):
-                tooltip.destroy()
-                widget.tooltip = None
-            
-            widget.tooltip = tooltip
-            widget.bind('<Leave>', hide_tooltip)
-            
-            # Remover el check de posición del mouse que causaba problemas
-            widget.unbind('<Motion>')
-        
-        # Limpiar bindings anteriores
-        widget.unbind('<Enter>')
-        widget.unbind('<Leave>')
-        
-        # Añadir nuevos bindings
-        widget.bind('<Enter>', show_tooltip)
+        self.tooltips.attach(widget, text)
 
     def setup_cleanup_tab(self):
         container = ttk.Frame(self.tab1, style='Modern.TFrame')
@@ -531,10 +3921,16 @@ class WindowsOptimizer:
             "Limpieza de Descargas": """🔹 Elimina archivos de la carpeta de descargas
 🔹 Libera espacio en disco
 🔹 Organiza tus descargas
-🔹 Mejora el rendimiento del sistema"""
+🔹 Mejora el rendimiento del sistema""",
+
+            "Estimar espacio a liberar": """🔹 Analiza todas las carpetas de limpieza sin borrar nada
+🔹 Muestra cuánto espacio liberará cada limpieza
+🔹 Detalla el espacio por tipo de archivo
+🔹 La limpieza posterior reutiliza el análisis"""
         }
         
         for text, command in [
+            ("Estimar espacio a liberar", self.estimate_cleanup),
             ("Limpieza de Archivos Temporales", self.clean_temp_files),
             ("Limpieza del Sistema", self.clean_system),
             ("Limpieza de Papelera", self.clean_recycle_bin),
@@ -608,7 +4004,13 @@ class WindowsOptimizer:
 • Reducción de latencia
 • Polling rate optimizado
 • Ajustes USB
-• Prioridad de dispositivos"""
+• Prioridad de dispositivos""",
+
+            "Deshacer último cambio": """↩️ Restaura los valores anteriores:
+• Registro de Windows
+• Tipo de inicio de los servicios
+• Plan de energía
+Se deshace la última optimización registrada"""
         }
         
         for text, command in [
@@ -617,7 +4019,8 @@ class WindowsOptimizer:
             ("Optimización de Disco", self.optimize_disk),
             ("Optimización de Memoria", self.optimize_memory),
             ("Optimización de Input", self.optimize_input),
-            ("Optimización de Periféricos", self.optimize_peripherals)  # Nuevo botón
+            ("Optimización de Periféricos", self.optimize_peripherals),  # Nuevo botón
+            ("Deshacer último cambio", self.rollback_last_run)
         ]:
             self.create_modern_button(container, text, command, tooltips[text])
 
@@ -726,7 +4129,7 @@ class WindowsOptimizer:
         status_badge.pack(side='left', padx=5)
         
         # Separador
-        separator = ttk.Frame(card_frame, height=2, style='Separator.TFrame')
+        separator = self.animator.add(Frame(card_frame, height=2), 'bg')
         separator.pack(fill='x', pady=20)
         
         # Información del desarrollador y Discord
@@ -806,6 +4209,10 @@ class WindowsOptimizer:
         footer.pack(pady=(20, 0))
 
     def show_custom_message(self, title, message, error=False):
+        if not self.jobs.in_ui_thread():
+            self.jobs.call_in_ui(self.show_custom_message, title, message, error)
+            return
+        
         dialog = Toplevel(self.root)
         dialog.title(title)
         dialog.configure(bg='#161b22')
@@ -883,163 +4290,127 @@ class WindowsOptimizer:
         dialog.resizable(False, False)
 
     def show_progress(self, title, maximum):
-        progress_window = Toplevel(self.root)
-        progress_window.title(title)
-        progress_window.geometry("400x200")  # Ventana más grande
-        progress_window.configure(bg='#161b22')
-        progress_window.transient(self.root)
-        progress_window.grab_set()
-        
-        # Centrar la ventana
-        progress_window.update_idletasks()
-        width = progress_window.winfo_width()
-        height = progress_window.winfo_height()
-        x = (progress_window.winfo_screenwidth() // 2) - (width // 2)
-        y = (progress_window.winfo_screenheight() // 2) - (height // 2)
-        progress_window.geometry(f'+{x}+{y}')
-        
-        # Contenedor principal
-        main_frame = Frame(progress_window, bg='#161b22', padx=30, pady=20)
-        main_frame.pack(expand=True, fill='both')
-        
-        # Icono animado de carga
-        loading_label = Label(main_frame,
-                            text="⚡",
-                            fg='#66c0f4',
-                            bg='#161b22',
-                            font=('Segoe UI', 24))
-        loading_label.pack(pady=(0, 15))
-        
-        # Status con mejor estilo
-        status_label = Label(main_frame,
-                           text="Iniciando...",
-                           bg='#161b22',
-                           fg='#c9d1d9',
-                           font=('Segoe UI', 11))
-        status_label.pack(pady=(0, 15))
-        
-        # Frame para la barra de progreso
-        progress_frame = Frame(main_frame, bg='#161b22', padx=2, pady=2)
-        progress_frame.pack(fill='x')
-        
-        # Estilo moderno para la barra de progreso
-        style = ttk.Style()
-        style.configure("Modern.Horizontal.TProgressbar",
-                       troughcolor='#0d1117',
-                       background='#66c0f4',
-                       darkcolor='#66c0f4',
-                       lightcolor='#66c0f4',
-                       bordercolor='#0d1117',
-                       thickness=15)
-        
-        progress_bar = ttk.Progressbar(progress_frame,
-                                     style="Modern.Horizontal.TProgressbar",
-                                     length=300,
-                                     mode='determinate',
-                                     maximum=maximum)
-        progress_bar.pack(fill='x')
-        
-        # Porcentaje con mejor estilo
-        percent_label = Label(main_frame,
-                            text="0%",
-                            bg='#161b22',
-                            fg='#66c0f4',
-                            font=('Segoe UI', 12, 'bold'))
-        percent_label.pack(pady=(15, 0))
-        
-        # Animación del icono de carga
-        def animate_loading():
-            icons = ["⚡", "💫", "✨", "⭐"]
-            current = loading_label.cget("text")
-            next_icon = icons[(icons.index(current) + 1) % len(icons)]
-            loading_label.configure(text=next_icon)
-            progress_window.after(500, animate_loading)
-        
-        animate_loading()
-        progress_window.update()
-        return progress_window, progress_bar, status_label, percent_label
+        if not self.jobs.in_ui_thread():
+            return self.jobs.call_in_ui(self.show_progress, title, maximum, wait=True)
+        return self.progress_panel.open(title, maximum)
+
+    def stat_cache(self):
+        """Listados de la última estimación si todavía son recientes"""
+        return self.space_estimate.fresh_cache() if self.space_estimate is not None else None
+
+    def cleanup_policy(self, group):
+        """Predicado compilado de las reglas de una acción o None si la vacía entera.
+
+        Se compila en cada limpieza para que 'más antiguo que' y la hora de
+        arranque se calculen en ese momento.
+        """
+        if self.cleanup_policies is None:
+            self.cleanup_policies = load_cleanup_policies()
+        policy = self.cleanup_policies.get(group)
+        return policy.compile() if policy is not None else None
+
+    @background_action
+    def estimate_cleanup(self):
+        try:
+            channel = self.show_progress("Estimando espacio a liberar", 100)
+            channel.post(status="Recorriendo carpetas de limpieza...", mode='indeterminate')
+            
+            def report(estimate):
+                files, logical, _ = estimate.totals()
+                channel.post(status=f"Analizados: {files} archivos", detail=format_bytes(logical))
+            
+            # Solo lectura: no se borra nada hasta pulsar una limpieza
+            targets = cleanup_targets()
+            policies = {group: self.cleanup_policy(group) for group in targets}
+            estimator = SpaceEstimator(targets, index=self.cleanup_index, policies=policies)
+            estimate = estimator.run(callback=report, token=channel.token)
+            self.space_estimate = estimate
+            
+            channel.close()
+            self.show_custom_message("Vista previa de la limpieza", estimate.report())
+        except CleanupRuleError as error:
+            if 'channel' in locals():
+                channel.close()
+            self.show_custom_message("Error", f"Reglas de limpieza no válidas:\n{error}", error=True)
+        except:
+            if 'channel' in locals():
+                channel.close()
+            self.show_custom_message("Error", "No se pudo estimar el espacio a liberar", error=True)
 
+    @background_action
     def clean_temp_files(self):
         try:
             # Rutas genéricas de Windows
-            temp_paths = [
-                os.environ.get('TEMP'),  # Carpeta temporal del usuario actual
-                os.environ.get('SYSTEMROOT') + '\\Temp',  # Carpeta temporal del sistema
-                os.environ.get('SYSTEMROOT') + '\\Prefetch',  # Prefetch
-                os.environ.get('LOCALAPPDATA') + '\\Temp',  # AppData Local Temp
-                os.environ.get('LOCALAPPDATA') + '\\Microsoft\\Windows\\INetCache',  # Cache de Internet
-                os.environ.get('LOCALAPPDATA') + '\\Microsoft\\Windows\\History',  # Historial
-                os.environ.get('APPDATA') + '\\Microsoft\\Windows\\Recent'  # Archivos recientes
-            ]
+            temp_paths = cleanup_targets()['temp']
             
-            # Contar archivos primero
-            total_files = sum(1 for _ in os.listdir(temp_paths[0]))
+            # Limpiar todas las rutas a la vez con el motor paralelo
+            engine = CleanupEngine(temp_paths, cache=self.stat_cache(), policy=self.cleanup_policy('temp'))
             
-            # Crear barra de progreso
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Limpiando archivos temporales", total_files)
+            # Crear barra de progreso (sin conteo previo: modo indeterminado)
+            channel = self.show_progress("Limpiando archivos temporales", 100)
+            channel.post(mode='indeterminate')
             
-            files_removed = 0
-            for filename in os.listdir(temp_paths[0]):
-                file_path = path.join(temp_paths[0], filename)
-                try:
-                    if path.isfile(file_path):
-                        os.unlink(file_path)
-                    elif path.isdir(file_path):
-                        shutil.rmtree(file_path)
-                    files_removed += 1
-                    
-                    # Actualizar progreso
-                    progress_bar['value'] = files_removed
-                    percent = int((files_removed / total_files) * 100)
-                    percent_label.config(text=f"{percent}%")
-                    status_label.config(text=f"Eliminando: {filename}")
-                    progress_window.update()
-                except:
-                    continue
+            def report(root, files, size):
+                channel.post(status=f"Eliminados: {engine.files_removed} archivos",
+                             detail=f"{engine.bytes_removed / (1024 * 1024):.1f} MB")
+            
+            results = engine.run(callback=report, token=channel.token)
             
-            progress_window.destroy()
-            self.show_custom_message("Éxito", f"Se eliminaron {files_removed} archivos temporales")
+            files_removed = sum(stats['files'] for stats in results.values())
+            bytes_removed = sum(stats['bytes'] for stats in results.values())
+            
+            channel.close()
+            if engine.cancelled:
+                self.show_custom_message("Cancelado", f"Limpieza cancelada: se eliminaron {files_removed} archivos "
+                                                      f"({bytes_removed / (1024 * 1024):.1f} MB liberados)")
+                return
+            kept = sum(stats['kept'] for stats in results.values())
+            message = (f"Se eliminaron {files_removed} archivos temporales "
+                       f"({bytes_removed / (1024 * 1024):.1f} MB liberados)")
+            if kept:
+                message += f"\n{kept} archivos conservados por las reglas"
+            if engine.failures:
+                message += f"\n\nNo se pudieron eliminar {len(engine.failures)} archivos:\n{engine.failures.summary()}"
+            self.show_custom_message("Éxito", message)
+        except CleanupRuleError as error:
+            self.show_custom_message("Error", f"Reglas de limpieza no válidas:\n{error}", error=True)
         except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
+            if 'channel' in locals():
+                channel.close()
             self.show_custom_message("Error", "No se pudieron eliminar los archivos temporales", error=True)
 
+    @background_action
     def clean_recycle_bin(self):
         try:
-            subprocess.run('rd /s /q C:\\$Recycle.Bin', shell=True)
+            self.executor.run('rd /s /q C:\\$Recycle.Bin')
             self.show_custom_message("Éxito", "Papelera de reciclaje vaciada")
         except:
             self.show_custom_message("Error", "No se pudo vaciar la papelera", error=True)
 
+    @background_action
     def clean_dns_cache(self):
         try:
             # Crear barra de progreso
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Limpiando caché DNS", 100)
-            
-            # Actualizar estado
-            status_label.config(text="Limpiando caché DNS...")
-            progress_bar['value'] = 0
-            progress_window.update()
+            channel = self.show_progress("Limpiando caché DNS", 100)
             
-            # Ejecutar comando
-            subprocess.run('ipconfig /flushdns', shell=True)
+            # Actualizar estado mientras se ejecuta el comando
+            channel.post(status="Limpiando caché DNS...", mode='indeterminate')
             
-            # Simular progreso
-            for i in range(100):
-                progress_bar['value'] = i + 1
-                percent_label.config(text=f"{i + 1}%")
-                progress_window.update()
-                time.sleep(0.02)
+            # Ejecutar comando (el progreso termina cuando termina el proceso)
+            result = self.executor.run('ipconfig /flushdns', token=channel.token)
+            channel.post(value=100, mode='determinate')
             
-            progress_window.destroy()
+            channel.close()
+            if result.cancelled:
+                self.show_custom_message("Cancelado", "Limpieza de la caché DNS cancelada")
+                return
             self.show_custom_message("Éxito", "Caché DNS limpiada")
         except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
+            if 'channel' in locals():
+                channel.close()
             self.show_custom_message("Error", "No se pudo limpiar el caché DNS", error=True)
 
+    @background_action
     def disable_services(self):
         try:
             # Lista actualizada de servicios
@@ -1076,47 +4447,78 @@ class WindowsOptimizer:
             ]
 
             # Crear ventana de progreso
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Desactivando servicios", len(services_to_disable))
+            channel = self.show_progress("Desactivando servicios", len(services_to_disable))
             
-            services_disabled = 0
-            for service in services_to_disable:
-                try:
-                    status_label.config(text=f"Desactivando: {service}")
-                    subprocess.run(f'sc config "{service}" start=disabled', shell=True)
-                    subprocess.run(f'net stop "{service}"', shell=True)
-                    services_disabled += 1
-                    
-                    # Actualizar progreso
-                    progress_bar['value'] = services_disabled
-                    percent = int((services_disabled / len(services_to_disable)) * 100)
-                    percent_label.config(text=f"{percent}%")
-                    progress_window.update()
-                except:
-                    continue
-
-            time.sleep(1)
-            progress_window.destroy()
-            self.show_custom_message("Éxito", f"Se desactivaron {services_disabled} servicios innecesarios")
+            # Leer el estado actual y dejar solo los servicios que cambian
+            plan = self.planner.plan(services={service: 'disabled' for service in services_to_disable})
+            pending = list(plan.services)
+            channel.post(maximum=max(len(pending), 1), status=plan.summary())
+            
+            # Los servicios son independientes: se configuran en paralelo
+            # (dentro de cada servicio, primero sc config y después net stop)
+            def report(index, results):
+                channel.advance(status=f"Desactivado: {pending[index]}")
+            
+            results = self.planner.apply(plan, callback=report, journal=self.journal.begin('disable_services'),
+                                         token=channel.token)
+            services_disabled = sum(1 for steps in results if all(result.ok for result in steps))
+
+            channel.close()
+            if channel.cancelled:
+                self.show_custom_message("Cancelado", f"Operación cancelada: se desactivaron {services_disabled} "
+                                                      f"de {len(pending)} servicios")
+                return
+            if plan.failures:
+                self.show_custom_message("Error", f"Se desactivaron {services_disabled} de {len(pending)} servicios\n\n"
+                                                  f"{plan.failure_summary()}", error=True)
+                return
+            self.show_custom_message("Éxito", f"Se desactivaron {services_disabled} servicios innecesarios\n\n{plan.summary()}")
         except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
+            if 'channel' in locals():
+                channel.close()
             self.show_custom_message("Error", "No se pudieron desactivar los servicios", error=True)
 
+    @background_action
     def optimize_performance(self):
         try:
-            subprocess.run('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\VisualEffects" /v VisualFXSetting /t REG_DWORD /d 2 /f', shell=True)
+            batch = RegistryBatch().set("HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\VisualEffects", "VisualFXSetting", 2)
+            plan = self.planner.plan(registry=batch)
+            self.planner.apply(plan, journal=self.journal.begin('optimize_performance'))
+            if plan.failures:
+                self.show_custom_message("Error", f"No se pudo optimizar el rendimiento\n\n{plan.failure_summary()}",
+                                         error=True)
+                return
             self.show_custom_message("Éxito", "Rendimiento optimizado")
         except:
             self.show_custom_message("Error", "No se pudo optimizar el rendimiento", error=True)
 
+    @background_action
+    def rollback_last_run(self):
+        try:
+            source = self.journal.latest()
+            if source is None:
+                self.show_custom_message("Deshacer cambios", "No hay cambios registrados para deshacer")
+                return
+            header, _, _ = self.journal.load(source)
+            restored = self.journal.rollback(source, self.planner)
+            self.show_custom_message("Éxito", f"""✅ Cambios deshechos:
+• Acción: {header.get('action', '?')} ({header.get('started', '')})
+• Ajustes restaurados: {restored}""")
+        except RollbackError as error:
+            self.show_custom_message("Error", "No se pudieron restaurar todos los ajustes "
+                                              f"(se puede volver a intentar):\n{error}", error=True)
+        except:
+            self.show_custom_message("Error", "No se pudieron deshacer los cambios", error=True)
+
+    @background_action
     def defrag_disk(self):
         try:
-            subprocess.run('defrag C: /U /V', shell=True)
+            self.executor.run('defrag C: /U /V')
             self.show_custom_message("Éxito", "Desfragmentación iniciada")
         except:
             self.show_custom_message("Error", "No se pudo iniciar la desfragmentación", error=True)
 
+    @background_action
     def optimize_dns(self):
         dns_servers = [
             "8.8.8.8",
@@ -1125,11 +4527,12 @@ class WindowsOptimizer:
         
         try:
             for dns in dns_servers:
-                subprocess.run(f'netsh interface ip add dns "Ethernet" {dns}', shell=True)
+                self.executor.run(f'netsh interface ip add dns "Ethernet" {dns}')
             self.show_custom_message("Éxito", "DNS optimizados")
         except:
             self.show_custom_message("Error", "No se pudieron optimizar los DNS", error=True)
 
+    @background_action
     def reset_network(self):
         try:
             commands = [
@@ -1140,15 +4543,23 @@ class WindowsOptimizer:
             ]
             
             for cmd in commands:
-                subprocess.run(cmd, shell=True)
+                self.executor.run(cmd)
             self.show_custom_message("Éxito", "Configuración de red reseteada")
         except:
             self.show_custom_message("Error", "No se pudo resetear la configuración de red", error=True)
 
+    @background_action
     def show_network_info(self):
         try:
-            result = subprocess.run('ipconfig /all', shell=True, capture_output=True, text=True)
+            result = self.executor.run('ipconfig /all')
             
+            # La ventana se crea en el hilo de la interfaz
+            self.jobs.call_in_ui(self.show_network_window, result.stdout)
+        except:
+            self.show_custom_message("Error", "No se pudo obtener la información de red", error=True)
+
+    def show_network_window(self, network_info):
+        try:
             # Crear una nueva ventana
             info_window = Toplevel(self.root)
             info_window.title("Información de red")
@@ -1172,7 +4583,7 @@ class WindowsOptimizer:
                                 wrap=tk.WORD,
                                 yscrollcommand=scrollbar.set,
                                 bg='black',
-                                fg=self.rgb_to_hex(self.r, self.g, self.b),
+                                fg=self.animator.color,
                                 font=('Consolas', 10))
             text_widget.pack(expand=True, fill='both')
             
@@ -1180,7 +4591,7 @@ class WindowsOptimizer:
             scrollbar.config(command=text_widget.yview)
             
             # Insertar la información
-            text_widget.insert('1.0', result.stdout)
+            text_widget.insert('1.0', network_info)
             
             # Hacer el texto de solo lectura
             text_widget.configure(state='disabled')
@@ -1190,9 +4601,9 @@ class WindowsOptimizer:
                                    text="Cerrar",
                                    command=info_window.destroy,
                                    bg='black',
-                                   fg=self.rgb_to_hex(self.r, self.g, self.b),
+                                   fg=self.animator.color,
                                    activebackground='#001100',
-                                   activeforeground=self.rgb_to_hex(self.r, self.g, self.b),
+                                   activeforeground=self.animator.color,
                                    relief='solid',
                                    bd=2)
             close_button.pack(pady=10)
@@ -1208,423 +4619,322 @@ class WindowsOptimizer:
         except:
             self.show_custom_message("Error", "No se pudo obtener la información de red", error=True)
 
+    @background_action
     def clean_downloads(self):
         try:
             # Obtener la ruta de Descargas de forma genérica
-            downloads_path = os.path.join(os.path.expanduser('~'), 'Downloads')
-            
-            # Contar archivos primero
-            total_files = sum(1 for _ in os.listdir(downloads_path))
+            downloads_path = cleanup_targets()['downloads'][0]
+            policy = self.cleanup_policy('downloads')
             
             # Crear barra de progreso
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Limpiando carpeta de descargas", total_files)
+            channel = self.show_progress("Limpiando carpeta de descargas", 1)
+            
+            # Recorrido en una sola pasada: el total se estima sobre la marcha
+            walker = TreeWalker(downloads_path, channel.token)
+            retries = DeleteRetryQueue([downloads_path])
             
             files_removed = 0
-            for filename in os.listdir(downloads_path):
-                file_path = path.join(downloads_path, filename)
+            bytes_removed = 0
+            for entry, is_dir in walker:
+                if is_dir:
+                    try:
+                        os.rmdir(entry.path)
+                    except OSError:
+                        pass  # Quedó algún archivo conservado o pendiente de reintento
+                    continue
+                size = 0
                 try:
-                    if path.isfile(file_path):
-                        os.unlink(file_path)
-                    elif path.isdir(file_path):
-                        shutil.rmtree(file_path)
+                    stat = entry.stat(follow_symlinks=False)
+                    size = stat.st_size
+                    if policy is not None and not policy(entry.path, size, stat.st_mtime):
+                        continue
+                    remove_entry(entry)
                     files_removed += 1
-                    
-                    # Actualizar progreso
-                    progress_bar['value'] = files_removed
-                    percent = int((files_removed / total_files) * 100)
-                    percent_label.config(text=f"{percent}%")
-                    status_label.config(text=f"Eliminando: {filename}")
-                    progress_window.update()
-                except:
-                    continue
+                    bytes_removed += size
+                except OSError as error:
+                    retries.add(entry.path, size, error)
+                
+                # Actualizar progreso
+                channel.post(value=walker.yielded,
+                             maximum=walker.estimated_total,
+                             status=f"Eliminando: {entry.name}")
+            
+            channel.post(status="Reintentando archivos bloqueados...")
+            failures = retries.finish(channel.token)
+            files_removed += retries.recovered
+            bytes_removed += retries.recovered_bytes
             
-            progress_window.destroy()
-            self.show_custom_message("Éxito", f"Se eliminaron {files_removed} archivos de la carpeta de descargas")
+            channel.close()
+            if walker.cancelled:
+                self.show_custom_message("Cancelado", f"Limpieza cancelada: se eliminaron {files_removed} archivos "
+                                                      f"({bytes_removed / (1024 * 1024):.1f} MB liberados)")
+                return
+            message = f"Se eliminaron {files_removed} archivos de la carpeta de descargas"
+            if failures:
+                message += f"\n\nNo se pudieron eliminar {len(failures)} archivos:\n{failures.summary()}"
+            self.show_custom_message("Éxito", message)
+        except CleanupRuleError as error:
+            if 'channel' in locals():
+                channel.close()
+            self.show_custom_message("Error", f"Reglas de limpieza no válidas:\n{error}", error=True)
         except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
+            if 'channel' in locals():
+                channel.close()
             self.show_custom_message("Error", "No se pudo limpiar la carpeta de descargas", error=True)
 
-    def gaming_mode(self):
+    def run_profile(self, name, error_message):
+        """Aplicar un perfil declarativo (carpeta profiles) con su ventana de progreso"""
         try:
-            # Crear ventana de progreso
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Activando Modo Gaming Plus", 100)
-            progress = 0
-            
-            # 1. Desactivar VSYNC
-            status_label.config(text="Desactivando VSYNC globalmente...")
-            try:
-                # Modificar registro para VSYNC
-                subprocess.run('reg add "HKCU\\System\\GameConfigStore" /v "GameDVR_Enabled" /t REG_DWORD /d "0" /f', shell=True)
-                subprocess.run('reg add "HKLM\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion\\Multimedia\\SystemProfile" /v "SystemResponsiveness" /t REG_DWORD /d "0" /f', shell=True)
-                progress += 25
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 2. Cerrar procesos conflictivos
-            status_label.config(text="Cerrando procesos conflictivos...")
-            conflicting_processes = [
-                "chrome.exe", "spotify.exe", "discord.exe", "steam.exe",
-                "epicgameslauncher.exe", "adobeupdateservice.exe"
-            ]
-            try:
-                for proc in psutil.process_iter(['name']):
-                    if proc.info['name'].lower() in conflicting_processes:
-                        proc.kill()
-                progress += 25
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 3. Activar Turbo Boost
-            status_label.config(text="Activando Turbo Boost para juegos...")
-            try:
-                # Establecer esquema de energía de alto rendimiento
-                subprocess.run('powercfg /setactive 8c5e7fda-e8bf-4a96-9a85-a6e23a8c635c', shell=True)
-                # Prioridad alta para juegos
-                subprocess.run('reg add "HKLM\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion\\Multimedia\\SystemProfile\\Tasks\\Games" /v "Priority" /t REG_DWORD /d "6" /f', shell=True)
-                subprocess.run('reg add "HKLM\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion\\Multimedia\\SystemProfile\\Tasks\\Games" /v "GPU Priority" /t REG_DWORD /d "8" /f', shell=True)
-                progress += 25
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 4. Gestor de FPS
-            status_label.config(text="Configurando gestor de FPS...")
-            try:
-                # Limitar FPS globalmente a 144 (puedes ajustar este valor)
-                subprocess.run('reg add "HKLM\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion\\Multimedia\\SystemProfile\\Tasks\\Games" /v "Affinity" /t REG_DWORD /d "0" /f', shell=True)
-                subprocess.run('reg add "HKLM\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion\\Multimedia\\SystemProfile\\Tasks\\Games" /v "Background Only" /t REG_SZ /d "False" /f', shell=True)
-                subprocess.run('reg add "HKLM\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion\\Multimedia\\SystemProfile\\Tasks\\Games" /v "Clock Rate" /t REG_DWORD /d "2710" /f', shell=True)
-                progress += 25
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            time.sleep(1)  # Pequeña pausa para mostrar el 100%
-            progress_window.destroy()
-            
-            self.show_custom_message("Éxito", """✅ Modo Gaming Plus activado:
-• VSYNC desactivado globalmente
-• Procesos conflictivos cerrados
-• Turbo Boost activado
-• Gestor de FPS configurado""")
+            plan = self.profiles.load(name)
+            channel = self.show_progress(plan.title, 100)
+            report = plan.execute(self.planner, self.executor, channel, journal=self.journal.begin(name),
+                                  token=channel.token)
+            self.last_profile_report = report
+            channel.close()
+
+            if report.cancelled:
+                self.show_custom_message("Cancelado", f"{plan.title}\n\n{report.summary()}")
+                return
+            if report.errors:
+                self.show_custom_message("Error", f"{error_message}\n\n{report.error_summary()}", error=True)
+                return
+            self.show_custom_message("Éxito", f"{plan.message}\n\n{report.summary()}")
+        except ProfileError as error:
+            if 'channel' in locals():
+                channel.close()
+            self.show_custom_message("Error", f"{error_message}\n\n{error}", error=True)
         except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
-            self.show_custom_message("Error", "No se pudo activar el Modo Gaming Plus", error=True)
-
-    def optimize_input(self):
-        try:
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Optimizando Input", 100)
-            progress = 0
-
-            # 1. Timer Resolution y Latencia
-            status_label.config(text="Optimizando Timer Resolution...")
-            try:
-                subprocess.run('bcdedit /set useplatformtick yes', shell=True)
-                subprocess.run('bcdedit /set disabledynamictick yes', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 2. Optimización de Mouse
-            status_label.config(text="Optimizando periféricos...")
-            try:
-                # Deshabilitar aceleración del mouse
-                subprocess.run('reg add "HKCU\\Control Panel\\Mouse" /v "MouseSpeed" /t REG_SZ /d "0" /f', shell=True)
-                subprocess.run('reg add "HKCU\\Control Panel\\Mouse" /v "MouseThreshold1" /t REG_SZ /d "0" /f', shell=True)
-                subprocess.run('reg add "HKCU\\Control Panel\\Mouse" /v "MouseThreshold2" /t REG_SZ /d "0" /f', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 3. Optimización USB y HID
-            status_label.config(text="Optimizando USB y HID...")
-            try:
-                subprocess.run('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\USB" /v "DisableSelectiveSuspend" /t REG_DWORD /d "1" /f', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 4. Prioridades de proceso
-            status_label.config(text="Ajustando prioridades...")
-            try:
-                critical_processes = ["csrss.exe", "dwm.exe", "explorer.exe"]
-                for proc in psutil.process_iter(['name']):
-                    if proc.info['name'].lower() in critical_processes:
-                        p = psutil.Process(proc.pid)
-                        p.nice(psutil.HIGH_PRIORITY_CLASS)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
+            if 'channel' in locals():
+                channel.close()
+            self.show_custom_message("Error", error_message, error=True)
 
-            # 5. Raw Input y DirectInput
-            status_label.config(text="Optimizando Raw Input...")
-            try:
-                subprocess.run('reg add "HKCU\\Control Panel\\Input" /v "MouseInputProcessingRate" /t REG_DWORD /d "1" /f', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
+    @background_action
+    def gaming_mode(self):
+        self.run_profile('gaming', "No se pudo activar el Modo Gaming Plus")
 
-            time.sleep(1)
-            progress_window.destroy()
-            
-            self.show_custom_message("Éxito", """✅ Optimización de Input completada:
-• Timer Resolution optimizado
-• Latencia reducida
-• Periféricos optimizados
-• USB/HID mejorado
-• Raw Input configurado""")
-        except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
-            self.show_custom_message("Error", "No se pudo completar la optimización de input", error=True)
+    @background_action
+    def optimize_input(self):
+        self.run_profile('input', "No se pudo completar la optimización de input")
 
+    @background_action
     def clean_system(self):
         try:
-            # Rutas genéricas del sistema
-            system_paths = [
-                os.environ.get('SYSTEMROOT') + '\\SoftwareDistribution\\Download',  # Windows Update
-                os.environ.get('SYSTEMROOT') + '\\Logs',  # Logs del sistema
-                os.environ.get('SYSTEMROOT') + '\\Debug'  # Archivos de debug
-            ]
-            
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Limpieza del Sistema", 100)
-            progress = 0
-
-            # 1. Limpiar registro de Windows
-            status_label.config(text="Limpiando registro de Windows...")
-            try:
-                subprocess.run('reg delete "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\RunMRU" /f', shell=True)
-                subprocess.run('reg delete "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\TypedPaths" /f', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 2. Limpiar Windows.old
-            status_label.config(text="Limpiando carpeta Windows.old...")
-            try:
-                if path.exists("C:\\Windows.old"):
-                    shutil.rmtree("C:\\Windows.old")
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 3. Limpiar Prefetch
-            status_label.config(text="Limpiando Prefetch...")
-            try:
-                subprocess.run('del /f /q C:\\Windows\\Prefetch\\*', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 4. Limpiar caché de navegadores
-            status_label.config(text="Limpiando caché de navegadores...")
-            try:
-                # Chrome
-                chrome_cache = path.expanduser('~\\AppData\\Local\\Google\\Chrome\\User Data\\Default\\Cache')
-                if path.exists(chrome_cache):
-                    shutil.rmtree(chrome_cache)
-                # Edge
-                edge_cache = path.expanduser('~\\AppData\\Local\\Microsoft\\Edge\\User Data\\Default\\Cache')
-                if path.exists(edge_cache):
-                    shutil.rmtree(edge_cache)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 5. Limpiar caché de Windows Update
-            status_label.config(text="Limpiando caché de Windows Update...")
-            try:
-                subprocess.run('net stop wuauserv', shell=True)
-                subprocess.run('rd /s /q C:\\Windows\\SoftwareDistribution', shell=True)
-                subprocess.run('net start wuauserv', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            time.sleep(1)
-            progress_window.destroy()
+            channel = self.show_progress("Limpieza del Sistema", 100)
+            token = channel.token
+            run = partial(self.executor.run, token=token)
+            cache = self.stat_cache()
+            windows_old, chrome_cache, edge_cache = cleanup_targets()['system'][:3]
+            freed = []  # (archivos, bytes) de cada carpeta borrada
+            failures = DeleteFailures()
+
+            def remove_tree(folder):
+                def report(files, size, meter):
+                    name = path.basename(folder.rstrip('\\/'))
+                    channel.post(status=f"Eliminando {name}: {files} archivos", detail=meter.describe())
+
+                freed.append(delete_tree(folder, token, cache, failures, report))
+
+            registry_batch = RegistryBatch()
+            registry_batch.delete_key("HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\RunMRU")
+            registry_batch.delete_key("HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\TypedPaths")
+
+            # Solo Windows Update exige orden; el resto de pasos corre en paralelo
+            graph = TaskGraph()
+            graph.add('registro', self.registry.apply, registry_batch,
+                      status="Registro de Windows limpiado")
+            graph.add('windows.old', remove_tree, windows_old,
+                      status="Carpeta Windows.old eliminada")
+            graph.add('prefetch', run, 'del /f /q C:\\Windows\\Prefetch\\*',
+                      status="Prefetch limpiado")
+            graph.add('chrome', remove_tree, chrome_cache,
+                      status="Caché de Chrome eliminada")
+            graph.add('edge', remove_tree, edge_cache,
+                      status="Caché de Edge eliminada")
+            graph.add('wu-stop', run, 'net stop wuauserv',
+                      status="Servicio Windows Update detenido")
+            graph.add('wu-clear', run, 'rd /s /q C:\\Windows\\SoftwareDistribution',
+                      after=['wu-stop'], status="Caché de Windows Update limpiada")
+            # Aunque se cancele, Windows Update no queda detenido
+            graph.add('wu-start', self.executor.run, 'net start wuauserv',
+                      after=['wu-clear'], status="Servicio Windows Update iniciado", always=True)
+
+            finished = []
+
+            def report(step, error):
+                finished.append(step.name)
+                channel.post(value=100 * len(finished) // len(graph), status=step.status if error is None else None)
+
+            channel.post(status="Limpiando sistema...")
+            self.last_trace = graph.run(report, token=token)
+
+            channel.close()
+            files_removed = sum(files for files, _ in freed)
+            megabytes = sum(size for _, size in freed) / (1024 * 1024)
             
-            self.show_custom_message("Éxito", """✅ Limpieza del Sistema completada:
+            if token.cancelled:
+                completed = len(self.last_trace.entries) - len(self.last_trace.cancelled)
+                self.show_custom_message("Cancelado", f"""Limpieza del Sistema cancelada:
+• Pasos completados: {completed} de {len(graph)}
+• Archivos eliminados: {files_removed} ({megabytes:.1f} MB liberados)""")
+                return
+            self.show_custom_message("Éxito", f"""✅ Limpieza del Sistema completada:
 • Registro de Windows limpiado
 • Windows.old eliminado
 • Prefetch limpiado
 • Caché de navegadores eliminada
-• Caché de Windows Update limpiada""")
+• Caché de Windows Update limpiada
+• Espacio liberado: {megabytes:.1f} MB""" + (f"\n\nNo se pudieron eliminar {len(failures)} archivos:\n"
+                                               f"{failures.summary()}" if failures else ""))
         except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
+            if 'channel' in locals():
+                channel.close()
             self.show_custom_message("Error", "No se pudo completar la limpieza del sistema", error=True)
 
+    @background_action
     def optimize_disk(self):
         try:
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Optimización de Disco", 100)
+            channel = self.show_progress("Optimización de Disco", 100)
+            token = channel.token
             progress = 0
 
             # 1. Ejecutar CHKDSK
-            status_label.config(text="Ejecutando CHKDSK...")
+            token.check()
+            channel.post(status="Ejecutando CHKDSK...")
             try:
-                subprocess.run('chkdsk C: /f', shell=True)
-                progress += 25
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
+                if not self.executor.run('chkdsk C: /f', token=token).cancelled:
+                    progress += 25
+                    channel.post(value=progress)
             except:
                 pass
 
             # 2. Desfragmentar/Optimizar disco
-            status_label.config(text="Optimizando disco...")
+            token.check()
+            channel.post(status="Optimizando disco...")
             try:
-                subprocess.run('defrag C: /O', shell=True)
-                progress += 25
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
+                if not self.executor.run('defrag C: /O', token=token).cancelled:
+                    progress += 25
+                    channel.post(value=progress)
             except:
                 pass
 
             # 3. Limpiar puntos de restauración
-            status_label.config(text="Limpiando puntos de restauración...")
+            token.check()
+            channel.post(status="Limpiando puntos de restauración...")
             try:
-                subprocess.run('vssadmin delete shadows /all /quiet', shell=True)
-                progress += 25
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
+                if not self.executor.run('vssadmin delete shadows /all /quiet', token=token).cancelled:
+                    progress += 25
+                    channel.post(value=progress)
             except:
                 pass
 
             # 4. Optimizar sistema de archivos
-            status_label.config(text="Optimizando sistema de archivos...")
+            token.check()
+            channel.post(status="Optimizando sistema de archivos...")
             try:
-                subprocess.run('fsutil behavior set disabledeletenotify 0', shell=True)
-                progress += 25
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{percent}%")
-                progress_window.update()
+                if not self.executor.run('fsutil behavior set disabledeletenotify 0', token=token).cancelled:
+                    progress += 25
+                    channel.post(value=progress)
             except:
                 pass
+            token.check()
 
-            time.sleep(1)
-            progress_window.destroy()
+            channel.close()
             
             self.show_custom_message("Éxito", """✅ Optimización de Disco completada:
 • CHKDSK ejecutado
 • Disco optimizado
 • Puntos de restauración limpiados
 • Sistema de archivos optimizado""")
+        except OperationCancelled:
+            channel.close()
+            self.show_custom_message("Cancelado", f"Optimización de disco cancelada ({progress}% completado)")
         except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
+            if 'channel' in locals():
+                channel.close()
             self.show_custom_message("Error", "No se pudo completar la optimización del disco", error=True)
 
+    @background_action
     def optimize_memory(self):
         try:
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Optimización de Memoria", 100)
+            channel = self.show_progress("Optimización de Memoria", 100)
+            token = channel.token
             progress = 0
+            batch = RegistryBatch()
+            failed = []
 
             # 1. Liberar RAM inactiva
-            status_label.config(text="Liberando memoria RAM...")
+            token.check()
+            channel.post(status="Liberando memoria RAM...")
             try:
-                subprocess.run('powershell -command "Clear-RecycleBin -Force"', shell=True)
-                progress += 25
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
+                result = self.executor.run('powershell -command "Clear-RecycleBin -Force"', token=token)
+                if not result.cancelled:
+                    progress += 25
+                    channel.post(value=progress)
+                    if not result.ok:
+                        failed.append(f"{result.command}: código {result.returncode}")
             except:
                 pass
 
             # 2. Optimizar memoria virtual
-            status_label.config(text="Optimizando memoria virtual...")
+            token.check()
+            channel.post(status="Optimizando memoria virtual...")
             try:
-                subprocess.run('wmic computersystem where name="%computername%" set AutomaticManagedPagefile=False', shell=True)
-                progress += 25
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
+                result = self.executor.run('wmic computersystem where name="%computername%" set AutomaticManagedPagefile=False', token=token)
+                if not result.cancelled:
+                    progress += 25
+                    channel.post(value=progress)
+                    if not result.ok:
+                        failed.append(f"{result.command}: código {result.returncode}")
             except:
                 pass
 
             # 3. Limpiar archivo de paginación
-            status_label.config(text="Limpiando archivo de paginación...")
+            token.check()
+            channel.post(status="Limpiando archivo de paginación...")
             try:
-                subprocess.run('wmic pagefileset where name="C:\\pagefile.sys" set InitialSize=4096,MaximumSize=4096', shell=True)
-                progress += 25
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
+                result = self.executor.run('wmic pagefileset where name="C:\\pagefile.sys" set InitialSize=4096,MaximumSize=4096', token=token)
+                if not result.cancelled:
+                    progress += 25
+                    channel.post(value=progress)
+                    if not result.ok:
+                        failed.append(f"{result.command}: código {result.returncode}")
             except:
                 pass
 
             # 4. Optimizar programas de inicio
-            status_label.config(text="Optimizando inicio del sistema...")
+            token.check()
+            channel.post(status="Optimizando inicio del sistema...")
             try:
-                subprocess.run('reg add "HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Serialize" /v "StartupDelayInMSec" /t REG_DWORD /d "0" /f', shell=True)
+                batch.set("HKCU\\Software\\Microsoft\\Windows\\CurrentVersion\\Explorer\\Serialize", "StartupDelayInMSec", 0)
                 progress += 25
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
+                channel.post(value=progress)
             except:
                 pass
 
-            time.sleep(1)
-            progress_window.destroy()
+            # Escribir solo los valores que cambian, todos de una vez
+            token.check()
+            channel.post(status="Guardando cambios en el registro...")
+            plan = self.planner.plan(registry=batch)
+            self.planner.apply(plan, journal=self.journal.begin('optimize_memory'))
+
+            channel.close()
+            plan.failures[:0] = failed
+            if plan.failures:
+                self.show_custom_message("Error", "La optimización de memoria no se completó\n\n"
+                                                  f"{plan.failure_summary()}", error=True)
+                return
             
             self.show_custom_message("Éxito", """✅ Optimización de Memoria completada:
 • RAM inactiva liberada
 • Memoria virtual optimizada
 • Archivo de paginación limpiado
-• Inicio del sistema optimizado""")
+• Inicio del sistema optimizado""" + f"\n\n{plan.summary()}")
+        except OperationCancelled:
+            channel.close()
+            self.show_custom_message("Cancelado", f"Optimización de memoria cancelada ({progress}% completado)")
         except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
+            if 'channel' in locals():
+                channel.close()
             self.show_custom_message("Error", "No se pudo completar la optimización de memoria", error=True)
 
     def show_creator_info(self):
@@ -1654,7 +4964,7 @@ Versión 1.0
         
         label = Label(frame,
                         text=creator_info,
-                        fg=self.rgb_to_hex(self.r, self.g, self.b),
+                        fg=self.animator.color,
                         bg='black',
                         justify='center',
                         font=('Arial', 12, 'bold'))
@@ -1665,9 +4975,9 @@ Versión 1.0
                                text="Cerrar",
                                command=info_window.destroy,
                                bg='black',
-                               fg=self.rgb_to_hex(self.r, self.g, self.b),
+                               fg=self.animator.color,
                                activebackground='#001100',
-                               activeforeground=self.rgb_to_hex(self.r, self.g, self.b),
+                               activeforeground=self.animator.color,
                                relief='solid',
                                bd=2)
         close_button.pack(pady=10)
@@ -1681,20 +4991,7 @@ Versión 1.0
         info_window.geometry(f'{width}x{height}+{x}+{y}')
 
     def detect_cpu_type(self):
-        try:
-            import wmi
-            c = wmi.WMI()
-            cpu_info = c.Win32_Processor()[0]
-            cpu_name = cpu_info.Name.lower()
-            
-            if 'intel' in cpu_name:
-                return 'intel'
-            elif 'amd' in cpu_name:
-                return 'amd'
-            else:
-                return 'unknown'
-        except:
-            return 'unknown'
+        return self.hardware.cpu_type()
 
     def setup_cpu_tab(self):
         container = ttk.Frame(self.tab5, style='Modern.TFrame')
@@ -1715,73 +5012,15 @@ Versión 1.0
         info_frame = Frame(container, bg='#161b22', padx=30, pady=20)
         info_frame.pack(fill='x', pady=(0, 30))
         
-        try:
-            import wmi
-            c = wmi.WMI()
-            
-            # CPU Info
-            cpu_info = c.Win32_Processor()[0]
-            cpu_label = Label(info_frame,
-                               text=f"CPU: {cpu_info.Name}",
-                               fg='#c9d1d9',
-                               bg='#161b22',
-                               font=('Segoe UI', 11),
-                               justify='left')
-            cpu_label.pack(anchor='w', pady=5)
-            
-            # RAM Info
-            total_ram = round(float(c.Win32_ComputerSystem()[0].TotalPhysicalMemory) / 1024 / 1024 / 1024, 2)
-            ram_label = Label(info_frame,
-                               text=f"Memoria RAM: {total_ram} GB",
-                               fg='#c9d1d9',
-                               bg='#161b22',
-                               font=('Segoe UI', 11),
-                               justify='left')
-            ram_label.pack(anchor='w', pady=5)
-            
-            # GPU Info
-            gpu_info = c.Win32_VideoController()[0]
-            gpu_label = Label(info_frame,
-                               text=f"GPU: {gpu_info.Name}",
-                               fg='#c9d1d9',
-                               bg='#161b22',
-                               font=('Segoe UI', 11),
-                               justify='left')
-            gpu_label.pack(anchor='w', pady=5)
-            
-            # Motherboard Info
-            mb_info = c.Win32_BaseBoard()[0]
-            mb_label = Label(info_frame,
-                              text=f"Placa Base: {mb_info.Product}",
-                              fg='#c9d1d9',
+        loading_label = Label(info_frame,
+                              text="Obteniendo información del sistema...",
+                              fg='#8b949e',
                               bg='#161b22',
-                              font=('Segoe UI', 11),
-                              justify='left')
-            mb_label.pack(anchor='w', pady=5)
-            
-            # OS Info
-            os_info = c.Win32_OperatingSystem()[0]
-            os_label = Label(info_frame,
-                              text=f"Sistema Operativo: {os_info.Caption}",
-                              fg='#c9d1d9',
-                              bg='#161b22',
-                              font=('Segoe UI', 11),
-                              justify='left')
-            os_label.pack(anchor='w', pady=5)
-            
-        except Exception as e:
-            error_label = Label(info_frame,
-                                 text="No se pudo obtener la información del sistema",
-                                 fg='#ff6b6b',
-                                 bg='#161b22',
-                                 font=('Segoe UI', 11))
-            error_label.pack(pady=10)
-        
-        # Detectar tipo de CPU
-        cpu_type = self.detect_cpu_type()
+                              font=('Segoe UI', 11))
+        loading_label.pack(anchor='w', pady=5)
         
         # Separador
-        separator = ttk.Frame(container, height=2, style='Separator.TFrame')
+        separator = self.animator.add(Frame(container, height=2), 'bg')
         separator.pack(fill='x', pady=20)
         
         # Definir tooltips para los botones de CPU
@@ -1836,7 +5075,39 @@ Versión 1.0
             tooltips["Optimización AMD"]
         )
         
+        # Los datos llegan del inventario en segundo plano (o de la caché)
+        self.hardware.when_ready(
+            partial(self.jobs.call_in_ui, self.show_hardware_info, info_frame, loading_label, intel_button, amd_button))
+
+    def show_hardware_info(self, info_frame, loading_label, intel_button, amd_button, data):
+        """Rellenar la pestaña CPU con el inventario de hardware"""
+        if not info_frame.winfo_exists():
+            return
+        loading_label.destroy()
+        
+        if not data:
+            error_label = Label(info_frame,
+                                 text="No se pudo obtener la información del sistema",
+                                 fg='#ff6b6b',
+                                 bg='#161b22',
+                                 font=('Segoe UI', 11))
+            error_label.pack(pady=10)
+            return
+        
+        for text in [f"CPU: {data.get('cpu') or 'Desconocida'}",
+                     f"Memoria RAM: {data.get('ram_gb')} GB",
+                     f"GPU: {data.get('gpu') or 'Desconocida'}",
+                     f"Placa Base: {data.get('board') or 'Desconocida'}",
+                     f"Sistema Operativo: {data.get('os') or 'Desconocido'}"]:
+            Label(info_frame,
+                  text=text,
+                  fg='#c9d1d9',
+                  bg='#161b22',
+                  font=('Segoe UI', 11),
+                  justify='left').pack(anchor='w', pady=5)
+        
         # Deshabilitar el botón que no corresponde
+        cpu_type = self.detect_cpu_type()
         if cpu_type == 'intel':
             amd_button.configure(state='disabled', bg='#1a1a1a', cursor='no')
             amd_button.unbind('<Enter>')
@@ -1846,220 +5117,113 @@ Versión 1.0
             intel_button.unbind('<Enter>')
             intel_button.unbind('<Leave>')
 
+    @background_action
     def optimize_fivem(self):
         try:
             # Ruta genérica de FiveM
-            fivem_cache = os.path.join(os.environ.get('LOCALAPPDATA'), 'FiveM', 'FiveM.app', 'cache')
+            fivem_cache = cleanup_targets()['fivem'][0]
             
             # Crear barra de progreso
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Optimizando FiveM", 100)
+            channel = self.show_progress("Optimizando FiveM", 100)
+            token = channel.token
             progress = 0
+            freed = (0, 0)
+            failures = DeleteFailures()
 
-            # 1. Limpiar caché
-            status_label.config(text="Limpiando caché de FiveM...")
+            # 1. Limpiar caché (se puede cancelar entre archivos)
+            channel.post(status="Limpiando caché de FiveM...")
             try:
-                if os.path.exists(fivem_cache):
-                    shutil.rmtree(fivem_cache)
+                freed = delete_tree(fivem_cache, token, self.stat_cache(), failures,
+                                    lambda files, size, meter: channel.post(
+                                        status=f"Limpiando caché de FiveM: {files} archivos",
+                                        detail=meter.describe()))
                 progress += 25
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
+                channel.post(value=progress)
             except:
                 pass
 
             # 2. Optimizar configuración
-            status_label.config(text="Optimizando configuración...")
+            token.check()
+            channel.post(status="Optimizando configuración...")
             try:
                 # Aquí irían los comandos específicos para FiveM
                 progress += 25
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
+                channel.post(value=progress)
             except:
                 pass
 
             # 3. Ajustar memoria
-            status_label.config(text="Ajustando memoria...")
+            token.check()
+            channel.post(status="Ajustando memoria...")
             progress += 25
-            progress_bar['value'] = progress
-            percent_label.config(text=f"{progress}%")
-            progress_window.update()
+            channel.post(value=progress)
 
             # 4. Finalizar optimización
-            status_label.config(text="Finalizando optimización...")
+            channel.post(status="Finalizando optimización...")
             progress = 100
-            progress_bar['value'] = progress
-            percent_label.config(text=f"{progress}%")
-            progress_window.update()
+            channel.post(value=progress)
             
-            time.sleep(1)
-            progress_window.destroy()
+            channel.close()
             
             self.show_custom_message("Éxito", """✅ FiveM Optimizado:
 • Caché limpiada
 • Configuración optimizada
 • Memoria ajustada
-• Rendimiento mejorado""")
+• Rendimiento mejorado""" + (f"\n\nArchivos de la caché que no se pudieron eliminar: {len(failures)}\n"
+                            f"{failures.summary()}" if failures else ""))
+        except OperationCancelled:
+            channel.close()
+            self.show_custom_message("Cancelado", f"Optimización de FiveM cancelada: se eliminaron {freed[0]} archivos "
+                                                  f"de la caché ({freed[1] / (1024 * 1024):.1f} MB liberados)")
         except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
+            if 'channel' in locals():
+                channel.close()
             self.show_custom_message("Error", "No se pudo optimizar FiveM", error=True)
 
+    @background_action
     def optimize_cs2(self):
         try:
             # Ruta genérica de Steam y CS2
-            steam_path = os.path.join(os.environ.get('PROGRAMFILES(X86)'), 'Steam', 'steamapps', 'common', 'Counter-Strike Global Offensive')
+            steam_path = env_path('PROGRAMFILES(X86)', 'Steam', 'steamapps', 'common', 'Counter-Strike Global Offensive')
             
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Optimizando CS2", 100)
+            channel = self.show_progress("Optimizando CS2", 100)
             progress = 0
 
             # Implementar optimizaciones específicas para CS2
-            status_label.config(text="Optimizando CS2...")
+            channel.post(status="Optimizando CS2...")
             # ... código de optimización ...
 
-            progress_window.destroy()
+            channel.close()
             self.show_custom_message("Éxito", "CS2 optimizado correctamente")
         except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
+            if 'channel' in locals():
+                channel.close()
             self.show_custom_message("Error", "No se pudo optimizar CS2", error=True)
 
+    @background_action
     def optimize_fc25(self):
         try:
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Optimizando FC25", 100)
+            channel = self.show_progress("Optimizando FC25", 100)
             progress = 0
 
             # Implementar optimizaciones específicas para FC25
-            status_label.config(text="Optimizando FC25...")
+            channel.post(status="Optimizando FC25...")
             # ... código de optimización ...
 
-            progress_window.destroy()
+            channel.close()
             self.show_custom_message("Éxito", "FC25 optimizado correctamente")
         except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
+            if 'channel' in locals():
+                channel.close()
             self.show_custom_message("Error", "No se pudo optimizar FC25", error=True)
 
+    @background_action
     def optimize_intel(self):
-        try:
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Optimizando CPU Intel", 100)
-            progress = 0
-
-            # 1. Ajustar plan de energía
-            status_label.config(text="Configurando plan de energía...")
-            try:
-                subprocess.run('powercfg /setactive 8c5e7fda-e8bf-4a96-9a85-a6e23a8c635c', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 2. Optimizar Intel SpeedStep
-            status_label.config(text="Optimizando Intel SpeedStep...")
-            progress += 20
-            progress_bar['value'] = progress
-            percent_label.config(text=f"{progress}%")
-            progress_window.update()
-
-            # 3. Configurar C-States
-            status_label.config(text="Configurando C-States...")
-            progress += 20
-            progress_bar['value'] = progress
-            percent_label.config(text=f"{progress}%")
-            progress_window.update()
-
-            # 4. Optimizar Turbo Boost
-            status_label.config(text="Optimizando Turbo Boost...")
-            progress += 20
-            progress_bar['value'] = progress
-            percent_label.config(text=f"{progress}%")
-            progress_window.update()
-
-            # 5. Ajustes finales
-            status_label.config(text="Aplicando ajustes finales...")
-            progress = 100
-            progress_bar['value'] = progress
-            percent_label.config(text=f"{progress}%")
-            progress_window.update()
-            
-            time.sleep(1)
-            progress_window.destroy()
-            
-            self.show_custom_message("Éxito", """✅ CPU Intel Optimizada:
-• Plan de energía configurado
-• SpeedStep optimizado
-• C-States ajustados
-• Turbo Boost optimizado
-• Rendimiento mejorado""")
-        except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
-            self.show_custom_message("Error", "No se pudo optimizar la CPU Intel", error=True)
+        self.run_profile('intel', "No se pudo optimizar la CPU Intel")
 
+    @background_action
     def optimize_amd(self):
-        try:
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Optimizando CPU AMD", 100)
-            progress = 0
-
-            # 1. Configurar modo alto rendimiento
-            status_label.config(text="Configurando modo de rendimiento...")
-            try:
-                subprocess.run('powercfg /setactive 8c5e7fda-e8bf-4a96-9a85-a6e23a8c635c', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 2. Optimizar Cool'n'Quiet
-            status_label.config(text="Optimizando AMD Cool'n'Quiet...")
-            progress += 20
-            progress_bar['value'] = progress
-            percent_label.config(text=f"{progress}%")
-            progress_window.update()
-
-            # 3. Configurar Core Parking
-            status_label.config(text="Desactivando Core Parking...")
-            progress += 20
-            progress_bar['value'] = progress
-            percent_label.config(text=f"{progress}%")
-            progress_window.update()
-
-            # 4. Optimizar Precision Boost
-            status_label.config(text="Optimizando Precision Boost...")
-            progress += 20
-            progress_bar['value'] = progress
-            percent_label.config(text=f"{progress}%")
-            progress_window.update()
-
-            # 5. Ajustes finales
-            status_label.config(text="Aplicando ajustes finales...")
-            progress = 100
-            progress_bar['value'] = progress
-            percent_label.config(text=f"{progress}%")
-            progress_window.update()
-            
-            time.sleep(1)
-            progress_window.destroy()
-            
-            self.show_custom_message("Éxito", """✅ CPU AMD Optimizada:
-• Modo alto rendimiento activado
-• Cool'n'Quiet optimizado
-• Core Parking desactivado
-• Precision Boost optimizado
-• Rendimiento mejorado""")
-        except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
-            self.show_custom_message("Error", "No se pudo optimizar la CPU AMD", error=True)
+        self.run_profile('amd', "No se pudo optimizar la CPU AMD")
 
     def setup_games_tab(self):
         container = ttk.Frame(self.tab4, style='Modern.TFrame')
@@ -2254,6 +5418,15 @@ Versión 1.0
                 'foreground': '#8b949e',
                 'padding': [20, 12],
                 'font': ('Segoe UI', 11)
+            },
+            # Barras del panel de progreso
+            'Modern.Horizontal.TProgressbar': {
+                'troughcolor': '#0d1117',
+                'background': '#66c0f4',
+                'darkcolor': '#66c0f4',
+                'lightcolor': '#66c0f4',
+                'bordercolor': '#0d1117',
+                'thickness': 15
             }
         }
         
@@ -2273,33 +5446,6 @@ Versión 1.0
             self.add_tooltip(btn, tooltip)
         return btn
 
-    def safe_remove(self, path):
-        """Eliminar archivos de forma segura"""
-        try:
-            if os.path.isfile(path):
-                os.remove(path)
-            elif os.path.isdir(path):
-                shutil.rmtree(path)
-            return True
-        except:
-            return False
-
-    def clean_directory(self, directory, callback=None):
-        """Limpiar directorio con callback opcional"""
-        if not os.path.exists(directory):
-            return 0
-        
-        files_removed = 0
-        for root, dirs, files in os.walk(directory, topdown=False):
-            for name in files:
-                if self.safe_remove(os.path.join(root, name)):
-                    files_removed += 1
-                if callback:
-                    callback(files_removed)
-            for name in dirs:
-                self.safe_remove(os.path.join(root, name))
-        return files_removed
-
     def setup_work_study_tab(self):
         container = ttk.Frame(self.tab6, style='Modern.TFrame')
         container.pack(expand=True, fill='both', padx=50, pady=30)
@@ -2457,7 +5603,7 @@ Versión 1.0
         )
 
         # Separador
-        separator = ttk.Frame(scrollable_frame, height=2, style='Separator.TFrame')
+        separator = self.animator.add(Frame(scrollable_frame, height=2), 'bg')
         separator.pack(fill='x', pady=20)
 
         # Frame contenedor para las tarjetas en dos columnas
@@ -2495,68 +5641,9 @@ Versión 1.0
         
         container.bind('<Configure>', _on_frame_configure)
 
+    @background_action
     def optimize_for_work(self):
-        try:
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Optimizando Windows para Trabajo/Estudio", 100)
-            progress = 0
-
-            # 1. Ajustar plan de energía balanceado
-            status_label.config(text="Configurando plan de energía...")
-            try:
-                subprocess.run('powercfg /setactive 381b4222-f694-41f0-9685-ff5bb260df2e', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 2. Optimizar rendimiento de aplicaciones
-            status_label.config(text="Optimizando rendimiento...")
-            try:
-                subprocess.run('reg add "HKLM\\SOFTWARE\\Microsoft\\Windows NT\\CurrentVersion\\Image File Execution Options\\csrss.exe\\PerfOptions" /v CpuPriorityClass /t REG_DWORD /d 3 /f', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 3. Configurar Windows Update
-            status_label.config(text="Configurando actualizaciones...")
-            progress += 20
-            progress_bar['value'] = progress
-            percent_label.config(text=f"{progress}%")
-            progress_window.update()
-
-            # 4. Optimizar búsqueda de Windows
-            status_label.config(text="Optimizando búsqueda...")
-            progress += 20
-            progress_bar['value'] = progress
-            percent_label.config(text=f"{progress}%")
-            progress_window.update()
-
-            # 5. Ajustes finales
-            status_label.config(text="Aplicando ajustes finales...")
-            progress = 100
-            progress_bar['value'] = progress
-            percent_label.config(text=f"{progress}%")
-            progress_window.update()
-            
-            time.sleep(1)
-            progress_window.destroy()
-            
-            self.show_custom_message("Éxito", """✅ Windows Optimizado para Trabajo/Estudio:
-• Plan de energía balanceado
-• Rendimiento optimizado para productividad
-• Actualizaciones configuradas
-• Búsqueda optimizada
-• Sistema preparado para multitarea""")
-        except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
-            self.show_custom_message("Error", "No se pudo completar la optimización", error=True)
+        self.run_profile('work', "No se pudo completar la optimización")
 
     def create_category_card(self, parent, category):
         # Frame para la tarjeta
@@ -2666,98 +5753,14 @@ Versión 1.0
         self.add_modern_tooltip(card_frame, category["tooltip"])
 
     # Agregar la nueva función para optimizar periféricos
+    @background_action
     def optimize_peripherals(self):
-        try:
-            progress_window, progress_bar, status_label, percent_label = self.show_progress(
-                "Optimizando Periféricos", 100)
-            progress = 0
-
-            # 1. Optimizar USB y HID
-            status_label.config(text="Optimizando puertos USB...")
-            try:
-                # Deshabilitar selective suspend
-                subprocess.run('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\USB" /v "DisableSelectiveSuspend" /t REG_DWORD /d "1" /f', shell=True)
-                # Optimizar polling rate USB
-                subprocess.run('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\USB" /v "DisableSelectiveSuspend" /t REG_DWORD /d "1" /f', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 2. Optimizar controladores de juego
-            status_label.config(text="Optimizando controladores...")
-            try:
-                # Optimizar DirectInput
-                subprocess.run('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\MediaProperties\\PrivateProperties\\Joystick\\OEM" /v "POV" /t REG_DWORD /d "1" /f', shell=True)
-                # Optimizar XInput
-                subprocess.run('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\HidGame" /v "Start" /t REG_DWORD /d "3" /f', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 3. Optimizar ratón y teclado
-            status_label.config(text="Optimizando ratón y teclado...")
-            try:
-                # Deshabilitar aceleración del ratón
-                subprocess.run('reg add "HKCU\\Control Panel\\Mouse" /v "MouseSpeed" /t REG_SZ /d "0" /f', shell=True)
-                subprocess.run('reg add "HKCU\\Control Panel\\Mouse" /v "MouseThreshold1" /t REG_SZ /d "0" /f', shell=True)
-                subprocess.run('reg add "HKCU\\Control Panel\\Mouse" /v "MouseThreshold2" /t REG_SZ /d "0" /f', shell=True)
-                # Optimizar tasa de respuesta del teclado
-                subprocess.run('reg add "HKCU\\Control Panel\\Keyboard" /v "KeyboardDelay" /t REG_SZ /d "0" /f', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 4. Optimizar controladores PS4/PS5
-            status_label.config(text="Optimizando controladores PS4/PS5...")
-            try:
-                # Optimizar DS4/DualSense
-                subprocess.run('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Services\\HidBth" /v "Start" /t REG_DWORD /d "3" /f', shell=True)
-                progress += 20
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            # 5. Ajustes finales y prioridades
-            status_label.config(text="Aplicando ajustes finales...")
-            try:
-                # Establecer prioridades de dispositivos
-                subprocess.run('reg add "HKLM\\SYSTEM\\CurrentControlSet\\Control\\PriorityControl" /v "Win32PrioritySeparation" /t REG_DWORD /d "38" /f', shell=True)
-                progress = 100
-                progress_bar['value'] = progress
-                percent_label.config(text=f"{progress}%")
-                progress_window.update()
-            except:
-                pass
-
-            time.sleep(1)
-            progress_window.destroy()
-            
-            self.show_custom_message("Éxito", """✅ Periféricos Optimizados:
-• USB y HID optimizados
-• Controladores de juego mejorados
-• Ratón y teclado optimizados
-• Controladores PS4/PS5 configurados
-• Prioridades ajustadas
-• Latencia reducida""")
-        except:
-            if 'progress_window' in locals():
-                progress_window.destroy()
-            self.show_custom_message("Error", "No se pudo completar la optimización de periféricos", error=True)
+        self.run_profile('peripherals', "No se pudo completar la optimización de periféricos")
 
     def on_minimize(self, event):
         """Mostrar botón flotante cuando la ventana se minimiza"""
         if self.root.state() == 'iconic':  # Si la ventana está minimizada
+            self.tooltips.hide()
             self.float_window.deiconify()  # Mostrar botón flotante
         else:
             self.float_window.withdraw()  # Ocultar botón flotante
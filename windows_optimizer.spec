@@ -6,8 +6,8 @@ a = Analysis(
     ['windows_optimizer.py'],
     pathex=[],
     binaries=[],
-    datas=[],
-    hiddenimports=['wmi', 'win32com.client', 'win32api', 'win32con', 'psutil'],
+    datas=[('profiles', 'profiles')],
+    hiddenimports=['wmi', 'win32com.client', 'win32api', 'win32con', 'pythoncom', 'psutil', 'webbrowser'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],